@@ -1,7 +1,7 @@
 import logging
 import os
 import sys
-from typing import Generator, Tuple, Dict, Any
+from typing import Generator, Tuple, Dict, Any, TextIO
 
 import docx  # pip install python-docx
 import openpyxl  # pip install openpyxl
@@ -38,21 +38,35 @@ class DataLoaderLocalFileLoader:
                 if ext in ext_tuple:
                     yield os.path.join(root, file)
 
-    def load_file_with_metadata(self, file_path: str) -> Tuple[str, Dict[str, Any]]:
-        filename = os.path.basename(file_path)
-        ext = os.path.splitext(file_path)[1].lower()
-
-        # 1. Tworzenie obiektu metadanych (Type Safe)
-        meta_obj = FileMetadata(
+    @staticmethod
+    def _file_metadata(file_path: str) -> FileMetadata:
+        # Tworzenie obiektu metadanych (Type Safe)
+        return FileMetadata(
             source=f"file://{file_path}",
-            title=filename,
-            extension=ext,
+            title=os.path.basename(file_path),
+            extension=os.path.splitext(file_path)[1].lower(),
             url=f"file://{file_path}",
             domain="local",
             tags=["local", "filesystem"],
             page_number=None  # Cały plik, więc brak konkretnej strony
         )
 
+    def open_text_stream(self, file_path: str) -> Tuple[TextIO, Dict[str, Any]]:
+        """
+        Otwiera plik tekstowy jako strumień (bez wczytywania treści) + metadane pliku.
+        Używane przez pipeline dla plików większych niż RAM (strategie strumieniowe, np. JSON).
+        Strumień zamyka wywołujący.
+        """
+        stream = open(file_path, "r", encoding="utf-8", errors="ignore")
+        return stream, self._file_metadata(file_path).to_dict()
+
+    def load_file_with_metadata(self, file_path: str) -> Tuple[str, Dict[str, Any]]:
+        filename = os.path.basename(file_path)
+        ext = os.path.splitext(file_path)[1].lower()
+
+        # 1. Tworzenie obiektu metadanych (Type Safe)
+        meta_obj = self._file_metadata(file_path)
+
         content = ""
 
         try:
@@ -70,12 +70,21 @@ def get_knowledge_base():
         base_url=os.getenv("EMBEDDING_BASE_URL")
     )
 
-    store = QdrantDatabaseStore(
-        url=os.getenv("QDRANT_API"),
-        api_key=os.getenv("QDRANT_API_KEY"),
-        collection_name=settings.get("vector_db.collection_name"),
-        vector_size=emb_dim
-    )
+    if settings.get("vector_db.backend", "qdrant") == "local":
+        # Lokalny plik memory-mapped (bez serwera Qdrant)
+        from buissnes_agent.LocalVectorStore import LocalVectorStore
+
+        store = LocalVectorStore.from_settings(
+            collection_name=settings.get("vector_db.collection_name"),
+            vector_size=emb_dim
+        )
+    else:
+        store = QdrantDatabaseStore(
+            url=os.getenv("QDRANT_API"),
+            api_key=os.getenv("QDRANT_API_KEY"),
+            collection_name=settings.get("vector_db.collection_name"),
+            vector_size=emb_dim
+        )
 
     # 4. Instancjalizacja Głównego Orkiestratora
     KNOWLEDGE_BASE = SearchKnowledgebase(
@@ -1,13 +1,18 @@
 import logging
 import os
 import sys
-from typing import Dict, Any, Generator, Tuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Dict, Any, Generator, Tuple, TextIO
 from typing import Protocol, List
 
 import numpy as np
 from openai import OpenAI
 
+from buissnes_agent.MetadataModels import ChunkBatch
 from buissnes_agent.config_loader import settings
+from buissnes_agent.textchunker.iso_identifiers import extract_identifiers
+from buissnes_agent.textchunker.token_count import DEFAULT_ENCODING, TOKEN_COUNT_FIELD, count_tokens
 # Chunkings
 from buissnes_agent.textchunker.langchain.LangChainChunker import LangChainChunker
 from buissnes_agent.textchunker.noLibChunker.NoLibChunker import NoLibChunker as LegacyChunker
@@ -34,6 +39,17 @@ class VectorStoreInterface(Protocol):
         """
         ...
 
+    def insert_chunk_batches(self, batches: List[ChunkBatch]) -> None:
+        """
+        Wstawia paczki kolumnowe (`ChunkBatch` z wypełnioną macierzą `vectors`)
+        jednym zapisem. Format używany przez pipeline ingestii.
+        """
+        ...
+
+    def mark_ingestion(self) -> str:
+        """Oznacza zakończenie ingestii nową wersją danych (unieważnia cache wyników)."""
+        ...
+
     def search(self, query_vector: List[float], limit: int = 3) -> List[Dict]:
         """
         Wyszukuje podobne wektory.
@@ -50,6 +66,10 @@ class DataLoaderInterface(Protocol):
     Abstrakcja źródła danych.
     Ujednolica sposób pobierania plików z S3 (DataLoaderS3FileLoader)
     oraz z dysku lokalnego (DataLoaderLocalFileLoader).
+
+    Opcjonalnie loader może udostępnić `open_text_stream(key) -> (TextIO, metadata_dict)` -
+    wtedy duże pliki ze strategią strumieniową nie są wczytywane do pamięci w całości
+    (`SearchKnowledgebase._ingest_stream`).
     """
 
     def list_objects(self) -> Generator[str, None, None]:
@@ -66,6 +86,85 @@ class DataLoaderInterface(Protocol):
         ...
 
 
+# ==============================================================================
+# KONFIGURACJA CHUNKERA (przenośna między procesami)
+# ==============================================================================
+@dataclass
+class ChunkerConfig:
+    """
+    Kompletny, "picklowalny" opis chunkera dla jednego pliku.
+
+    Zamiast obiektu chunkera (klienty API, modele) do procesu roboczego trafia tylko
+    ta konfiguracja - chunker jest budowany na miejscu przez `build()`.
+    """
+    module: str
+    strategy: str
+    chunk_size: int
+    chunk_overlap: int
+    strategy_options: Dict[str, Any] = field(default_factory=dict)
+    extract_identifiers: bool = True
+    # Kodowanie tiktoken dla pola `token_count` (None = bez liczenia tokenów)
+    token_encoding: str | None = DEFAULT_ENCODING
+
+    def build(self):
+        if self.module in ["langchain"]:
+            return LangChainChunker(self.strategy, self.chunk_size, self.chunk_overlap)
+        return LegacyChunker(self.strategy, self.chunk_size, self.chunk_overlap,
+                             strategy_options=self.strategy_options)
+
+
+def chunk_document(raw_text: str, file_metadata: dict, config: ChunkerConfig) -> ChunkBatch:
+    """
+    Zadanie dla procesu roboczego: (tekst, metadane, konfiguracja) -> `ChunkBatch`
+    z `process_batch`. Funkcja modułowa, aby dała się zpicklować.
+    Kolumnowa paczka przesyła metadane pliku do procesu głównego tylko raz.
+    """
+    chunk_batch = config.build().process_batch(raw_text, file_metadata)
+    _annotate(chunk_batch, config)
+    return chunk_batch
+
+
+def chunk_stream(stream: TextIO, file_metadata: dict, config: ChunkerConfig,
+                 max_chunks: int = 256) -> Generator[ChunkBatch, None, None]:
+    """
+    Wariant `chunk_document` dla otwartego pliku: `process_stream` chunkera oddaje
+    paczki po `max_chunks` chunków, więc ani tekst pliku, ani wszystkie jego chunki
+    nie są jednocześnie w pamięci. Działa w procesie głównym (generator nie przechodzi do puli).
+    """
+    for chunk_batch in config.build().process_stream(stream, file_metadata, max_chunks):
+        _annotate(chunk_batch, config)
+        yield chunk_batch
+
+
+def _annotate(chunk_batch: ChunkBatch, config: ChunkerConfig) -> None:
+    if config.extract_identifiers:
+        annotate_identifiers(chunk_batch)
+    if config.token_encoding:
+        annotate_token_counts(chunk_batch, config.token_encoding)
+
+
+def annotate_identifiers(chunk_batch: ChunkBatch) -> None:
+    """
+    Dopisuje do metadanych chunków identyfikatory ISO 20022 (komunikaty, wersje, tagi XML,
+    kody błędów, reguły walidacyjne) - pola keyword dla szybkiej ścieżki w narzędziu RAG.
+    """
+    for record in chunk_batch.records:
+        identifiers = extract_identifiers(record.text)
+        if not identifiers:
+            continue
+        # Nowy słownik: metadane bywają współdzielone przez pod-chunki jednego fragmentu
+        record.metadata = {**(record.metadata or {}), **identifiers}
+
+
+def annotate_token_counts(chunk_batch: ChunkBatch, encoding_name: str = DEFAULT_ENCODING) -> None:
+    """
+    Dopisuje do metadanych chunków liczbę tokenów (`token_count`) - narzędzie RAG
+    pakuje wyniki w budżet tokenów bez tokenizacji przy każdym zapytaniu.
+    """
+    for record in chunk_batch.records:
+        record.metadata = {**(record.metadata or {}), TOKEN_COUNT_FIELD: count_tokens(record.text, encoding_name)}
+
+
 # ==============================================================================
 # KLASA ORKIESTRATORA
 # ==============================================================================
@@ -124,7 +223,27 @@ class SearchKnowledgebase:
         Dzięki abstrakcji Loaderów i Chunkerów, ta metoda jest identyczna
         dla plików lokalnych i S3.
         """
-        batch_items = []
+        # Paczki (fragmenty ChunkBatch) czekające na zapis do bazy
+        pending: list[ChunkBatch] = []
+
+        # Liczba procesów chunkujących (1 = przetwarzanie sekwencyjne w bieżącym procesie)
+        workers = int(settings.get("chunking.parallel.workers", 1) or 1)
+
+        if workers > 1:
+            files_processed = self._ingest_parallel(workers, pending)
+        else:
+            files_processed = self._ingest_sequential(pending)
+
+        # 5. FINALIZACJA
+        if pending:
+            self.store.insert_chunk_batches(pending)
+
+        # Nowa wersja danych w kolekcji -> cache wyników narzędzia RAG zostanie unieważniony
+        self.store.mark_ingestion()
+
+        logger.info(f"PROCES ZAKOŃCZONY. Przetworzono plików: {files_processed}")
+
+    def _ingest_sequential(self, pending: list[ChunkBatch]) -> int:
         files_processed = 0
 
         # 1. ITERACJA (Extract)
@@ -135,6 +254,11 @@ class SearchKnowledgebase:
             logger.info(f"Processing: {object_key}")
 
             try:
+                # Duże pliki ze strategią strumieniową: chunkowanie i embedding paczkami ze strumienia
+                if self._ingest_stream(object_key, pending):
+                    files_processed += 1
+                    continue
+
                 # 2. POBRANIE (Extract)
                 # Loader zwraca surowy tekst i metadane pliku
                 raw_text, file_metadata = self.data_loader.load_file_with_metadata(object_key)
@@ -143,11 +267,11 @@ class SearchKnowledgebase:
                     continue
 
                 # 3. CHUNKING (Transform)
-                processed_chunks = self._transform_to_chunks(object_key, raw_text, file_metadata)
+                chunk_batch = self._transform_to_chunks(object_key, raw_text, file_metadata)
 
                 # 4. EMBEDDING & BATCHING (Load)
-                # Przekazujemy batch_items przez referencję (lista jest mutowalna)
-                self._embed_and_queue_batch(processed_chunks, batch_items)
+                # Przekazujemy pending przez referencję (lista jest mutowalna)
+                self._embed_and_queue_batch(chunk_batch, pending)
 
                 files_processed += 1
 
@@ -155,66 +279,214 @@ class SearchKnowledgebase:
                 logger.error(f"Błąd przetwarzania pliku {object_key}: {e}")
                 continue
 
-        # 5. FINALIZACJA
-        if batch_items:
-            self.store.insert_batch(batch_items)
+        return files_processed
 
-        logger.info(f"PROCES ZAKOŃCZONY. Przetworzono plików: {files_processed}")
+    def _ingest_parallel(self, workers: int, pending: list[ChunkBatch]) -> int:
+        """
+        ### Chunkowanie równoległe (pula procesów)
+
+        Loader czyta pliki w procesie głównym, chunkowanie (CPU) idzie do `workers`
+        procesów roboczych jako `(tekst, metadane, ChunkerConfig)`, a embedding i zapis
+        do bazy zostają w procesie głównym - równolegle z chunkowaniem kolejnych plików.
 
-    def _transform_to_chunks(self, object_key: str, raw_text: str, file_metadata: dict) -> list[dict]:
+        **Kolejność wg rozmiaru (LPT):**
+        Wczytane pliki czekają w oknie (`chunking.parallel.window`), z którego do wolnego
+        procesu zawsze trafia NAJWIĘKSZY dokument. Kilka ogromnych PDF-ów startuje więc
+        na początku, a drobne pliki wypełniają resztę procesów - zamiast jednego PDF-a
+        mielonego na końcu przy bezczynnych pozostałych procesach.
+        Okno ogranicza też liczbę tekstów trzymanych jednocześnie w pamięci.
+
+        Pliki kwalifikujące się do ścieżki strumieniowej (`_ingest_stream`) nie trafiają do okna -
+        są chunkowane w procesie głównym, równolegle z pracą procesów nad plikami z okna.
         """
-        Transformuje surowy tekst na listę chunków ze zunifikowanymi metadanymi.
-        Obsługuje zarówno LegacyChunker jak i nowe podejście.
+        window = max(workers, int(settings.get("chunking.parallel.window", workers * 4)))
+        files_processed = 0
+
+        object_generator = iter(self.data_loader.list_objects())
+        waiting: list[tuple[str, str, dict]] = []  # (object_key, raw_text, file_metadata)
+        in_flight = {}  # Future -> object_key
+        exhausted = False
+
+        logger.info(f"Chunkowanie równoległe: {workers} procesów, okno {window} plików.")
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                # 1-2. Uzupełnienie okna wczytanymi plikami (Extract)
+                while not exhausted and len(waiting) + len(in_flight) < window:
+                    object_key = next(object_generator, None)
+                    if object_key is None:
+                        exhausted = True
+                        break
+                    try:
+                        if self._ingest_stream(object_key, pending):
+                            files_processed += 1
+                            continue
+                    except Exception as e:
+                        logger.error(f"Błąd przetwarzania pliku {object_key}: {e}")
+                        continue
+                    document = self._load_document(object_key)
+                    if document is not None:
+                        waiting.append(document)
+
+                # 3. Największe dokumenty najpierw do wolnych procesów (Transform)
+                if waiting and len(in_flight) < workers:
+                    waiting.sort(key=lambda document: len(document[1]))
+                    while waiting and len(in_flight) < workers:
+                        object_key, raw_text, file_metadata = waiting.pop()
+                        config = self._get_chunker_config(object_key)
+                        future = pool.submit(chunk_document, raw_text, file_metadata, config)
+                        in_flight[future] = object_key
+
+                if not in_flight:
+                    break
+
+                # 4. Embedding i batching gotowych wyników (Load) - w procesie głównym
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    object_key = in_flight.pop(future)
+                    try:
+                        self._embed_and_queue_batch(future.result(), pending)
+                        files_processed += 1
+                    except Exception as e:
+                        logger.error(f"Błąd przetwarzania pliku {object_key}: {e}")
+
+        return files_processed
+
+    def _ingest_stream(self, object_key: str, pending: list[ChunkBatch]) -> bool:
         """
+        ### Ingestia strumieniowa (pliki większe niż RAM)
 
-        chunk_module = settings.get("chunking.module")
+        Jeśli loader udostępnia `open_text_stream`, strategia pliku czyta strumienie
+        (`supports_stream`, np. JSON) i plik ma co najmniej `chunking.streaming.min_file_mb`,
+        otwarty plik trafia prosto do chunkera (`chunk_stream`). Każda paczka `max_chunks`
+        chunków jest od razu embeddowana i kolejkowana do zapisu - pamięć zależy od
+        rozmiaru paczki, a nie pliku.
 
-        ext = os.path.splitext(object_key)[1].lower()
+        Zwraca False, gdy plik nie kwalifikuje się (zwykła ścieżka `load_file_with_metadata`).
+        Błąd w połowie pliku przerywa go - chunki oddane wcześniej zostają w kolejce zapisu.
+        """
+        if str(settings.get("chunking.streaming.enabled", True)).lower() not in ("true", "1", "yes", "on"):
+            return False
+        open_text_stream = getattr(self.data_loader, "open_text_stream", None)
+        if open_text_stream is None:
+            return False
+
+        stream, file_metadata = open_text_stream(object_key)
+        with stream:
+            size = os.fstat(stream.fileno()).st_size
+            if size < float(settings.get("chunking.streaming.min_file_mb", 64)) * 1024 * 1024:
+                return False
+            config = self._get_chunker_config(object_key)
+            if not config.build().supports_stream():
+                return False
+
+            max_chunks = int(settings.get("chunking.streaming.max_chunks", 256))
+            logger.info(f"Chunkowanie strumieniowe: {object_key} ({size} B, paczki po {max_chunks} chunków)")
+            chunks = 0
+            try:
+                for chunk_batch in chunk_stream(stream, file_metadata, config, max_chunks):
+                    self._embed_and_queue_batch(chunk_batch, pending)
+                    chunks += len(chunk_batch)
+            except Exception:
+                if chunks:
+                    logger.error(f"Plik {object_key} przerwany po {chunks} chunkach (zostają w kolejce zapisu).")
+                raise
+        return True
+
+    def _load_document(self, object_key: str) -> tuple[str, str, dict] | None:
+        logger.info(f"Processing: {object_key}")
+        try:
+            raw_text, file_metadata = self.data_loader.load_file_with_metadata(object_key)
+        except Exception as e:
+            logger.error(f"Błąd przetwarzania pliku {object_key}: {e}")
+            return None
 
-        if chunk_module in ["langchain"]:
+        if not raw_text or not raw_text.strip():
+            return None
+        return object_key, raw_text, file_metadata
 
-            # Pobranie dedykowanej konfiguracji (Size, Overlap, Strategy)
-            chunk_size, chunk_overlap, strategy = self._get_chunk_config(chunk_module, ext)
-            print(f"Plik: {ext}, Chunk: {chunk_size}, Strategia: {strategy}")
+    def _transform_to_chunks(self, object_key: str, raw_text: str, file_metadata: dict) -> ChunkBatch:
+        """
+        Transformuje surowy tekst na kolumnową paczkę chunków ze zunifikowanymi metadanymi.
+        Obsługuje zarówno LegacyChunker jak i nowe podejście.
+        """
 
-            logger.info(f"LOGIC LAYER: Wybrano ContentChunker. Strategia: {strategy}")
-            chunker_engine = LangChainChunker(strategy, chunk_size, chunk_overlap)
+        config = self._get_chunker_config(object_key)
 
+        if config.module in ["langchain"]:
+            logger.info(f"LOGIC LAYER: Wybrano ContentChunker. Strategia: {config.strategy}")
         else:
-
-            # Pobranie dedykowanej konfiguracji (Size, Overlap, Strategy)
-            chunk_size, chunk_overlap, strategy = self._get_chunk_config(chunk_module, ext)
-            print(f"Plik: {ext}, Chunk: {chunk_size}, Strategia: {strategy}")
-
             logger.info("LOGIC LAYER: Wybrano Legacy Chunker.")
-            chunker_engine = LegacyChunker(strategy, chunk_size, chunk_overlap)
 
-        return chunker_engine.process_content(raw_text, file_metadata)
+        return chunk_document(raw_text, file_metadata, config)
 
-    def _embed_and_queue_batch(self, processed_chunks: list[dict], batch_items: list[dict]) -> None:
+    def _embed_and_queue_batch(self, chunk_batch: ChunkBatch, pending: list[ChunkBatch]) -> None:
         """
         Generuje embeddingi dla chunków i dodaje je do kolejki (batch).
         Jeśli kolejka osiągnie limit, wysyła dane do bazy i czyści kolejkę.
 
-        UWAGA: batch_items jest modyfikowane w miejscu (in-place).
+        Wektory trafiają do jednej macierzy float32 `(n, dim)` w `chunk_batch.vectors`
+        (zamiast osobnej listy floatów na chunk). Chunki z gotowym wektorem
+        (np. ze strategii `semanticChunkerPooled`) nie są embeddowane ponownie.
+
+        UWAGA: pending jest modyfikowane w miejscu (in-place).
         """
-        for item in processed_chunks:
-            text_content = item["text"]
-            metadata = item["metadata"]
+        reused = 0
+        vectors = None
+        for index, record in enumerate(chunk_batch.records):
+            # Generowanie wektora (lub ponowne użycie wektora policzonego przy chunkowaniu)
+            if record.vector is None:
+                vec = self._embed(record.text)
+            else:
+                vec = np.asarray(record.vector, dtype=np.float32)
+                record.vector = None  # Wektor ląduje w macierzy - zwalniamy listę floatów
+                reused += 1
+
+            if vectors is None:
+                # Prealokacja macierzy po poznaniu wymiaru pierwszego wektora
+                vectors = np.empty((len(chunk_batch), vec.shape[0]), dtype=np.float32)
+            vectors[index] = vec
+
+        chunk_batch.vectors = vectors
+
+        # Dzielenie paczki pliku na porcje po batch_size (widoki, bez kopiowania)
+        queued = sum(len(part) for part in pending)
+        offset = 0
+        while offset < len(chunk_batch):
+            part = chunk_batch.slice(offset, offset + self.batch_size - queued)
+            pending.append(part)
+            offset += len(part)
+            queued += len(part)
 
-            # Generowanie wektora
-            vec = self._embed(text_content)
+            # Sprawdzenie wielkości paczki i wysyłka
+            if queued >= self.batch_size:
+                self.store.insert_chunk_batches(pending)
+                pending.clear()  # Czyścimy listę, co wpływa na zmienną w głównej funkcji
+                queued = 0
 
-            batch_items.append({
-                "text": text_content,
-                "vector": vec.tolist(),
-                "metadata": metadata
-            })
+        if reused:
+            logger.info(f"Pominięto embedding dla {reused}/{len(chunk_batch)} chunków (wektory z chunkowania).")
 
-            # Sprawdzenie wielkości paczki i wysyłka
-            if len(batch_items) >= self.batch_size:
-                self.store.insert_batch(batch_items)
-                batch_items.clear()  # Czyścimy listę, co wpływa na zmienną w głównej funkcji
+    def _get_chunker_config(self, object_key: str) -> ChunkerConfig:
+        """
+        Buduje przenośną konfigurację chunkera dla pliku (moduł + strategia wg rozszerzenia).
+        """
+        chunk_module = settings.get("chunking.module")
+        ext = os.path.splitext(object_key)[1].lower()
+
+        # Pobranie dedykowanej konfiguracji (Size, Overlap, Strategy)
+        chunk_size, chunk_overlap, strategy = self._get_chunk_config(chunk_module, ext)
+        print(f"Plik: {ext}, Chunk: {chunk_size}, Strategia: {strategy}")
+
+        return ChunkerConfig(
+            module=chunk_module,
+            strategy=strategy,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            strategy_options=dict(settings.get("chunking.semantic", {}) or {}),
+            extract_identifiers=str(settings.get("chunking.extract_identifiers", True)).lower() in ("true", "1", "yes", "on"),
+            token_encoding=settings.get("chunking.token_encoding", DEFAULT_ENCODING) or None,
+        )
 
     def _get_chunk_config(self, module_name: str, ext: str) -> tuple[int, int, str]:
         """
@@ -0,0 +1,456 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from buissnes_agent.MetadataModels import ChunkBatch
+from buissnes_agent.config_loader import settings
+
+logger = logging.getLogger(__name__)
+
+# Pliki kolekcji w katalogu {path}/{collection_name}/
+_META_FILE = "meta.json"
+_VECTORS_FILE = "vectors.f32"  # float32 (capacity, dim), memory-mapped
+_PAYLOADS_FILE = "payloads.jsonl"  # payloady (JSON, jeden na linię, tylko dopisywane)
+_PAYLOAD_INDEX_FILE = "payloads.idx"  # int64 (capacity, 2): offset i długość payloadu wiersza
+_IDS_FILE = "ids.txt"  # ID punktu wiersza (linia = wiersz), do upsertu
+_IVF_FILE = "ivf.npz"  # centroidy + wiersze pogrupowane wg list
+
+
+class ScoredRecord:
+    """Wynik wyszukiwania (pola jak w punktach Qdrant: id, score, payload)."""
+    __slots__ = ("id", "score", "payload")
+
+    def __init__(self, id: str, score: float, payload: Dict[str, Any]):
+        self.id = id
+        self.score = score
+        self.payload = payload
+
+
+class LocalVectorStore:
+    """
+    ### Lokalna baza wektorowa (plik memory-mapped, bez serwera)
+
+    Implementacja `VectorStoreInterface` dla wdrożeń brzegowych, CI i benchmarków.
+
+    **Przechowywanie:**
+    - wektory: jeden plik float32 `(capacity, dim)` mapowany w pamięci (`np.memmap`),
+      znormalizowane przy zapisie (cosinus = iloczyn skalarny); plik rośnie x2,
+    - payloady: dopisywany plik JSON Lines + indeks offsetów int64 - przy wyniku
+      odczytywane są tylko payloady top-k, a nie cała kolekcja,
+    - upsert po ID punktu (ten sam chunk przy ponownej ingestii nadpisuje wiersz).
+
+    **Wyszukiwanie:**
+    - dokładne top-k: macierz zapytań x bloki wektorów (`block_rows`) i `argpartition`,
+      scalane między blokami - pamięć ograniczona niezależnie od wielkości kolekcji,
+    - opcjonalnie IVF (`build_ivf`): k-means dzieli wektory na `lists` grup, zapytanie
+      przeszukuje dokładnie tylko `nprobe` najbliższych grup (+ wiersze dodane po budowie).
+
+    Filtry (`filters`) są stosowane na payloadach kandydatów (z nadpróbkowaniem, poszerzanym
+    aż do `limit` trafień lub wyczerpania kolekcji).
+    """
+
+    def __init__(self, path: str, collection_name: str, vector_size: int = 1536,
+                 block_rows: int = 65536, ivf_lists: int = 0, nprobe: int = 8):
+        self.directory = os.path.join(path, collection_name)
+        self.collection_name = collection_name
+        self.vector_size = int(vector_size)
+        self.block_rows = max(1, int(block_rows))
+        self.ivf_lists = int(ivf_lists or 0)
+        self.nprobe = max(1, int(nprobe))
+
+        self._lock = threading.RLock()
+        self._meta: Dict[str, Any] = {}
+        self._vectors: Optional[np.memmap] = None
+        self._payload_index: Optional[np.memmap] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._ivf: Optional[Dict[str, np.ndarray]] = None
+        self._meta_stamp: Optional[tuple] = None
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._open()
+
+    @classmethod
+    def from_settings(cls, collection_name: str, vector_size: int) -> "LocalVectorStore":
+        """Tworzy store wg sekcji `vector_db.local` konfiguracji."""
+        return cls(
+            path=settings.get("vector_db.local.path", "./vector_store"),
+            collection_name=collection_name,
+            vector_size=vector_size,
+            block_rows=settings.get("vector_db.local.block_rows", 65536),
+            ivf_lists=settings.get("vector_db.local.ivf_lists", 0),
+            nprobe=settings.get("vector_db.local.nprobe", 8),
+        )
+
+    # ------------------------------------------------------------------
+    # Pliki
+    # ------------------------------------------------------------------
+    def _file(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _open(self) -> None:
+        """Otwiera (lub tworzy) pliki kolekcji i mapuje je w pamięci."""
+        meta_path = self._file(_META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                self._meta = json.load(f)
+            self._meta_stamp = _file_stamp(meta_path)
+            if self._meta["dim"] != self.vector_size:
+                logger.warning(f"Wymiar kolekcji {self.collection_name} = {self._meta['dim']} "
+                               f"(konfiguracja: {self.vector_size}) - używam wymiaru z pliku.")
+                self.vector_size = self._meta["dim"]
+        else:
+            self._meta = {"dim": self.vector_size, "count": 0, "capacity": 0, "ingestion_version": None}
+
+        capacity = self._meta["capacity"]
+        self._vectors = self._map(_VECTORS_FILE, capacity, self.vector_size, np.float32) if capacity else None
+        self._payload_index = self._map(_PAYLOAD_INDEX_FILE, capacity, 2, np.int64) if capacity else None
+
+        self._ids = []
+        if os.path.exists(self._file(_IDS_FILE)):
+            with open(self._file(_IDS_FILE), encoding="utf-8") as f:
+                self._ids = f.read().split("\n")[:self._meta["count"]]
+        self._rows = {point_id: row for row, point_id in enumerate(self._ids)}
+
+        self._ivf = None
+        if self._meta.get("ivf") and os.path.exists(self._file(_IVF_FILE)):
+            with np.load(self._file(_IVF_FILE)) as data:
+                self._ivf = {key: data[key] for key in data.files}
+
+    def _map(self, name: str, rows: int, cols: int, dtype) -> np.memmap:
+        return np.memmap(self._file(name), dtype=dtype, mode="r+", shape=(rows, cols))
+
+    def _grow(self, needed: int) -> None:
+        """Powiększa pliki memmap (x2), aby zmieścić `needed` wierszy."""
+        capacity = self._meta["capacity"]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        for name, cols, dtype in ((_VECTORS_FILE, self.vector_size, np.float32), (_PAYLOAD_INDEX_FILE, 2, np.int64)):
+            with open(self._file(name), "ab") as f:
+                f.truncate(new_capacity * cols * np.dtype(dtype).itemsize)
+        self._vectors = None
+        self._payload_index = None
+        self._meta["capacity"] = new_capacity
+        self._vectors = self._map(_VECTORS_FILE, new_capacity, self.vector_size, np.float32)
+        self._payload_index = self._map(_PAYLOAD_INDEX_FILE, new_capacity, 2, np.int64)
+
+    def _save_meta(self) -> None:
+        meta_path = self._file(_META_FILE)
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._meta, f)
+        os.replace(tmp_path, meta_path)
+        self._meta_stamp = _file_stamp(meta_path)
+
+    def refresh(self) -> None:
+        """
+        Ponownie otwiera pliki, jeśli inny proces (ingestia) zmienił kolekcję.
+        Koszt przy braku zmian: jeden `os.stat` pliku meta (mtime w ns + rozmiar).
+        """
+        stamp = _file_stamp(self._file(_META_FILE))
+        if stamp is not None and stamp != self._meta_stamp:
+            with self._lock:
+                if _file_stamp(self._file(_META_FILE)) != self._meta_stamp:
+                    self._open()
+
+    # ------------------------------------------------------------------
+    # VectorStoreInterface
+    # ------------------------------------------------------------------
+    def count(self) -> int:
+        self.refresh()
+        return int(self._meta["count"])
+
+    def version(self) -> str:
+        """Wersja danych (jak `ingestion_version` w Qdrant) - do unieważniania cache wyników."""
+        self.refresh()
+        return f"{self._meta.get('ingestion_version') or '-'}:{self._meta['count']}"
+
+    def insert_batch(self, items: List[Dict[str, Any]]) -> None:
+        """Wstawia paczkę słowników `{"text", "vector", "metadata"}` (upsert po phrase_metadata_id)."""
+        if not items:
+            return
+        payloads = []
+        for item in items:
+            payload = dict(item["metadata"])
+            payload.setdefault("phrase", item.get("text", ""))
+            payloads.append(payload)
+        vectors = np.asarray([item["vector"] for item in items], dtype=np.float32)
+        self._write([payload.get("phrase_metadata_id") for payload in payloads], vectors, payloads)
+
+    def insert_chunk_batches(self, batches: List[ChunkBatch]) -> None:
+        """Wstawia paczki kolumnowe - macierze wektorów kopiowane wprost do pliku memmap."""
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return
+        ids = [record.chunk_id for batch in batches for record in batch.records]
+        payloads = [batch.payload(index) for batch in batches for index in range(len(batch))]
+        vectors = np.concatenate([batch.vectors for batch in batches]).astype(np.float32, copy=False)
+        self._write(ids, vectors, payloads)
+
+    def mark_ingestion(self) -> str:
+        version = f"{time.time_ns():x}"
+        with self._lock:
+            # Po ingestii przebudowa IVF (jeśli włączony), aby objął nowe wiersze
+            if self.ivf_lists:
+                self.build_ivf(self.ivf_lists)
+            self._meta["ingestion_version"] = version
+            self._save_meta()
+        logger.info(f"Wersja ingestii kolekcji {self.collection_name}: {version}")
+        return version
+
+    def _write(self, ids: List[Optional[str]], vectors: np.ndarray, payloads: List[Dict[str, Any]]) -> None:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+
+        with self._lock:
+            rows = np.empty(len(ids), dtype=np.int64)
+            new_ids = []
+            count = self._meta["count"]
+            for i, raw_id in enumerate(ids):
+                point_id = str(raw_id) if raw_id else str(uuid.uuid4())
+                row = self._rows.get(point_id)
+                if row is None:
+                    row = count + len(new_ids)
+                    new_ids.append(point_id)
+                    self._rows[point_id] = row
+                rows[i] = row
+
+            self._grow(count + len(new_ids))
+            self._vectors[rows] = vectors
+
+            # Payloady dopisywane na koniec pliku; indeks wskazuje najnowszą wersję wiersza
+            with open(self._file(_PAYLOADS_FILE), "ab") as f:
+                offset = f.tell()
+                for row, payload in zip(rows, payloads):
+                    line = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+                    f.write(line)
+                    self._payload_index[row] = (offset, len(line))
+                    offset += len(line)
+
+            if new_ids:
+                with open(self._file(_IDS_FILE), "a", encoding="utf-8") as f:
+                    f.write("".join(f"{point_id}\n" for point_id in new_ids))
+                self._ids.extend(new_ids)
+
+            self._meta["count"] = count + len(new_ids)
+            self._vectors.flush()
+            self._payload_index.flush()
+            self._save_meta()
+
+        logger.info(f"Zapisano {len(ids)} wektorów lokalnie ({self.collection_name}: {self._meta['count']}).")
+
+    def _payload(self, row: int) -> Dict[str, Any]:
+        offset, length = self._payload_index[row]
+        with open(self._file(_PAYLOADS_FILE), "rb") as f:
+            f.seek(int(offset))
+            return json.loads(f.read(int(length)))
+
+    # ------------------------------------------------------------------
+    # Wyszukiwanie
+    # ------------------------------------------------------------------
+    def search(self, query_vector: List[float], limit: int = 5,
+               filters: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        """Wyszukuje podobne wektory i zwraca wyniki w formacie `QdrantDatabaseStore.search`."""
+        return [
+            {"text": record.payload.get("phrase") or record.payload.get("text") or "",
+             "metadata": record.payload, "score": record.score}
+            for record in self.query(query_vector, limit, filters)
+        ]
+
+    def query(self, query_vector: List[float], limit: int = 5,
+              filters: Optional[Dict[str, Any]] = None) -> List[ScoredRecord]:
+        return self.query_batch([query_vector], limit, filters)[0]
+
+    def query_batch(self, query_vectors: List[List[float]], limit: int = 5,
+                    filters: Optional[Dict[str, Any]] = None) -> List[List[ScoredRecord]]:
+        """
+        Top-k dla wielu zapytań naraz. Przy filtrach pobierane jest `limit * 10` kandydatów,
+        a payloady kandydatów sprawdzane po kolei (post-filtering). Zapytania, którym filtr
+        zostawił mniej niż `limit` wyników, są powtarzane z 4x większą pulą kandydatów - aż do
+        `limit` trafień albo wyczerpania kolekcji (IVF: po wyczerpaniu list `nprobe` wyszukiwanie
+        dokładne). Payload odrzuconego wiersza jest czytany tylko raz.
+        Przed wyszukiwaniem `refresh()` - wiersze dopisane przez ingestię w innym procesie są widoczne.
+        """
+        self.refresh()
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+
+        with self._lock:
+            count = self._meta["count"]
+            results: List[List[ScoredRecord]] = [[] for _ in range(len(queries))]
+            if count == 0:
+                return results
+
+            candidates = min(limit * 10 if filters else limit, count)
+            exact = self._ivf is None
+            pending = np.arange(len(queries))
+            rejected = set()  # wiersze, których payload nie pasuje do filtra
+
+            while pending.size:
+                if exact:
+                    scores, rows = self._top_k_exact(queries[pending], candidates, count)
+                else:
+                    scores, rows = self._top_k_ivf(queries[pending], candidates, count)
+
+                short, ivf_exhausted = [], False
+                for i, query_scores, query_rows in zip(pending, scores, rows):
+                    results[i] = self._collect(query_scores, query_rows, limit, filters, rejected)
+                    if len(results[i]) < limit:
+                        short.append(i)
+                        # IVF zwróciło mniej wierszy niż kandydatów - przeszukane listy się skończyły
+                        ivf_exhausted |= int((query_rows >= 0).sum()) < candidates
+
+                if not filters or not short:
+                    break
+                if candidates >= count and (exact or not ivf_exhausted):
+                    break  # Przejrzane wszystkie wiersze kolekcji
+                # Selektywny filtr: szersza pula kandydatów (IVF wyczerpane -> wyszukiwanie dokładne)
+                exact = exact or ivf_exhausted
+                candidates = min(candidates * 4, count)
+                pending = np.asarray(short)
+            return results
+
+    def _collect(self, scores: np.ndarray, rows: np.ndarray, limit: int,
+                 filters: Optional[Dict[str, Any]], rejected: set) -> List[ScoredRecord]:
+        """Pierwsze `limit` wierszy kandydatów (malejąco wg wyniku) pasujących do filtra."""
+        records = []
+        for score, row in zip(scores, rows):
+            if row < 0 or row in rejected:
+                continue
+            payload = self._payload(int(row))
+            if filters and not _matches(payload, filters):
+                rejected.add(int(row))
+                continue
+            records.append(ScoredRecord(self._ids[row], float(score), payload))
+            if len(records) == limit:
+                break
+        return records
+
+    def _top_k_exact(self, queries: np.ndarray, k: int, count: int):
+        """Dokładne top-k: bloki `block_rows` wektorów x macierz zapytań, scalanie argpartition."""
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+
+        for start in range(0, count, self.block_rows):
+            end = min(start + self.block_rows, count)
+            block_scores = queries @ np.asarray(self._vectors[start:end]).T  # (nq, rows)
+            block_rows = np.broadcast_to(np.arange(start, end), block_scores.shape)
+            best_scores, best_rows = _merge_top_k(
+                np.concatenate([best_scores, block_scores], axis=1),
+                np.concatenate([best_rows, block_rows], axis=1), k)
+
+        return _sort_top_k(best_scores, best_rows)
+
+    def _top_k_ivf(self, queries: np.ndarray, k: int, count: int):
+        """Top-k w `nprobe` najbliższych listach IVF + wiersze dodane po zbudowaniu indeksu."""
+        centroids, order, offsets = self._ivf["centroids"], self._ivf["order"], self._ivf["offsets"]
+        built_rows = int(self._meta["ivf"]["rows"])
+        nprobe = min(self.nprobe, len(centroids))
+
+        probes = np.argpartition(-(queries @ centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        tail = np.arange(built_rows, count, dtype=np.int64)
+
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        all_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        for i, (query, lists) in enumerate(zip(queries, probes)):
+            rows = np.concatenate([order[offsets[l]:offsets[l + 1]] for l in lists] + [tail])
+            if rows.size == 0:
+                continue
+            rows.sort()  # sekwencyjny dostęp do memmap
+            scores = np.asarray(self._vectors[rows]) @ query
+            top_scores, top_rows = _merge_top_k(scores[None, :], rows[None, :], k)
+            all_scores[i, :top_scores.shape[1]] = top_scores[0]
+            all_rows[i, :top_rows.shape[1]] = top_rows[0]
+
+        return _sort_top_k(all_scores, all_rows)
+
+    def build_ivf(self, lists: int, iterations: int = 10, sample_size: int = 100_000, seed: int = 0) -> None:
+        """
+        ### Budowa zgrubnego podziału IVF (k-means na znormalizowanych wektorach)
+
+        1. K-means (sferyczny) na próbce `sample_size` wektorów -> `lists` centroidów.
+        2. Przypisanie wszystkich wierszy (blokami) do najbliższego centroidu.
+        3. Zapis wierszy pogrupowanych wg list (`order` + `offsets`) do `ivf.npz`.
+        """
+        with self._lock:
+            count = self._meta["count"]
+            lists = int(min(lists, count))
+            if lists < 2:
+                logger.info("IVF: za mało wektorów - pomijam budowę indeksu.")
+                return
+
+            rng = np.random.default_rng(seed)
+            sample_rows = np.sort(rng.choice(count, size=min(sample_size, count), replace=False))
+            sample = np.asarray(self._vectors[sample_rows])
+            centroids = sample[rng.choice(len(sample), size=lists, replace=False)].copy()
+
+            for _ in range(iterations):
+                assignment = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                empty = norms[:, 0] == 0
+                # Pusta lista -> losowy wektor próbki (zamiast martwego centroidu)
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+                norms[empty] = 1.0
+                centroids = sums / norms
+
+            assignment = np.empty(count, dtype=np.int32)
+            for start in range(0, count, self.block_rows):
+                end = min(start + self.block_rows, count)
+                assignment[start:end] = np.argmax(np.asarray(self._vectors[start:end]) @ centroids.T, axis=1)
+
+            order = np.argsort(assignment, kind="stable").astype(np.int64)
+            offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=lists)))).astype(np.int64)
+
+            np.savez(self._file(_IVF_FILE), centroids=centroids.astype(np.float32), order=order, offsets=offsets)
+            self._ivf = {"centroids": centroids.astype(np.float32), "order": order, "offsets": offsets}
+            self._meta["ivf"] = {"lists": lists, "rows": count}
+            self._save_meta()
+            logger.info(f"IVF: {lists} list dla {count} wektorów ({self.collection_name}).")
+
+
+def _file_stamp(path: str) -> Optional[tuple]:
+    """(mtime w ns, rozmiar) pliku albo None, jeśli plik nie istnieje."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _merge_top_k(scores: np.ndarray, rows: np.ndarray, k: int):
+    """Zostawia k najlepszych kolumn w każdym wierszu (bez pełnego sortowania)."""
+    if scores.shape[1] <= k:
+        return scores, rows
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(scores, top, axis=1), np.take_along_axis(rows, top, axis=1)
+
+
+def _sort_top_k(scores: np.ndarray, rows: np.ndarray):
+    order = np.argsort(-scores, axis=1)
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(rows, order, axis=1)
+
+
+def _matches(payload: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """
+    Filtr jak w narzędziu RAG: każde pole musi pasować. Wartość-lista = dowolna z wartości,
+    pole-lista w payloadzie (np. tags) pasuje, jeśli zawiera którąkolwiek wartość.
+    """
+    for key, expected in filters.items():
+        expected_values = set(expected) if isinstance(expected, (list, tuple, set)) else {expected}
+        actual = payload.get(key)
+        actual_values = set(actual) if isinstance(actual, list) else {actual}
+        if not expected_values & actual_values:
+            return False
+    return True
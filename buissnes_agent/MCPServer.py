@@ -1,13 +1,27 @@
 import asyncio
+import hmac
 import logging
+import os
 import sys
+import time
+from contextlib import asynccontextmanager
 
 from fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
 
+from buissnes_agent.config_loader import settings
+from tools.bulkhead import ToolBulkhead, ToolBusyError
+from tools.profiling import MemoryProfiler, SamplingProfiler
+from tools.single_flight import SingleFlight
 from tools.tool_confluence import run_confluence_search
+from tools.tool_fan_out import SOURCE_LABELS, arun_fan_out
 # IMPORTY LOGIKI NARZĘDZI
-from tools.tool_iso_rag import run_iso_rag
+from tools.tool_iso_rag import (arun_iso_rag, arun_iso_rag_batch, awarmup, get_embedding_batcher_stats,
+                                get_query_cache_stats, get_result_cache_stats, resources_ready)
 from tools.tool_wikipedia import run_wikipedia_search
+# Narzędzia importują się względnie (.tracing) - ta sama instancja modułu (histogramy) co tutaj
+from tools.tracing import get_latency_histograms, render_prometheus, span
 
 logging.basicConfig(level=logging.INFO, stream=sys.stderr)
 
@@ -15,8 +29,287 @@ logging.basicConfig(level=logging.INFO, stream=sys.stderr)
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("httpcore").setLevel(logging.WARNING)
 
+logger = logging.getLogger("MCPServer")
+
+
+def _setting_enabled(key: str, default: bool = True) -> bool:
+    # Wartości z ENV (APP__...) przychodzą jako stringi
+    return str(settings.get(key, default)).lower() in ("true", "1", "yes", "on")
+
+
+# ==============================================================================
+# FAZA STARTU: INICJALIZACJA KLIENTÓW + ROZGRZEWKA (Readiness)
+# ==============================================================================
+# Instancja jest "gotowa" (readiness), gdy klienty są zainicjalizowane, a zapytania
+# rozgrzewkowe przeszły. Load balancer kieruje ruch tylko do gotowych instancji.
+_started_at = time.time()
+_readiness = {"ready": False, "warmup": None, "error": None, "attempts": 0}
+_warmup_task: asyncio.Task | None = None
+
+
+async def _warmup_until_ready() -> None:
+    """Rozgrzewka z ponawianiem (np. Qdrant startuje później niż serwer MCP)."""
+    queries = list(settings.get("mcp_server.warmup.queries") or [])
+    retry_seconds = float(settings.get("mcp_server.warmup.retry_seconds", 30))
+    while True:
+        _readiness["attempts"] += 1
+        try:
+            _readiness["warmup"] = await awarmup(queries)
+            _readiness.update(ready=True, error=None)
+            logger.info(f"Rozgrzewka zakończona: {_readiness['warmup']}")
+            return
+        except Exception as e:
+            _readiness["error"] = str(e)
+            logger.warning(f"Rozgrzewka nieudana (próba {_readiness['attempts']}): {e}. "
+                           f"Ponowienie za {retry_seconds:.0f} s.")
+            await asyncio.sleep(retry_seconds)
+
+
+@asynccontextmanager
+async def _lifespan(server):
+    """
+    Start serwera: rozgrzewka w tle (transport HTTP/SSE od razu odpowiada na /health/live,
+    a /health/ready zwraca 503 do czasu zakończenia rozgrzewki). Uruchamiana raz na start serwera
+    (lifespan FastMCP jest wspólny dla sesji). Przy zamknięciu niezakończona rozgrzewka
+    (pętla ponowień) jest anulowana i oczekiwana.
+    """
+    global _warmup_task
+    if _warmup_task is None:
+        if _setting_enabled("mcp_server.warmup.enabled"):
+            _warmup_task = asyncio.create_task(_warmup_until_ready())
+        else:
+            # Bez rozgrzewki: leniwa inicjalizacja przy pierwszym zapytaniu (jak dotychczas)
+            _readiness["ready"] = True
+    try:
+        yield {}
+    finally:
+        task, _warmup_task = _warmup_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
 # Inicjalizacja instancji FastMCP (nazwa serwera widoczna dla klienta)
-mcp = FastMCP("ISO20022 RAG Analyst Service")
+mcp = FastMCP("ISO20022 RAG Analyst Service", lifespan=_lifespan)
+
+
+@mcp.custom_route("/health/live", methods=["GET"])
+async def health_live(request: Request) -> JSONResponse:
+    """Liveness: proces działa i pętla zdarzeń odpowiada."""
+    return JSONResponse({"status": "alive", "uptime_seconds": round(time.time() - _started_at, 1)})
+
+
+@mcp.custom_route("/health/ready", methods=["GET"])
+async def health_ready(request: Request) -> JSONResponse:
+    """Readiness: 200 po udanej rozgrzewce (klienty gotowe), w przeciwnym razie 503."""
+    ready = _readiness["ready"] and (resources_ready() or not _setting_enabled("mcp_server.warmup.enabled"))
+    body = {
+        "status": "ready" if ready else "warming_up",
+        "warmup": _readiness["warmup"],
+        "attempts": _readiness["attempts"],
+        "error": _readiness["error"],
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+# Identyczne wywołania w toku (narzędzie + znormalizowane argumenty) dzielą jedno wykonanie
+_single_flight = SingleFlight(max_tracked_keys=settings.get("mcp_server.single_flight.max_tracked_keys", 1024))
+
+
+async def _coalesced(tool_name: str, factory, **arguments) -> str:
+    """
+    Uruchamia `factory()` przez single-flight: równoczesne wywołanie z tym samym kluczem
+    czeka na wynik już trwającego wykonania zamiast powtarzać pracę.
+    """
+    if not _setting_enabled("mcp_server.single_flight.enabled"):
+        return await factory()
+    return await _single_flight.do(SingleFlight.make_key(tool_name, arguments), factory)
+
+
+# Osobna grodź (limit współbieżności + kolejka) dla każdego narzędzia - wolny backend
+# (np. Confluence) nie zabiera wątków ani slotów pozostałym narzędziom.
+_bulkheads: dict[str, ToolBulkhead] = {}
+
+
+def _bulkhead(tool_name: str) -> ToolBulkhead:
+    bulkhead = _bulkheads.get(tool_name)
+    if bulkhead is None:
+        defaults = settings.get("mcp_server.bulkheads.default") or {}
+        config = {**defaults, **(settings.get(f"mcp_server.bulkheads.{tool_name}") or {})}
+        bulkhead = ToolBulkhead(
+            tool_name,
+            max_concurrency=int(config.get("max_concurrency", 8)),
+            max_queue=int(config.get("max_queue", 16)),
+            queue_timeout=float(config.get("queue_timeout_seconds", 10)),
+        )
+        _bulkheads[tool_name] = bulkhead
+    return bulkhead
+
+
+async def _guarded(tool_name: str, factory, **arguments) -> str:
+    """
+    Wywołanie narzędzia: single-flight (duplikaty nie zajmują slotów) -> grodź narzędzia.
+    Przepełniona grodź zwraca od razu wynik "zajęte" zamiast kolejkować bez końca.
+    """
+    async def bounded():
+        return await _bulkhead(tool_name).run(factory)
+
+    # Span całego wywołania (histogram per narzędzie); etapy narzędzia są jego dziećmi
+    with span(f"tool.{tool_name}") as stage:
+        try:
+            result = await _coalesced(tool_name, bounded, **arguments)
+        except ToolBusyError as e:
+            logger.warning(f"Odrzucono wywołanie {tool_name}: {e.reason}")
+            stage.mark_error("busy")
+            return (f"Serwer zajęty: narzędzie '{tool_name}' osiągnęło limit równoczesnych zapytań "
+                    f"({e.reason}). Spróbuj ponownie za chwilę.")
+        finally:
+            _profiler.note_request()
+        if isinstance(result, str) and result.startswith("Błąd"):
+            stage.mark_error(result[:200])
+        return result
+
+
+def get_bulkhead_stats() -> dict:
+    """Per narzędzie: aktywne / oczekujące wywołania, odrzucenia, czas oczekiwania na slot."""
+    return {name: bulkhead.stats() for name, bulkhead in _bulkheads.items()}
+
+
+def get_single_flight_stats() -> dict:
+    """Liczniki single-flight: wywołania, wykonania, zaoszczędzone duplikaty (także per klucz)."""
+    return _single_flight.stats()
+
+
+if _setting_enabled("observability.metrics.enabled"):
+    @mcp.custom_route("/metrics", methods=["GET"])
+    async def metrics(request: Request):
+        """
+        Metryki (transport http/sse): histogramy opóźnień per narzędzie i per etap w formacie
+        Prometheus. `?format=json` - podsumowanie histogramów + liczniki cache, micro-batchera,
+        single-flight i grodzi.
+        """
+        if request.query_params.get("format") == "json":
+            return JSONResponse({
+                "latency": get_latency_histograms(),
+                "query_cache": get_query_cache_stats(),
+                "result_cache": get_result_cache_stats(),
+                "embedding_batcher": get_embedding_batcher_stats(),
+                "single_flight": get_single_flight_stats(),
+                "bulkheads": get_bulkhead_stats(),
+            })
+        return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+# ==============================================================================
+# PANEL ADMINISTRACYJNY: PROFILOWANIE NA ŻĄDANIE (opt-in, transport http/sse)
+# ==============================================================================
+# Włączany przez `observability.admin.enabled`; każde żądanie wymaga tokenu z MCP_ADMIN_TOKEN
+# (nagłówek "Authorization: Bearer <token>" lub "X-Admin-Token"). Bez ustawionego tokenu
+# panel odrzuca wszystkie żądania.
+_profiler = SamplingProfiler()
+_memory_profiler = MemoryProfiler()
+
+
+def _admin_denied(request: Request) -> JSONResponse | None:
+    token = os.getenv("MCP_ADMIN_TOKEN")
+    if not token:
+        return JSONResponse({"error": "Panel administracyjny wymaga zmiennej MCP_ADMIN_TOKEN."}, status_code=403)
+
+    header = request.headers.get("authorization", "")
+    supplied = header[7:] if header.lower().startswith("bearer ") else request.headers.get("x-admin-token", "")
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        logger.warning(f"Odrzucono żądanie panelu administracyjnego: {request.url.path}")
+        return JSONResponse({"error": "Brak autoryzacji."}, status_code=401)
+    return None
+
+
+def _query_number(request: Request, name: str, default, cast=float):
+    value = request.query_params.get(name)
+    return default if value in (None, "") else cast(value)
+
+
+if _setting_enabled("observability.admin.enabled", False):
+    @mcp.custom_route("/admin/profile/start", methods=["POST"])
+    async def admin_profile_start(request: Request) -> JSONResponse:
+        """
+        Profilowanie próbkujące przez `seconds` sekund albo do `requests` wywołań narzędzi.
+        Opcjonalnie: `interval_ms` (domyślnie z konfiguracji), `idle=1` (także wątki bezczynne).
+        """
+        if denied := _admin_denied(request):
+            return denied
+        try:
+            max_seconds = float(settings.get("observability.admin.max_profile_seconds", 300))
+            seconds = min(_query_number(request, "seconds", 30.0), max_seconds)
+            requests = _query_number(request, "requests", None, int)
+            interval_ms = _query_number(request, "interval_ms",
+                                        float(settings.get("observability.admin.sample_interval_ms", 10)))
+            _profiler.start(seconds, max_requests=requests, interval=interval_ms / 1000.0,
+                            include_idle=request.query_params.get("idle") in ("1", "true"))
+        except ValueError as e:
+            return JSONResponse({"error": f"Niepoprawny parametr: {e}"}, status_code=400)
+        except RuntimeError as e:
+            return JSONResponse({"error": str(e), **_profiler.status()}, status_code=409)
+        logger.info(f"Profilowanie uruchomione: {seconds:.0f} s / {requests or '-'} wywołań")
+        return JSONResponse(_profiler.status())
+
+    @mcp.custom_route("/admin/profile/stop", methods=["POST"])
+    async def admin_profile_stop(request: Request) -> JSONResponse:
+        if denied := _admin_denied(request):
+            return denied
+        await asyncio.to_thread(_profiler.stop)
+        return JSONResponse(_profiler.status())
+
+    @mcp.custom_route("/admin/profile", methods=["GET"])
+    async def admin_profile(request: Request) -> Response:
+        """
+        Wynik ostatniego (lub trwającego) pomiaru, `format`:
+        status (domyślnie) | top (JSON, `limit`) | collapsed (flamegraph / speedscope) | pstats (plik binarny).
+        """
+        if denied := _admin_denied(request):
+            return denied
+        output = request.query_params.get("format", "status")
+        if output == "collapsed":
+            return PlainTextResponse(_profiler.collapsed())
+        if output == "pstats":
+            return Response(_profiler.pstats_dump(), media_type="application/octet-stream",
+                            headers={"Content-Disposition": "attachment; filename=mcp-profile.pstats"})
+        if output == "top":
+            limit = _query_number(request, "limit", 30, int)
+            return JSONResponse({**_profiler.status(), "top": _profiler.top(limit)})
+        return JSONResponse(_profiler.status())
+
+    @mcp.custom_route("/admin/tracemalloc/start", methods=["POST"])
+    async def admin_tracemalloc_start(request: Request) -> JSONResponse:
+        """Włącza tracemalloc (`frames` - głębokość śladu alokacji)."""
+        if denied := _admin_denied(request):
+            return denied
+        frames = _query_number(request, "frames", int(settings.get("observability.admin.tracemalloc_frames", 10)), int)
+        return JSONResponse(_memory_profiler.start(frames))
+
+    @mcp.custom_route("/admin/tracemalloc/snapshot", methods=["GET"])
+    async def admin_tracemalloc_snapshot(request: Request) -> JSONResponse:
+        """Największe alokacje (`top`, `key`: lineno | filename | traceback) + przyrost od poprzedniej migawki."""
+        if denied := _admin_denied(request):
+            return denied
+        try:
+            snapshot = await asyncio.to_thread(
+                _memory_profiler.snapshot,
+                _query_number(request, "top", 20, int),
+                request.query_params.get("key", "lineno"),
+            )
+        except ValueError as e:
+            return JSONResponse({"error": f"Niepoprawny parametr: {e}"}, status_code=400)
+        except RuntimeError as e:
+            return JSONResponse({"error": str(e)}, status_code=409)
+        return JSONResponse(snapshot)
+
+    @mcp.custom_route("/admin/tracemalloc/stop", methods=["POST"])
+    async def admin_tracemalloc_stop(request: Request) -> JSONResponse:
+        if denied := _admin_denied(request):
+            return denied
+        return JSONResponse(_memory_profiler.stop())
 
 
 # ==============================================================================
@@ -24,17 +317,62 @@ mcp = FastMCP("ISO20022 RAG Analyst Service")
 # ==============================================================================
 
 @mcp.tool()
-async def query_iso20022_knowledge_base(query: str) -> str:
+async def query_iso20022_knowledge_base(
+        query: str,
+        top_k: int | None = None,
+        domain: str | None = None,
+        extension: str | None = None,
+        source: str | None = None,
+        tags: list[str] | None = None,
+) -> str:
     """
     Wyszukuje informacje w bazie wiedzy ISO 20022 (specyfikacje techniczne, XML, pola, CBPR+).
     Użyj tego narzędzia do pytań o:
     - Strukturę komunikatów (pacs, camt, pain).
     - Tagi XML i reguły walidacji.
     - Standardy SWIFT CBPR+.
+
+    Opcjonalne argumenty (zawężają wyszukiwanie, podawaj tylko gdy użytkownik tego chce):
+    - top_k: liczba zwracanych fragmentów (domyślnie 5, maks. 20).
+    - domain: obszar dokumentacji (folder w S3, np. "business", "technical", "schemas").
+    - extension: typ pliku, np. "xsd", "pdf", "md".
+    - source: pełny URI dokumentu (np. "s3://bucket/schemas/pacs.008.xsd").
+    - tags: lista tagów dokumentu (wystarczy zgodność dowolnego).
+    """
+    # Natywna korutyna (AsyncQdrantClient + async embeddingi) - bez asyncio.to_thread,
+    # współbieżne zapytania nie są ograniczone rozmiarem domyślnej puli wątków.
+    return await _guarded(
+        "query_iso20022_knowledge_base",
+        lambda: arun_iso_rag(query, top_k, domain, extension, source, tags),
+        query=query, top_k=top_k, domain=domain, extension=extension, source=source, tags=tags,
+    )
+
+
+@mcp.tool()
+async def query_iso20022_knowledge_base_batch(
+        queries: list[str],
+        top_k: int | None = None,
+        domain: str | None = None,
+        extension: str | None = None,
+        source: str | None = None,
+        tags: list[str] | None = None,
+) -> str:
+    """
+    Wsadowe wyszukiwanie w bazie wiedzy ISO 20022 - kilka pod-pytań w JEDNYM wywołaniu.
+    Użyj zamiast wielokrotnego wywoływania query_iso20022_knowledge_base, gdy pytanie
+    użytkownika wymaga kilku niezależnych wyszukiwań, np.:
+    ["pola obowiązkowe GrpHdr pacs.008", "maksymalna długość EndToEndId", "VR00060"].
+
+    Zwraca unikalne fragmenty (bez powtórzeń między pytaniami), każdy z numerami pytań,
+    do których pasuje. Argumenty top_k / domain / extension / source / tags jak w
+    query_iso20022_knowledge_base (dotyczą każdego pytania). Maks. 8 pytań.
     """
-    # WAŻNE: asyncio.to_thread uruchamia funkcję synchroniczną (run_iso_rag) w osobnym wątku.
-    # Zapobiega to blokowaniu pętli zdarzeń (Event Loop) serwera, gdy czekamy na bazę danych.
-    return await asyncio.to_thread(run_iso_rag, query)
+    # Natywna korutyna (AsyncQdrantClient.query_batch_points + aembed_documents), jak narzędzie pojedyncze
+    return await _guarded(
+        "query_iso20022_knowledge_base_batch",
+        lambda: arun_iso_rag_batch(queries, top_k, domain, extension, source, tags),
+        queries=queries, top_k=top_k, domain=domain, extension=extension, source=source, tags=tags,
+    )
 
 
 @mcp.tool()
@@ -46,7 +384,9 @@ async def search_wikipedia_general(query: str) -> str:
     - Informacje o organizacjach (SWIFT, FED, EBA).
     - Dane geograficzne i historyczne.
     """
-    return await asyncio.to_thread(run_wikipedia_search, query)
+    tool_name = "search_wikipedia_general"
+    return await _guarded(tool_name, lambda: _bulkhead(tool_name).run_in_executor(run_wikipedia_search, query),
+                          query=query)
 
 
 @mcp.tool()
@@ -58,7 +398,47 @@ async def search_confluence_internal(query: str) -> str:
     - Ustalenia projektowe i notatki ze spotkań.
     - Specyfikę wdrożenia systemów w organizacji.
     """
-    return await asyncio.to_thread(run_confluence_search, query)
+    tool_name = "search_confluence_internal"
+    return await _guarded(tool_name, lambda: _bulkhead(tool_name).run_in_executor(run_confluence_search, query),
+                          query=query)
+
+
+@mcp.tool()
+async def search_all_knowledge_sources(query: str, sources: list[str] | None = None) -> str:
+    """
+    Przeszukuje RÓWNOLEGLE bazę wiedzy ISO 20022, Confluence i Wikipedię - JEDNO wywołanie
+    zamiast kilku kolejnych. Użyj do pytań hybrydowych, łączących specyfikację, praktykę
+    firmy i/lub wiedzę ogólną, np. "Co to jest camt.053 i jak go archiwizujemy w naszym systemie?".
+
+    Wynik zawiera osobne sekcje dla każdego źródła (z etykietą źródła) i jest ograniczony
+    łącznym limitem długości. Źródło, które nie odpowie na czas, jest pomijane z adnotacją.
+
+    Opcjonalnie:
+    - sources: podzbiór ["iso", "confluence", "wikipedia"] (domyślnie wszystkie).
+    """
+    runners = {
+        "iso": lambda: _guarded("query_iso20022_knowledge_base", lambda: arun_iso_rag(query), query=query),
+        "confluence": lambda: _guarded(
+            "search_confluence_internal",
+            lambda: _bulkhead("search_confluence_internal").run_in_executor(run_confluence_search, query),
+            query=query),
+        "wikipedia": lambda: _guarded(
+            "search_wikipedia_general",
+            lambda: _bulkhead("search_wikipedia_general").run_in_executor(run_wikipedia_search, query),
+            query=query),
+    }
+    selected = [source for source in (sources or list(SOURCE_LABELS)) if source in runners]
+
+    # Wywołania źródeł przechodzą przez single-flight i grodzie narzędzi bazowych -
+    # fan-out współdzieli limity i wyniki w toku z bezpośrednimi wywołaniami narzędzi.
+    with span("tool.search_all_knowledge_sources", sources=selected):
+        return await arun_fan_out(
+            query,
+            {source: runners[source] for source in selected},
+            timeouts=settings.get("mcp_server.fan_out.timeouts") or {},
+            token_budget=int(settings.get("mcp_server.fan_out.token_budget", 3000)),
+            weights=settings.get("mcp_server.fan_out.weights") or {},
+        )
 
 
 # ==============================================================================
@@ -2,6 +2,11 @@
 from dataclasses import dataclass, asdict, field
 from typing import List, Dict, Any, Optional
 
+import numpy as np
+
+# Pola schematu wspólne dla całego pliku (BaseMetadata)
+SCHEMA_FIELDS = ("source", "title", "url", "extension", "domain", "tags", "page_number")
+
 
 @dataclass
 class BaseMetadata:
@@ -59,4 +64,89 @@ class ChunkMetadata(BaseMetadata):
         clean_data = self._clean_dict(data)
 
         # 3. Scalamy (Schema ma priorytet nad extras)
-        return {**extras, **clean_data}
\ No newline at end of file
+        return {**extras, **clean_data}
+
+
+class ChunkRecord:
+    """
+    Pojedynczy chunk w `ChunkBatch` - lekki rekord (`__slots__`, bez `__dict__`).
+
+    `metadata` zawiera wyłącznie dane specyficzne dla chunka (np. `char_start`, `xpath`),
+    a nie kopię metadanych pliku. `vector` to opcjonalny wektor policzony przy chunkowaniu.
+    """
+    __slots__ = ("text", "chunk_id", "metadata", "vector")
+
+    def __init__(self, text: str, chunk_id: str, metadata: Optional[Dict[str, Any]] = None,
+                 vector: Optional[List[float]] = None):
+        self.text = text
+        self.chunk_id = chunk_id
+        self.metadata = metadata
+        self.vector = vector
+
+
+class ChunkBatch:
+    """
+    ### Kolumnowa paczka chunków jednego pliku (chunk -> embed -> upsert)
+
+    Zastępuje listę słowników `{"text", "metadata"}`, w której każdy chunk niósł pełną
+    kopię metadanych pliku (`ChunkMetadata` + `asdict` + `metadata.copy()` w Qdrant).
+
+    - `shared`: płaski payload pliku (pola schematu + extras loadera) - zapisany RAZ,
+    - `records`: rekordy `ChunkRecord` z treścią, ID i metadanymi specyficznymi dla chunka,
+    - `vectors`: macierz float32 `(n, dim)` wypełniana na etapie embeddingu.
+
+    Payload punktu powstaje dopiero przy zapisie do bazy (`payload(i)`).
+    """
+    __slots__ = ("shared", "records", "vectors")
+
+    def __init__(self, shared: Dict[str, Any], records: Optional[List[ChunkRecord]] = None,
+                 vectors: Optional[np.ndarray] = None):
+        self.shared = shared
+        self.records = records if records is not None else []
+        self.vectors = vectors
+
+    @classmethod
+    def for_file(cls, base_metadata: Dict[str, Any]) -> "ChunkBatch":
+        """
+        Buduje paczkę z metadanych pliku (loadera). Scalanie jak w `ChunkMetadata.to_payload`:
+        pola schematu bez None mają priorytet nad extras.
+        """
+        shared = {k: v for k, v in base_metadata.items() if k not in SCHEMA_FIELDS}
+        shared["source"] = base_metadata.get("source") or "unknown"
+        shared["tags"] = base_metadata.get("tags") or []
+        for key in ("title", "url", "extension", "domain", "page_number"):
+            if base_metadata.get(key) is not None:
+                shared[key] = base_metadata[key]
+        return cls(shared)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def add(self, text: str, chunk_id: str, metadata: Optional[Dict[str, Any]] = None,
+            vector: Optional[List[float]] = None) -> None:
+        self.records.append(ChunkRecord(text, chunk_id, metadata or None, vector))
+
+    def slice(self, start: int, end: int) -> "ChunkBatch":
+        """Widok na fragment paczki (wspólne `shared`, macierz wektorów bez kopiowania)."""
+        vectors = self.vectors[start:end] if self.vectors is not None else None
+        return ChunkBatch(self.shared, self.records[start:end], vectors)
+
+    def payload(self, index: int) -> Dict[str, Any]:
+        """Płaski payload punktu: metadane pliku + metadane chunka + treść i ID."""
+        record = self.records[index]
+        payload = {**self.shared, **record.metadata} if record.metadata else dict(self.shared)
+        payload["phrase"] = record.text
+        payload["phrase_metadata_id"] = record.chunk_id
+        return payload
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Format zgodny wstecz: lista `{"text", "metadata"[, "vector"]}` (jak `process_content`)."""
+        results = []
+        for index, record in enumerate(self.records):
+            result = {"text": record.text, "metadata": self.payload(index)}
+            if self.vectors is not None:
+                result["vector"] = self.vectors[index].tolist()
+            elif record.vector is not None:
+                result["vector"] = record.vector
+            results.append(result)
+        return results
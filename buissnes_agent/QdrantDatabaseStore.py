@@ -1,33 +1,231 @@
 import logging
+import time
 import uuid
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+import numpy as np
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, PointStruct, Distance
+from qdrant_client.models import (
+    VectorParams, VectorParamsDiff, PointStruct, Distance, PayloadSchemaType,
+    HnswConfigDiff, SearchParams, QuantizationSearchParams, Disabled,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    BinaryQuantization, BinaryQuantizationConfig,
+)
+
+from buissnes_agent.MetadataModels import ChunkBatch
+from buissnes_agent.config_loader import settings
+from buissnes_agent.textchunker.iso_identifiers import IDENTIFIER_FIELDS
+
+# Pola payloadu z indeksem keyword (filtrowanie bez pełnego skanu kolekcji)
+KEYWORD_INDEX_FIELDS = ("domain", "extension", "source", "tags") + IDENTIFIER_FIELDS
 
 logger = logging.getLogger(__name__)
 
+
+# ==============================================================================
+# KONFIGURACJA INDEKSU (vector_db.hnsw / vector_db.quantization / vector_db.on_disk)
+# ==============================================================================
+# Funkcje współdzielone przez store (tworzenie/migracja kolekcji) i narzędzie RAG
+# (parametry zapytania). Wartości z ENV (APP__VECTOR_DB__...) przychodzą jako stringi.
+
+def _as_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _optional_int(value: Any) -> Optional[int]:
+    return int(value) if value not in (None, "", "null") else None
+
+
+def quantization_type(index_config: Dict[str, Any]) -> str:
+    """none | scalar | binary"""
+    return str((index_config.get("quantization") or {}).get("type") or "none").lower()
+
+
+def build_hnsw_config(index_config: Dict[str, Any]) -> Optional[HnswConfigDiff]:
+    hnsw = index_config.get("hnsw") or {}
+    m = _optional_int(hnsw.get("m"))
+    ef_construct = _optional_int(hnsw.get("ef_construct"))
+    if m is None and ef_construct is None:
+        return None
+    return HnswConfigDiff(m=m, ef_construct=ef_construct)
+
+
+def build_quantization_config(index_config: Dict[str, Any]):
+    """
+    Kwantyzacja wektorów trzymanych w RAM:
+    - scalar: int8 (4x mniej pamięci, minimalna utrata jakości),
+    - binary: 1 bit na wymiar (32x mniej, wymaga rescore; dla dużych wymiarów, np. >= 768).
+    """
+    quantization = index_config.get("quantization") or {}
+    kind = quantization_type(index_config)
+    always_ram = _as_bool(quantization.get("always_ram", True))
+
+    if kind == "scalar":
+        quantile = quantization.get("quantile")
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8,
+            quantile=float(quantile) if quantile not in (None, "", "null") else None,
+            always_ram=always_ram,
+        ))
+    if kind == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=always_ram))
+    if kind != "none":
+        logger.warning(f"Nieznany typ kwantyzacji '{kind}' - pomijam.")
+    return None
+
+
+def quantization_signature(config) -> Optional[tuple]:
+    """
+    Znormalizowany opis kwantyzacji do porównań: (typ, parametry...) albo None (brak).
+    Modele zwracane przez serwer mogą mieć dodatkowe/domyślne pola (None zamiast False,
+    nowe opcje klienta), więc porównanie całych obiektów zgłaszałoby fałszywe różnice.
+    """
+    if config is None or config == Disabled.DISABLED:
+        return None
+    scalar = getattr(config, "scalar", None)
+    if scalar is not None:
+        scalar_type = getattr(scalar.type, "value", scalar.type)
+        quantile = float(scalar.quantile) if scalar.quantile is not None else None
+        return "scalar", str(scalar_type), quantile, bool(scalar.always_ram)
+    binary = getattr(config, "binary", None)
+    if binary is not None:
+        return "binary", bool(binary.always_ram)
+    product = getattr(config, "product", None)
+    if product is not None:
+        return "product", str(getattr(product.compression, "value", product.compression)), bool(product.always_ram)
+    return ("unknown", repr(config))
+
+
+def build_search_params(index_config: Dict[str, Any], hnsw_ef: Optional[int] = None) -> Optional[SearchParams]:
+    """
+    Parametry zapytania: `hnsw_ef` (argument > vector_db.hnsw.ef) oraz - przy kwantyzacji -
+    rescore na oryginalnych wektorach i oversampling kandydatów.
+    """
+    hnsw_ef = hnsw_ef if hnsw_ef is not None else _optional_int((index_config.get("hnsw") or {}).get("ef"))
+
+    quantization_params = None
+    if quantization_type(index_config) in ("scalar", "binary"):
+        quantization = index_config.get("quantization") or {}
+        oversampling = quantization.get("oversampling")
+        quantization_params = QuantizationSearchParams(
+            rescore=_as_bool(quantization.get("rescore", True)),
+            oversampling=float(oversampling) if oversampling not in (None, "", "null") else None,
+        )
+
+    if hnsw_ef is None and quantization_params is None:
+        return None
+    return SearchParams(hnsw_ef=hnsw_ef, quantization=quantization_params)
+
+
 class QdrantDatabaseStore:
-    def __init__(self, url: str, api_key: str, collection_name: str, vector_size: int = 1536):
+    def __init__(self, url: str, api_key: str, collection_name: str, vector_size: int = 1536,
+                 index_config: Optional[Dict[str, Any]] = None):
         self.collection_name = collection_name
         self.vector_size = vector_size
+        # Parametry HNSW / kwantyzacji / on_disk (domyślnie sekcja vector_db z konfiguracji)
+        self.index_config = index_config if index_config is not None else (settings.get("vector_db") or {})
         self.client = QdrantClient(url=url, api_key=api_key)
         self._ensure_collection()
 
     def _ensure_collection(self):
-        """Tworzy kolekcję tylko jeśli nie istnieje."""
+        """
+        Tworzy kolekcję tylko jeśli nie istnieje (z parametrami HNSW, kwantyzacją i on_disk).
+        Istniejąca kolekcja jest migrowana do bieżącej konfiguracji, jeśli `vector_db.migrate_existing`.
+        """
         try:
             if not self.client.collection_exists(self.collection_name):
-                logger.info(f"Tworzenie kolekcji: {self.collection_name} (dim: {self.vector_size})")
+                logger.info(f"Tworzenie kolekcji: {self.collection_name} (dim: {self.vector_size}, "
+                            f"kwantyzacja: {quantization_type(self.index_config)})")
                 self.client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=VectorParams(size=self.vector_size, distance=Distance.COSINE),
+                    vectors_config=VectorParams(
+                        size=self.vector_size,
+                        distance=Distance.COSINE,
+                        on_disk=_as_bool(self.index_config.get("on_disk", False)),
+                    ),
+                    hnsw_config=build_hnsw_config(self.index_config),
+                    quantization_config=build_quantization_config(self.index_config),
                 )
             else:
                 logger.info(f"Kolekcja {self.collection_name} już istnieje.")
+                if _as_bool(self.index_config.get("migrate_existing", False)):
+                    self.migrate_collection()
+            self._ensure_payload_indexes()
         except Exception as e:
             logger.error(f"Błąd inicjalizacji Qdrant: {e}")
             raise
 
+    def migrate_collection(self) -> bool:
+        """
+        ### Migracja istniejącej kolekcji do bieżącej konfiguracji indeksu
+
+        Porównuje parametry kolekcji (on_disk, m, ef_construct, kwantyzacja) z konfiguracją
+        i wysyła tylko różnice przez `update_collection`. Qdrant przebudowuje indeks
+        i kwantyzację w tle - kolekcja pozostaje dostępna, bez ponownej ingestii.
+
+        Zwraca True, jeśli wysłano zmianę.
+        """
+        params = self.client.get_collection(self.collection_name).config
+        current_vectors = params.params.vectors
+        current_on_disk = bool(getattr(current_vectors, "on_disk", False))
+        changes: Dict[str, Any] = {}
+
+        on_disk = _as_bool(self.index_config.get("on_disk", False))
+        if on_disk != current_on_disk:
+            changes["vectors_config"] = {"": VectorParamsDiff(on_disk=on_disk)}
+
+        hnsw = build_hnsw_config(self.index_config)
+        if hnsw is not None and ((hnsw.m is not None and hnsw.m != params.hnsw_config.m) or
+                                 (hnsw.ef_construct is not None and hnsw.ef_construct != params.hnsw_config.ef_construct)):
+            changes["hnsw_config"] = hnsw
+
+        quantization = build_quantization_config(self.index_config)
+        current_quantization = quantization_signature(params.quantization_config)
+        if quantization_signature(quantization) != current_quantization:
+            logger.info(f"Migracja {self.collection_name}: kwantyzacja {current_quantization} -> "
+                        f"{quantization_signature(quantization)}")
+            # Brak kwantyzacji w konfiguracji -> wyłączenie istniejącej
+            changes["quantization_config"] = quantization if quantization is not None else Disabled.DISABLED
+
+        if not changes:
+            logger.info(f"Migracja {self.collection_name}: konfiguracja indeksu aktualna.")
+            return False
+
+        logger.info(f"Migracja {self.collection_name}: aktualizacja {sorted(changes)}")
+        self.client.update_collection(collection_name=self.collection_name, **changes)
+        return True
+
+    def _ensure_payload_indexes(self):
+        """Tworzy brakujące indeksy keyword (także dla istniejących kolekcji)."""
+        existing = self.client.get_collection(self.collection_name).payload_schema or {}
+        for field_name in KEYWORD_INDEX_FIELDS:
+            if field_name in existing:
+                continue
+            logger.info(f"Tworzenie indeksu keyword: {self.collection_name}.{field_name}")
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field_name,
+                field_schema=PayloadSchemaType.KEYWORD,
+            )
+
+    def mark_ingestion(self) -> str:
+        """
+        Zapisuje nową wersję ingestii w metadanych kolekcji (`ingestion_version`).
+        Konsumenci (np. cache wyników w narzędziu RAG) porównują ją, aby unieważnić stare wyniki.
+        """
+        version = f"{time.time_ns():x}"
+        try:
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                metadata={"ingestion_version": version}
+            )
+            logger.info(f"Wersja ingestii kolekcji {self.collection_name}: {version}")
+        except Exception as e:
+            logger.error(f"Nie udało się zapisać wersji ingestii: {e}")
+        return version
+
     def count(self) -> int:
         """Zwraca liczbę wektorów w kolekcji."""
         try:
@@ -47,18 +245,9 @@ class QdrantDatabaseStore:
 
         for item in items:
             metadata = item["metadata"]
-            raw_id = metadata.get("phrase_metadata_id")
 
             # 1. Walidacja i formatowanie ID (Qdrant wymaga UUID z myślnikami lub int)
-            point_id = str(uuid.uuid4())  # Fallback
-            if raw_id:
-                try:
-                    # Jeśli ID to 32-znakowy hash MD5, zamieniamy go na format UUID (8-4-4-4-12)
-                    point_id = str(uuid.UUID(hex=raw_id))
-                except ValueError:
-                    # Jeśli to nie hex, zostawiamy jak jest (o ile to string) lub generujemy nowy
-                    logger.warning(f"Nieprawidłowy format ID '{raw_id}', generuję nowy UUID.")
-                    pass
+            point_id = self._point_id(metadata.get("phrase_metadata_id"))
 
             # 2. Przygotowanie Payloadu (Płaska struktura)
             payload = metadata.copy()
@@ -80,18 +269,66 @@ class QdrantDatabaseStore:
         except Exception as e:
             logger.error(f"Błąd zapisu do Qdrant: {e}")
 
-    def search(self, query_vector: List[float], limit: int = 5) -> List[Dict]:
+    def insert_chunk_batches(self, batches: List[ChunkBatch]):
+        """
+        Wstawia paczki kolumnowe (`ChunkBatch`) jednym wywołaniem `upload_collection`
+        (kolumny ids / vectors / payloads zamiast listy `PointStruct`).
+
+        Macierze float32 paczek trafiają do klienta jako `np.ndarray` - bez budowania listy
+        list floatów Pythona (`tolist()`); klient serializuje wiersze dopiero przy wysyłce.
+        Payload punktu powstaje raz, z metadanych pliku i chunka - bez `metadata.copy()`.
+        """
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return
+
+        ids, payloads = [], []
+        for batch in batches:
+            for index, record in enumerate(batch.records):
+                ids.append(self._point_id(record.chunk_id))
+                payloads.append(batch.payload(index))
+        vectors = batches[0].vectors if len(batches) == 1 else np.concatenate([batch.vectors for batch in batches])
+
+        try:
+            # Jedno żądanie (batch_size = cała porcja pipeline'u); wait=True jak w upsert
+            self.client.upload_collection(
+                collection_name=self.collection_name,
+                vectors=vectors,
+                payload=payloads,
+                ids=ids,
+                batch_size=len(ids),
+                wait=True,
+            )
+            logger.info(f"Zapisano {len(ids)} wektorów. Przykładowy ID: {ids[0]}")
+        except Exception as e:
+            logger.error(f"Błąd zapisu do Qdrant: {e}")
+
+    @staticmethod
+    def _point_id(raw_id: str) -> str:
+        point_id = str(uuid.uuid4())  # Fallback
+        if raw_id:
+            try:
+                # Jeśli ID to 32-znakowy hash MD5, zamieniamy go na format UUID (8-4-4-4-12)
+                point_id = str(uuid.UUID(hex=raw_id))
+            except ValueError:
+                # Jeśli to nie hex, zostawiamy jak jest (o ile to string) lub generujemy nowy
+                logger.warning(f"Nieprawidłowy format ID '{raw_id}', generuję nowy UUID.")
+        return point_id
+
+    def search(self, query_vector: List[float], limit: int = 5, hnsw_ef: Optional[int] = None) -> List[Dict]:
         """
         Wyszukuje podobne wektory i zwraca zmapowane wyniki.
         Zaktualizowano do obsługi nowego schematu ('phrase' i 'metadata').
+        Parametry zapytania (hnsw_ef, rescore/oversampling) wg `vector_db`.
         """
         try:
-            results = self.client.search(
+            results = self.client.query_points(
                 collection_name=self.collection_name,
-                query_vector=query_vector,
+                query=query_vector,
                 limit=limit,
                 with_payload=True,
-            )
+                search_params=build_search_params(self.index_config, hnsw_ef),
+            ).points
 
             output = []
             for p in results:
@@ -0,0 +1,117 @@
+import re
+from typing import Dict, List
+
+# ==============================================================================
+# IDENTYFIKATORY ISO 20022 (ekstrakcja przy ingestii + wykrywanie w zapytaniach)
+# ==============================================================================
+# Identyfikatory to dokładne tokeny ("AM09", "VR00060", "pacs.008.001.08", "GrpHdr"),
+# z którymi wyszukiwanie wektorowe radzi sobie wolno i słabo. Przy ingestii trafiają
+# do osobnych pól payloadu (indeksy keyword w Qdrant), a narzędzie RAG obsługuje
+# zapytania złożone z samych identyfikatorów filtrem keyword (ranking wektorowy tylko
+# wśród chunków zawierających identyfikator).
+
+# Pola payloadu (listy stringów, indeksowane jako keyword)
+MESSAGE_FIELD = "iso_messages"  # np. "pacs.008"
+MESSAGE_VERSION_FIELD = "iso_message_versions"  # np. "pacs.008.001.08"
+XML_TAGS_FIELD = "xml_tags"  # np. "GrpHdr", "CdtTrfTxInf"
+REASON_CODES_FIELD = "reason_codes"  # np. "AM09", "AC01"
+RULE_IDS_FIELD = "rule_ids"  # np. "VR00060"
+
+IDENTIFIER_FIELDS = (MESSAGE_FIELD, MESSAGE_VERSION_FIELD, XML_TAGS_FIELD, REASON_CODES_FIELD, RULE_IDS_FIELD)
+
+# pacs.008 / pacs.008.001.08 (business area: 4 litery, message: 3 cyfry, variant + version)
+_MESSAGE = re.compile(r"\b([a-z]{4})\.(\d{3})(?:\.(\d{3})\.(\d{2}))?\b", re.IGNORECASE)
+# Kody błędów / powodów ISO (External Code Sets, np. ExternalStatusReason1Code): prefiks
+# rodziny kodów + 2 cyfry, np. AM09, AC01, RR04 - bez dowolnych "XY12" (numery, symbole)
+_REASON_CODE_PREFIXES = ("AB", "AC", "AG", "AM", "BE", "CH", "CN", "DS", "DT", "DU", "ED", "FF", "FR",
+                         "ID", "MD", "MS", "RC", "RF", "RR", "SL", "TA", "TD", "TM")
+_REASON_CODE = re.compile(rf"\b(?:{'|'.join(_REASON_CODE_PREFIXES)})\d{{2}}\b")
+# Reguły walidacyjne (Validation / Cross-element rules), np. VR00060
+_RULE_ID = re.compile(r"\b(?:VR|CR)\d{4,6}\b")
+# Tagi XML w treści: <GrpHdr>, </ns:MsgId>, name="CdtTrfTxInf" (XSD)
+_XML_TAG = re.compile(r"</?(?:[\w.-]+:)?([A-Za-z][\w.-]{0,63})[\s/>]|\bname=\"([A-Za-z][\w.-]{0,63})\"")
+# Skrócone nazwy elementów ISO w prozie (CamelCase z min. 2 członami): GrpHdr, EndToEndId
+_ISO_TAG_WORD = re.compile(r"\b[A-Z][a-z]{1,4}(?:[A-Z][a-z0-9]{0,4}|Id){1,7}\b")
+# Człon nazwy (GrpHdr -> Grp, Hdr)
+_TAG_SEGMENT = re.compile(r"[A-Z][a-z0-9]*")
+_VOWELS = frozenset("aeiou")
+
+# Pojedynczy token zapytania (bez interpunkcji na brzegach)
+_QUERY_TOKEN_STRIP = "?!,;:'\"()[]<>/ "
+
+
+def _is_iso_abbreviation(word: str) -> bool:
+    """
+    Kształt nazwy z listy skrótów ISO 20022: skróty gubią samogłoski (Grp, Hdr, Cdt, Trf, Tx),
+    a identyfikatory kończą się na "Id" (EndToEndId). Zwykłe słowa PascalCase
+    (YouTube, GitHub, PayPal) mają samogłoski w każdym członie i są pomijane.
+    """
+    if word.endswith("Id"):
+        return True
+    return any(not _VOWELS.intersection(segment.lower()) for segment in _TAG_SEGMENT.findall(word))
+
+
+def _messages(text: str) -> tuple[List[str], List[str]]:
+    messages, versions = set(), set()
+    for area, number, variant, version in _MESSAGE.findall(text):
+        message = f"{area.lower()}.{number}"
+        messages.add(message)
+        if variant:
+            versions.add(f"{message}.{variant}.{version}")
+    return sorted(messages), sorted(versions)
+
+
+def extract_identifiers(text: str) -> Dict[str, List[str]]:
+    """
+    Wyciąga identyfikatory ISO 20022 z treści chunka.
+    Zwraca tylko niepuste pola: {nazwa_pola: posortowana lista unikalnych wartości}.
+    """
+    messages, versions = _messages(text)
+
+    # Elementy ISO są PascalCase - pomija słownik XSD (xs:element, xs:complexType...)
+    tags = {open_tag or name_attr for open_tag, name_attr in _XML_TAG.findall(text)}
+    tags = {tag for tag in tags if tag[0].isupper()}
+    tags.update(word for word in _ISO_TAG_WORD.findall(text) if _is_iso_abbreviation(word))
+
+    found = {
+        MESSAGE_FIELD: messages,
+        MESSAGE_VERSION_FIELD: versions,
+        XML_TAGS_FIELD: sorted(tags),
+        REASON_CODES_FIELD: sorted(set(_REASON_CODE.findall(text))),
+        RULE_IDS_FIELD: sorted(set(_RULE_ID.findall(text))),
+    }
+    return {field: values for field, values in found.items() if values}
+
+
+def detect_identifier_query(query: str, max_tokens: int = 4) -> Dict[str, List[str]]:
+    """
+    Rozpoznaje zapytanie złożone WYŁĄCZNIE z identyfikatorów (np. "AM09", "VR00060",
+    "pacs.008.001.08", "GrpHdr MsgId"). Zwraca {pole: wartości} do filtra albo {},
+    jeśli zapytanie zawiera zwykłe słowa (wtedy obowiązuje wyszukiwanie wektorowe).
+    """
+    tokens = [token.strip(_QUERY_TOKEN_STRIP) for token in query.split()]
+    tokens = [token for token in tokens if token]
+    if not tokens or len(tokens) > max_tokens:
+        return {}
+
+    found: Dict[str, set] = {}
+    for token in tokens:
+        message = _MESSAGE.fullmatch(token)
+        if message:
+            area, number, variant, version = message.groups()
+            if variant:
+                found.setdefault(MESSAGE_VERSION_FIELD, set()).add(
+                    f"{area.lower()}.{number}.{variant}.{version}")
+            else:
+                found.setdefault(MESSAGE_FIELD, set()).add(f"{area.lower()}.{number}")
+        elif _RULE_ID.fullmatch(token.upper()):
+            found.setdefault(RULE_IDS_FIELD, set()).add(token.upper())
+        elif _REASON_CODE.fullmatch(token.upper()) and token[:2].isalpha():
+            found.setdefault(REASON_CODES_FIELD, set()).add(token.upper())
+        elif _ISO_TAG_WORD.fullmatch(token) and _is_iso_abbreviation(token):
+            found.setdefault(XML_TAGS_FIELD, set()).add(token)
+        else:
+            # Zwykłe słowo -> to nie jest zapytanie o identyfikator
+            return {}
+
+    return {field: sorted(values) for field, values in found.items()}
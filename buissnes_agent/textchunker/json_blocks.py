@@ -0,0 +1,252 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Generator, List, Optional, TextIO, Union
+
+# Wielkość porcji tekstu czytanej ze strumienia (znaki)
+_READ_SIZE = 64 * 1024
+
+# Tokeny JSON (string, liczba, literał, znak strukturalny)
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+# Znak kończący liczbę - bez niego w buforze liczba może być ucięta (np. "150." | "0")
+_NUMBER_END = re.compile(r"[^0-9eE+\-.]")
+_LITERALS = ("true", "false", "null")
+
+
+class JsonStreamError(ValueError):
+    """Błąd składni JSON wykryty przez parser strumieniowy."""
+
+
+@dataclass
+class JsonBlock:
+    """
+    Fragment dokumentu JSON (pojedynczy rekord lub grupa sąsiednich rekordów).
+    """
+    pointer: str  # JSON Pointer (RFC 6901) rekordu lub kontenera grupy
+    text: str  # Zserializowany fragment JSON
+    first_key: Optional[str] = None  # Pierwszy klucz/indeks grupy (tylko dla grup)
+    last_key: Optional[str] = None  # Ostatni klucz/indeks grupy (tylko dla grup)
+
+    def to_metadata(self) -> Dict[str, str]:
+        """Metadane bloku doklejane do chunka (trafiają do payloadu Qdrant)."""
+        meta = {"json_pointer": self.pointer}
+        if self.first_key is not None:
+            meta["json_range"] = f"{self.first_key}..{self.last_key}"
+        return meta
+
+
+def _escape_pointer_token(token: str) -> str:
+    """Escapowanie segmentu JSON Pointer (RFC 6901): '~' -> '~0', '/' -> '~1'."""
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+class _StringReader:
+    """Minimalny adapter `read(n)` nad stringiem (bez kopiowania całego tekstu jak `io.StringIO`)."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.offset = 0
+
+    def read(self, size: int) -> str:
+        data = self.text[self.offset:self.offset + size]
+        self.offset += len(data)
+        return data
+
+
+class _TokenReader:
+    """
+    Przyrostowy tokenizer JSON.
+    Czyta strumień porcjami i trzyma w pamięci tylko bieżące okno tekstu.
+    """
+
+    def __init__(self, stream: Union[TextIO, _StringReader]):
+        self.stream = stream
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        data = self.stream.read(_READ_SIZE)
+        if not data:
+            self.eof = True
+            return False
+        # Odrzucamy już skonsumowaną część bufora
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def next_token(self) -> Optional[str]:
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self._fill():
+                break
+
+        if self.pos >= len(self.buffer):
+            return None
+
+        char = self.buffer[self.pos]
+        if char in "{}[]:,":
+            self.pos += 1
+            return char
+
+        if char == '"':
+            pattern = _STRING
+        elif char == "-" or char.isdigit():
+            pattern = _NUMBER
+        else:
+            pattern = None
+
+        while True:
+            if pattern is not None:
+                match = pattern.match(self.buffer, self.pos)
+                # Token dotyka końca bufora -> może być ucięty, dociągamy dane
+                truncated = match is None or match.end() == len(self.buffer) or (
+                    pattern is _NUMBER and _NUMBER_END.search(self.buffer, self.pos) is None)
+                if truncated and self._fill():
+                    continue
+                if match is None:
+                    raise JsonStreamError(f"Niepoprawny token JSON na pozycji: {self.buffer[self.pos:self.pos + 20]!r}")
+                self.pos = match.end()
+                return match.group(0)
+
+            for literal in _LITERALS:
+                if self.buffer.startswith(literal, self.pos):
+                    self.pos += len(literal)
+                    return literal
+            if len(self.buffer) - self.pos < 5 and self._fill():
+                continue
+            raise JsonStreamError(f"Niepoprawny token JSON na pozycji: {self.buffer[self.pos:self.pos + 20]!r}")
+
+
+@dataclass
+class _Container:
+    """Otwarty kontener (obiekt/tablica) na stosie parsera."""
+    pointer: str
+    is_object: bool
+    items: List[tuple] = field(default_factory=list)  # (klucz, tekst) zakończonych dzieci
+    size: int = 0
+    split: bool = False  # True -> kontener przekroczył budżet i jest emitowany częściami
+    next_index: int = 0
+    pending_key: Optional[str] = None
+
+    def render(self, items: List[tuple]) -> str:
+        if self.is_object:
+            return "{" + ", ".join(f"{json.dumps(k, ensure_ascii=False)}: {v}" for k, v in items) + "}"
+        return "[" + ", ".join(v for _, v in items) + "]"
+
+
+def iter_json_blocks(source: Union[str, TextIO], max_chars: int) -> Generator[JsonBlock, None, None]:
+    """
+    ### Strumieniowy podział JSON na rekordy / pod-drzewa
+
+    **Jak działa:**
+    1. Tokenizer czyta źródło porcjami (`_READ_SIZE`) - nie wymaga `json.load` całego pliku.
+    2. Każdy zakończony element (skalar, obiekt, tablica) jest serializowany i dopisywany
+       do swojego kontenera-rodzica.
+    3. Dopóki kontener mieści się w budżecie `max_chars`, trzymamy go w całości (trafi do
+       rodzica jako jeden rekord). Gdy go przekroczy, przechodzi w tryb "split": jego dzieci
+       są grupowane w chunki <= `max_chars` i emitowane na bieżąco.
+
+    **Wynik:**
+    Chunki są wyrównane do granic rekordów (np. elementów tablicy eksportu) lub pod-drzew,
+    a każdy niesie JSON Pointer swojego rekordu/kontenera.
+
+    **Pamięć:**
+    Stan parsera jest ograniczony do ok. `max_chars` na poziom zagnieżdżenia (plus pojedynczy
+    skalar) - nie powstaje drzewo `json.loads`. Stałe zużycie niezależne od rozmiaru pliku daje
+    tylko strumień (np. otwarty plik); napis źródłowy z definicji jest w pamięci w całości.
+    """
+    stream = _StringReader(source) if isinstance(source, str) else source
+    reader = _TokenReader(stream)
+    stack: List[_Container] = []
+
+    def _flush(container: _Container, final: bool) -> Generator[JsonBlock, None, None]:
+        # Grupujemy zakończone dzieci w porcje mieszczące się w budżecie
+        group: List[tuple] = []
+        group_size = 0
+        for key, text in container.items:
+            if group and group_size + len(text) + 2 > max_chars:
+                yield _group_block(container, group)
+                group, group_size = [], 0
+            group.append((key, text))
+            group_size += len(text) + 2
+
+        if final or group_size > max_chars:
+            if group:
+                yield _group_block(container, group)
+            container.items, container.size = [], 0
+        else:
+            # Niepełna grupa czeka na kolejne dzieci
+            container.items, container.size = group, group_size
+
+    def _group_block(container: _Container, group: List[tuple]) -> JsonBlock:
+        if len(group) == 1:
+            key, text = group[0]
+            return JsonBlock(pointer=f"{container.pointer}/{_escape_pointer_token(str(key))}", text=text)
+        return JsonBlock(
+            pointer=container.pointer,
+            text=container.render(group),
+            first_key=str(group[0][0]),
+            last_key=str(group[-1][0])
+        )
+
+    def _child_pointer(parent: _Container) -> str:
+        key = parent.pending_key if parent.is_object else str(parent.next_index)
+        return f"{parent.pointer}/{_escape_pointer_token(key)}"
+
+    def _complete(text: str) -> Generator[JsonBlock, None, None]:
+        # Zakończony element trafia do rodzica (lub jest całym dokumentem)
+        if not stack:
+            yield JsonBlock(pointer="", text=text)
+            return
+
+        parent = stack[-1]
+        key = parent.pending_key if parent.is_object else parent.next_index
+        parent.items.append((key, text))
+        parent.size += len(text) + 2
+        parent.next_index += 1
+        parent.pending_key = None
+
+        if parent.size > max_chars:
+            parent.split = True
+        if parent.split:
+            yield from _flush(parent, final=False)
+
+    expect_key = False
+    while True:
+        token = reader.next_token()
+        if token is None:
+            break
+
+        if token in "{[":
+            pointer = _child_pointer(stack[-1]) if stack else ""
+            stack.append(_Container(pointer=pointer, is_object=(token == "{")))
+            expect_key = token == "{"
+        elif token in "}]":
+            if not stack:
+                raise JsonStreamError("Niesparowany nawias zamykający.")
+            container = stack.pop()
+            if container.split:
+                # Kontener był już emitowany częściami - wysyłamy resztę
+                yield from _flush(container, final=True)
+                if stack:
+                    stack[-1].next_index += 1
+                    stack[-1].pending_key = None
+            else:
+                yield from _complete(container.render(container.items))
+            expect_key = False
+        elif token == ",":
+            expect_key = bool(stack) and stack[-1].is_object
+        elif token == ":":
+            expect_key = False
+        elif expect_key:
+            stack[-1].pending_key = json.loads(token)
+        else:
+            yield from _complete(token)
+
+    if stack:
+        raise JsonStreamError("Nieoczekiwany koniec dokumentu JSON.")
@@ -1,7 +1,8 @@
 import hashlib
 import logging
 import sys
-from typing import List, Dict, Any
+from itertools import islice
+from typing import List, Dict, Any, Generator, TextIO
 
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
@@ -11,9 +12,12 @@ from .strategies import (
     MarkdownHeaderStrategy,
     RecursiveStrategy,
     UnstructuredStrategy,
-    SemanticStrategy
+    SemanticStrategy,
+    XmlStructureStrategy,
+    JsonStructureStrategy
 )
-from ...MetadataModels import ChunkMetadata
+from ..sentence_pooling import PRECOMPUTED_VECTOR_KEY
+from ...MetadataModels import ChunkBatch
 
 # Importy interfejsu i strategii
 
@@ -57,6 +61,13 @@ class LangChainChunker:
             return UnstructuredStrategy(mode="elements")
         elif self.chunk_strategy == "semanticChunker":
             return SemanticStrategy()
+        elif self.chunk_strategy == "semanticChunkerPooled":
+            # Wektory chunków z embeddingów zdań (bez drugiego przebiegu embeddingu)
+            return SemanticStrategy(reuse_embeddings=True)
+        elif self.chunk_strategy == "xmlStructure":
+            return XmlStructureStrategy(self.chunk_size, self.chunk_overlap)
+        elif self.chunk_strategy == "jsonStructure":
+            return JsonStructureStrategy(self.chunk_size, self.chunk_overlap)
         elif self.chunk_strategy == "recursive":
             return RecursiveStrategy(self.chunk_size, self.chunk_overlap)
         else:
@@ -69,97 +80,120 @@ class LangChainChunker:
     # =========================================================================
     def process_content(self, content: str, base_metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
-        ### Główny Pipeline Przetwarzania
+        ### Główny Pipeline Przetwarzania (format słownikowy)
+
+        Zwraca listę `{"text", "metadata"(płaski payload)}`. Jeśli strategia policzyła już
+        wektor chunka (`semanticChunkerPooled`), wynik zawiera dodatkowy klucz "vector".
+        Pipeline ingestii korzysta bezpośrednio z kompaktowej `process_batch`.
+        """
+        return self.process_batch(content, base_metadata).to_dicts()
+
+    def process_batch(self, content: str, base_metadata: Dict[str, Any]) -> ChunkBatch:
+        """
+        ### Główny Pipeline Przetwarzania (format kolumnowy)
 
         Łączy wybraną strategię podziału z zarządzaniem limitami.
 
         **Etapy procesu:**
         1.  **Primary Split (Delegacja):** Zlecamy podział wyspecjalizowanej klasie strategii.
-        2.  **Metadata Injection:** Do każdego powstałego fragmentu doklejane są metadane źródłowe.
-        3.  **Secondary Split (Hard Limit Enforcer):** Sprawdza, czy logiczne chunki nie są za duże.
-        4.  **Formatting:** Nadaje unikalne ID i zwraca strukturę słownikową.
+        2.  **Secondary Split (Hard Limit Enforcer):** Sprawdza, czy logiczne chunki nie są za duże.
+        3.  **Formatting:** Nadaje unikalne ID i składa `ChunkBatch`.
+
+        **Offsety:**
+        Strategie, których chunki są dosłownymi wycinkami tekstu (`recursive`, `semanticChunker`),
+        podają `start_index`; zamieniamy go na `char_start`/`char_end` w payloadzie (jak w `NoLibChunker`),
+        co pozwala pakowaniu kontekstu scalać sąsiednie chunki bez powtórzonego overlapu.
+
+        **Metadata Merge:**
+        Metadane pliku nie są doklejane do każdego fragmentu - trafiają raz do `ChunkBatch.shared`.
+        Przy chunku zostają tylko metadane ze strategii (np. strona PDF), które mają
+        pierwszeństwo przed metadanymi pliku (o ile nie są puste).
         """
 
         # Krok 1: Wybór strategii i wykonanie cięcia (Primary Split)
         # Delegujemy zadanie do odpowiedniej klasy z katalogu 'strategies/'
         strategy = self._get_strategy()
         splits: List[Document] = strategy.split_text(content)
+        self._normalize_metadata(splits)
 
-        # Krok 2: Smart Metadata Merge (Inteligentne scalanie)
-        # Łączymy metadane z pliku z metadanymi z chunka (np. ze strategii PDF)
-        for doc in splits:
-            # Normalizacja klucza strony (LangChain 'page' -> nasz 'page_number')
-            if "page" in doc.metadata:
-                doc.metadata["page_number"] = doc.metadata.pop("page")
-
-            # Scalanie z base_metadata bez nadpisywania ważnych pól
-            for key, value in base_metadata.items():
-                # Ochrona page_number przed nadpisaniem przez None
-                if key == "page_number" and doc.metadata.get("page_number") is not None:
-                    continue
-
-                # Dodajemy tylko jeśli brakuje lub jest puste
-                if key not in doc.metadata or (doc.metadata[key] is None and value is not None):
-                    doc.metadata[key] = value
-
-        # Krok 3: Secondary Split (Hard Limit / Bezpiecznik)
+        # Krok 2: Secondary Split (Hard Limit / Bezpiecznik)
         # Strategie logiczne (Header/Semantic) mogą zwrócić chunk 5000 znaków, jeśli rozdział był długi.
         # Metoda _enforce_limit pocięcie go na mniejsze kawałki, zachowując metadane.
         final_documents = splits
         if self.chunk_size > 0:
             final_documents = self._enforce_limit(splits)
 
-        # Krok 4: Formatowanie wyniku
-        results = []
-        for idx, doc in enumerate(final_documents):
+        # Krok 3: Formatowanie wyniku
+        batch = ChunkBatch.for_file(base_metadata)
+        self._add_documents(batch, final_documents)
+        return batch
+
+    def supports_stream(self) -> bool:
+        """Czy wybrana strategia czyta tekst ze strumienia (`process_stream`)."""
+        return self._get_strategy().supports_stream
+
+    def process_stream(self, stream: TextIO, base_metadata: Dict[str, Any],
+                       max_chunks: int = 256) -> Generator[ChunkBatch, None, None]:
+        """
+        ### Pipeline strumieniowy (pliki większe niż RAM)
 
-            # A. Pobieranie danych ze scalonych metadanych dokumentu
+        Wariant `process_batch` dla otwartego pliku: strategia (`supports_stream`, np. `jsonStructure`)
+        czyta strumień porcjami, a chunki są oddawane paczkami po `max_chunks`.
+        W pamięci jest tylko bieżąca paczka - ani tekst pliku, ani lista wszystkich chunków.
+        Indeksy chunków (a więc ID) biegną dalej między paczkami.
+        """
+        strategy = self._get_strategy()
+        if not strategy.supports_stream:
+            raise ValueError(f"Strategia '{self.chunk_strategy}' nie obsługuje strumieni.")
+
+        documents = strategy.iter_stream(stream)
+        first_index = 0
+        while group := list(islice(documents, max_chunks)):
+            self._normalize_metadata(group)
+            if self.chunk_size > 0:
+                group = self._enforce_limit(group)
+            batch = ChunkBatch.for_file(base_metadata)
+            self._add_documents(batch, group, first_index)
+            first_index += len(batch)
+            yield batch
+
+    @staticmethod
+    def _normalize_metadata(documents: List[Document]) -> None:
+        """Ujednolica klucze metadanych LangChain (`page`, `start_index`) z payloadem bazy."""
+        # Normalizacja klucza strony (LangChain 'page' -> nasz 'page_number')
+        for doc in documents:
+            if "page" in doc.metadata:
+                doc.metadata["page_number"] = doc.metadata.pop("page")
+            # Pozycja chunka w oryginale (LangChain 'start_index') -> nasze 'char_start'/'char_end'
+            start = doc.metadata.pop("start_index", None)
+            if isinstance(start, int) and start >= 0:
+                doc.metadata["char_start"] = start
+                doc.metadata["char_end"] = start + len(doc.page_content)
+
+    @staticmethod
+    def _add_documents(batch: ChunkBatch, documents: List[Document], first_index: int = 0) -> None:
+        """
+        Krok 3 pipeline'u: nadaje dokumentom ID i dopisuje je do paczki.
+        `first_index` - numer pierwszego chunka w pliku (paczki z `process_stream`).
+        """
+        # Klucze techniczne, które generujemy sami lub są śmieciami
+        exclude_keys = {"phrase", "phrase_metadata_id", "_chunk_id", "loc"}
+
+        for idx, doc in enumerate(documents, start=first_index):
             meta_dict = doc.metadata
-            source_uri = meta_dict.get("source", "unknown")
+            # Gotowy wektor (jeśli strategia go policzyła) nie trafia do payloadu
+            precomputed_vector = meta_dict.pop(PRECOMPUTED_VECTOR_KEY, None)
+            source_uri = meta_dict.get("source") or batch.shared["source"]
 
-            # B. Generowanie ID
+            # A. Generowanie ID
             content_snippet = doc.page_content[:50]
             unique_str = f"{source_uri}_{idx}_{content_snippet}"
             chunk_id = hashlib.md5(unique_str.encode("utf-8")).hexdigest()
 
-            # C. Separacja pól znanych od "extra"
-            # Definiujemy, które klucze mapujemy wprost na dataclass
-            known_keys = {"source", "title", "url", "extension", "domain", "tags", "page_number"}
-
-            # Wyciągamy known fields
-            schema_data = {k: meta_dict.get(k) for k in known_keys}
-            # Ustawiamy domyślne source jeśli puste
-            if not schema_data["source"]:
-                schema_data["source"] = "unknown"
-
-            # Wszystko inne trafia do extras (np. specyficzne metadane z PDF)
-            # Pomijamy klucze techniczne, które generujemy sami lub są śmieciami
-            exclude_keys = known_keys | {"phrase", "phrase_metadata_id", "_chunk_id", "loc"}
-            extras = {k: v for k, v in meta_dict.items() if k not in exclude_keys}
-
-            # D. Instancjalizacja Dataclass
-            meta_obj = ChunkMetadata(
-                source=schema_data["source"],
-                phrase=doc.page_content,  # Treść dokumentu
-                phrase_metadata_id=chunk_id,  # ID
-
-                title=schema_data["title"],
-                url=schema_data["url"],
-                extension=schema_data["extension"],
-                domain=schema_data["domain"],
-                tags=schema_data["tags"] or [],
-                page_number=schema_data["page_number"],
-
-                extra_data=extras
-            )
-
-            # E. Wynik
-            results.append({
-                "text": doc.page_content,  # Do embeddingu
-                "metadata": meta_obj.to_payload()  # Do bazy (płaskie)
-            })
-
-        return results
+            # B. Metadane specyficzne dla chunka (puste wartości nie nadpisują metadanych pliku)
+            chunk_metadata = {k: v for k, v in meta_dict.items() if v is not None and k not in exclude_keys}
+
+            batch.add(doc.page_content, chunk_id, chunk_metadata, precomputed_vector)
 
     def _enforce_limit(self, documents: List[Document]) -> List[Document]:
         """
@@ -171,6 +205,9 @@ class LangChainChunker:
 
         Jeśli chunk jest większy niż `self.chunk_size`, używamy "nożyczek precyzyjnych"
         (RecursiveCharacterTextSplitter) aby go dociąć.
+
+        Pod-fragmenty chunka z offsetami dostają własne `char_start`/`char_end`
+        (offset rodzica + `start_index` pod-fragmentu wewnątrz rodzica).
         """
         final_docs = []
 
@@ -180,14 +217,27 @@ class LangChainChunker:
         recursive_cutter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
-            separators=["\n\n", "\n", ".", " ", ""]  # Hierarchia cięcia
+            separators=["\n\n", "\n", ".", " ", ""],  # Hierarchia cięcia
+            add_start_index=True
         )
 
         for doc in documents:
             if len(doc.page_content) > self.chunk_size:
                 # Jeśli za duży -> tniemy rekurencyjnie
-                # Metoda split_documents automatycznie kopiuje metadane rodzica do dzieci
+                # Metoda split_documents automatycznie kopiuje metadane rodzica do dzieci.
+                # Wektor rodzica nie opisuje pod-fragmentów - usuwamy go (zostaną zembeddowane).
+                doc.metadata.pop(PRECOMPUTED_VECTOR_KEY, None)
                 sub_docs = recursive_cutter.split_documents([doc])
+                parent_start = doc.metadata.get("char_start")
+                for sub_doc in sub_docs:
+                    start = sub_doc.metadata.pop("start_index", -1)
+                    if isinstance(parent_start, int) and start >= 0:
+                        sub_doc.metadata["char_start"] = parent_start + start
+                        sub_doc.metadata["char_end"] = parent_start + start + len(sub_doc.page_content)
+                    else:
+                        # Offsety rodzica nie opisują pod-fragmentu
+                        sub_doc.metadata.pop("char_start", None)
+                        sub_doc.metadata.pop("char_end", None)
                 final_docs.extend(sub_docs)
             else:
                 # Jeśli mieści się w limicie -> przepuszczamy bez zmian
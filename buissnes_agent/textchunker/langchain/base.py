@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterator, List, TextIO
 from langchain_core.documents import Document
 
 
@@ -14,12 +14,26 @@ class ChunkingStrategy(ABC):
     **Rozszerzenie:**
     To fundament wzorca Strategy. Jeśli w przyszłości będziemy chcieli dodać np. podział kodu Python,
     wystarczy dodać nową klasę dziedziczącą po ChunkingStrategy, bez modyfikowania głównego silnika.
+
+    **Strumienie:**
+    Strategie z `supports_stream = True` implementują też `iter_stream` - czytają otwarty plik
+    porcjami (pliki większe niż RAM, `LangChainChunker.process_stream`).
     """
 
+    # True -> strategia implementuje iter_stream (tekst czytany ze strumienia)
+    supports_stream: bool = False
+
     @abstractmethod
     def split_text(self, text: str) -> List[Document]:
         """
         Metoda odpowiedzialna za logiczny podział tekstu na mniejsze fragmenty (Document objects).
         Każda strategia implementuje tę metodę na swój własny sposób.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def iter_stream(self, stream: TextIO) -> Iterator[Document]:
+        """
+        Wariant `split_text` dla otwartego strumienia tekstu - dokumenty są oddawane
+        na bieżąco, bez wczytywania całego pliku.
+        """
+        raise NotImplementedError(f"{type(self).__name__} nie obsługuje strumieni.")
@@ -1,4 +1,6 @@
 from .markdown_header import MarkdownHeaderStrategy
 from .recursive import RecursiveStrategy
 from .semantic import SemanticStrategy
-from .unstructured import UnstructuredStrategy
\ No newline at end of file
+from .unstructured import UnstructuredStrategy
+from .xml_structure import XmlStructureStrategy
+from .json_structure import JsonStructureStrategy
\ No newline at end of file
@@ -0,0 +1,58 @@
+import logging
+from typing import Iterator, List, TextIO
+
+from langchain_core.documents import Document
+
+from buissnes_agent.textchunker.json_blocks import iter_json_blocks, JsonStreamError
+from buissnes_agent.textchunker.langchain.base import ChunkingStrategy
+from buissnes_agent.textchunker.langchain.strategies.recursive import RecursiveStrategy
+
+logger = logging.getLogger(__name__)
+
+
+class JsonStructureStrategy(ChunkingStrategy):
+    """
+    ### Strategia 6: JSON Structure (Strumieniowa)
+
+    Dzieli eksporty JSON wzdłuż ich struktury, zamiast traktować je jak Markdown.
+
+    **Jak działa:**
+    Tokenizer przyrostowy (`iter_json_blocks`) emituje `Document` na każdy rekord
+    lub grupę sąsiednich rekordów mieszczącą się w `chunk_size`. Pod-drzewa większe niż
+    budżet są rozkładane na dzieci. JSON Pointer trafia do `metadata["json_pointer"]`.
+
+    **Pamięć:**
+    Parser trzyma tylko bieżący rekord (ok. `chunk_size` na poziom zagnieżdżenia), a nie
+    całe drzewo `json.loads`. `split_text` dostaje tekst pliku w całości; `iter_stream`
+    czyta otwarty plik porcjami (duże pliki lokalne, `LangChainChunker.process_stream`).
+    """
+
+    supports_stream = True
+
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split_text(self, text: str) -> List[Document]:
+        try:
+            return [
+                Document(page_content=block.text, metadata=block.to_metadata())
+                for block in iter_json_blocks(text, self.chunk_size)
+            ]
+        except JsonStreamError as e:
+            logger.warning(f"Niepoprawny JSON ({e}), używam podziału rekurencyjnego (fallback).")
+            return RecursiveStrategy(self.chunk_size, self.chunk_overlap).split_text(text)
+
+    def iter_stream(self, stream: TextIO) -> Iterator[Document]:
+        emitted = False
+        try:
+            for block in iter_json_blocks(stream, self.chunk_size):
+                emitted = True
+                yield Document(page_content=block.text, metadata=block.to_metadata())
+        except JsonStreamError as e:
+            # Fallback tylko przed pierwszym rekordem - oddanych dokumentów nie da się cofnąć
+            if emitted or not stream.seekable():
+                raise
+            logger.warning(f"Niepoprawny JSON ({e}), używam podziału rekurencyjnego (fallback).")
+            stream.seek(0)
+            yield from RecursiveStrategy(self.chunk_size, self.chunk_overlap).split_text(stream.read())
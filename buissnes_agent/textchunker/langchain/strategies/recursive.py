@@ -16,6 +16,9 @@ class RecursiveStrategy(ChunkingStrategy):
     **Zastosowanie:**
     Używana jako główna strategia (gdy zależy nam tylko na rozmiarze) lub jako fallback,
     gdy inne metody zawiodą. Gwarantuje, że chunk nie przekroczy zadanego rozmiaru.
+
+    Chunki są wycinkami oryginału - `add_start_index` zapisuje ich pozycję w `metadata["start_index"]`
+    (`LangChainChunker` zamienia ją na `char_start`/`char_end`).
     """
 
     def __init__(self, chunk_size: int, chunk_overlap: int):
@@ -26,6 +29,7 @@ class RecursiveStrategy(ChunkingStrategy):
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
-            separators=["\n\n", "\n", ".", " ", ""]
+            separators=["\n\n", "\n", ".", " ", ""],
+            add_start_index=True
         )
         return text_splitter.create_documents([text])
\ No newline at end of file
@@ -5,6 +5,13 @@ from langchain_openai import OpenAIEmbeddings
 from langchain_experimental.text_splitter import SemanticChunker
 
 from buissnes_agent.textchunker.langchain.base import ChunkingStrategy
+from buissnes_agent.textchunker.sentence_pooling import (
+    RecordingEmbeddings,
+    sentence_groups,
+    pool_sentence_vectors,
+    PRECOMPUTED_VECTOR_KEY,
+    DEFAULT_MIN_COHESION
+)
 
 class SemanticStrategy(ChunkingStrategy):
     """
@@ -22,9 +29,22 @@ class SemanticStrategy(ChunkingStrategy):
     Inicjalizacja modelu OpenAI Embeddings odbywa się teraz wewnątrz tej klasy.
     Dzięki temu, jeśli użytkownik wybierze strategię "Recursive", nie marnujemy zasobów
     na łączenie się z API OpenAI.
+
+    **Ponowne użycie wektorów (`reuse_embeddings=True`):**
+    Embeddingi zdań policzone do wyznaczenia punktów podziału są uśredniane per chunk
+    i zwracane w `metadata["_vector"]`. Pipeline pomija wtedy drugi embedding chunka.
+    Chunki o spójności poniżej `min_cohesion` nie dostają wektora (zostaną zembeddowane).
+
+    **Offsety:**
+    `SemanticChunker` skleja zdania pojedynczą spacją, a jego `add_start_index` sumuje tylko
+    długości chunków (pomija separatory). Pozycję chunka wyszukujemy więc w oryginale -
+    `metadata["start_index"]` dostają wyłącznie chunki będące dosłownym wycinkiem tekstu.
     """
 
-    def __init__(self):
+    def __init__(self, reuse_embeddings: bool = False, min_cohesion: float = DEFAULT_MIN_COHESION):
+        self.reuse_embeddings = reuse_embeddings
+        self.min_cohesion = min_cohesion
+
         # Konfiguracja Embeddingów (Inicjalizowana tylko wewnątrz tej strategii)
         self.embeddings = OpenAIEmbeddings(
             model=os.getenv('EMBEDDING_MODEL'),
@@ -37,10 +57,33 @@ class SemanticStrategy(ChunkingStrategy):
         if not self.embeddings:
             raise ValueError("Embeddings not initialized. Check env vars.")
 
+        embeddings = RecordingEmbeddings(self.embeddings) if self.reuse_embeddings else self.embeddings
+
         text_splitter = SemanticChunker(
-            self.embeddings,
+            embeddings,
             breakpoint_threshold_type="percentile",
             breakpoint_threshold_amount=95.0,  # Wysoki próg - tnie tylko przy wyraźnej zmianie tematu
             min_chunk_size=200
         )
-        return text_splitter.create_documents([text])
\ No newline at end of file
+        docs = text_splitter.create_documents([text])
+
+        cursor = 0
+        for doc in docs:
+            start = text.find(doc.page_content, cursor)
+            if start != -1:
+                doc.metadata["start_index"] = start
+                cursor = start + len(doc.page_content)
+
+        if self.reuse_embeddings and embeddings.vectors:
+            groups = sentence_groups(
+                [doc.page_content for doc in docs],
+                len(embeddings.vectors),
+                text_splitter.sentence_split_regex
+            )
+            if groups:
+                vectors = pool_sentence_vectors(embeddings.vectors, groups, self.min_cohesion)
+                for doc, vector in zip(docs, vectors):
+                    if vector is not None:
+                        doc.metadata[PRECOMPUTED_VECTOR_KEY] = vector
+
+        return docs
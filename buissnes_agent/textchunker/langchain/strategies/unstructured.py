@@ -1,11 +1,31 @@
-import os
-import tempfile
-from typing import List
+from typing import List, Dict, Any, Tuple
 from langchain_core.documents import Document
-from langchain_community.document_loaders import UnstructuredMarkdownLoader
 
 from buissnes_agent.textchunker.langchain.base import ChunkingStrategy
 
+
+def _partition_markdown(text: str, mode: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Parsuje Markdown biblioteką Unstructured bezpośrednio z pamięci (`partition_md(text=...)`).
+
+    Zwraca proste krotki (treść, metadane) zamiast obiektów Document.
+    """
+    from unstructured.partition.md import partition_md
+
+    elements = partition_md(text=text)
+
+    if mode == "elements":
+        results = []
+        for element in elements:
+            metadata = element.metadata.to_dict()
+            metadata["category"] = element.category
+            results.append((str(element), metadata))
+        return results
+
+    # mode == "single": cały dokument jako jeden element (jak UnstructuredMarkdownLoader)
+    return [("\n\n".join(str(element) for element in elements), {})]
+
+
 class UnstructuredStrategy(ChunkingStrategy):
     """
     ### Strategia 3: Unstructured Library
@@ -14,9 +34,12 @@ class UnstructuredStrategy(ChunkingStrategy):
     Potrafi rozpoznać listy, tabelki i stopki lepiej niż zwykły regex.
 
     **Zarządzanie zasobami:**
-    Biblioteka `unstructured` operuje na plikach na dysku. Ta klasa hermetyzuje (ukrywa)
-    całą logikę tworzenia i usuwania plików tymczasowych (tempfile), dzięki czemu
-    główna klasa Orchestrator pozostaje czysta.
+    Tekst jest partycjonowany bezpośrednio z pamięci (`partition_md(text=...)`), bez
+    zapisu do pliku tymczasowego - zero I/O dyskowego i fsync na każdy plik korpusu.
+
+    **Praca równoległa:**
+    Strategia działa na jednym dokumencie - równoległość zapewnia pula procesów pipeline'u
+    (`KnowledgebasePipeline`, jeden plik na zadanie).
 
     **Modes:**
     - 'single': Cały tekst jako jeden element (z wyczyszczonym formatowaniem).
@@ -27,16 +50,7 @@ class UnstructuredStrategy(ChunkingStrategy):
         self.mode = mode
 
     def split_text(self, text: str) -> List[Document]:
-        suffix = ".md"
-        # Tworzenie pliku tymczasowego - wymagane przez bibliotekę Unstructured
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-            temp_file.write(text.encode("utf-8"))
-            temp_file_path = temp_file.name
-
-        try:
-            loader = UnstructuredMarkdownLoader(temp_file_path, mode=self.mode)
-            return loader.load()
-        finally:
-            # Sprzątanie po sobie (usuwanie pliku tymczasowego)
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
\ No newline at end of file
+        return [
+            Document(page_content=content, metadata=metadata)
+            for content, metadata in _partition_markdown(text, self.mode)
+        ]
@@ -0,0 +1,46 @@
+import logging
+import xml.etree.ElementTree as ET
+from typing import List
+
+from langchain_core.documents import Document
+
+from buissnes_agent.textchunker.langchain.base import ChunkingStrategy
+from buissnes_agent.textchunker.langchain.strategies.recursive import RecursiveStrategy
+from buissnes_agent.textchunker.xml_blocks import iter_xml_blocks
+
+logger = logging.getLogger(__name__)
+
+
+class XmlStructureStrategy(ChunkingStrategy):
+    """
+    ### Strategia 5: XML/XSD Structure (Strumieniowa, iterparse)
+
+    Dzieli schematy XSD i komunikaty XML wzdłuż ich struktury, zamiast traktować je
+    jak płaski tekst (co robi `MarkdownHeaderStrategy`).
+
+    **Jak działa:**
+    Parser przyrostowy (`iter_xml_blocks`) emituje jeden `Document` na każdy globalny
+    `complexType` / `simpleType` / `element` (XSD) lub blok komunikatu (instancja XML).
+    XPath bloku trafia do `metadata["xpath"]`, więc po docięciu przez `_enforce_limit`
+    pod-chunki nadal wiedzą, z której definicji pochodzą. Dokument bez elementów na głębokości
+    bloku daje jeden `Document` z elementem głównym, a tekst spoza bloków - osobne `Document`.
+
+    **Pamięć:**
+    Przetworzone elementy są usuwane z drzewa na bieżąco - nie powstaje pełne drzewo
+    `ElementTree`. Chunker dostaje jednak cały tekst pliku (loader czyta go w całości),
+    więc sam dokument nadal jest w pamięci.
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split_text(self, text: str) -> List[Document]:
+        try:
+            return [
+                Document(page_content=block.text, metadata=block.to_metadata())
+                for block in iter_xml_blocks(text)
+            ]
+        except ET.ParseError as e:
+            logger.warning(f"Niepoprawny XML ({e}), używam podziału rekurencyjnego (fallback).")
+            return RecursiveStrategy(self.chunk_size, self.chunk_overlap).split_text(text)
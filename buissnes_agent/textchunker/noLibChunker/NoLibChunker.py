@@ -1,17 +1,22 @@
 import hashlib
 import logging
 import sys
-from typing import List, Dict, Any
+from itertools import islice
+from typing import List, Dict, Any, Tuple, Optional, Generator, TextIO
 
 # Importy z pakietu
-from .base import BaseNoLibStrategy
+from .base import BaseNoLibStrategy, Span
 from .strategies import (
     FixedStrategy,
     SentencesStrategy,
     MarkdownStrategy,
-    SemanticStrategy
+    SemanticStrategy,
+    XmlStructureStrategy,
+    JsonStructureStrategy,
+    NativeSemanticStrategy
 )
-from ...MetadataModels import ChunkMetadata
+from ..sentence_pooling import PRECOMPUTED_VECTOR_KEY
+from ...MetadataModels import ChunkBatch, SCHEMA_FIELDS
 
 logging.basicConfig(level=logging.INFO, stream=sys.stderr, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -34,7 +39,8 @@ logger = logging.getLogger(__name__)
 # Jest "lekka", szybka i działa na czystym Pythonie.
 # =========================================================
 class NoLibChunker:
-    def __init__(self, chunk_strategy: str, chunk_size: int = 600, chunk_overlap: int = 100):
+    def __init__(self, chunk_strategy: str, chunk_size: int = 600, chunk_overlap: int = 100,
+                 strategy_options: Optional[Dict[str, Any]] = None):
         """
         Inicjalizacja Chunkera z wyborem strategii i konfiguracją.
 
@@ -42,10 +48,12 @@ class NoLibChunker:
             chunk_strategy (str): Nazwa strategii (np. 'auto', 'sentences', 'markdown').
             chunk_size (int): Maksymalna długość fragmentu (w znakach).
             chunk_overlap (int): Liczba znaków nakładania się fragmentów (kontekst).
+            strategy_options (Dict): Dodatkowe parametry strategii (np. progi `nativeSemantic`).
         """
         self.chunk_strategy = chunk_strategy
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.strategy_options = strategy_options or {}
 
         logger.info(
             f"NoLibChunker initialized. Strategy: {chunk_strategy}, Max Chunk Size: {chunk_size}, Overlap: {chunk_overlap}")
@@ -76,6 +84,15 @@ class NoLibChunker:
             return MarkdownStrategy(self.chunk_size, self.chunk_overlap)
         elif self.chunk_strategy == "semanticChunker":
             return SemanticStrategy(self.chunk_size, self.chunk_overlap)
+        elif self.chunk_strategy == "semanticChunkerPooled":
+            # Wektory chunków z embeddingów zdań (bez drugiego przebiegu embeddingu)
+            return SemanticStrategy(self.chunk_size, self.chunk_overlap, reuse_embeddings=True)
+        elif self.chunk_strategy == "nativeSemantic":
+            return NativeSemanticStrategy(self.chunk_size, self.chunk_overlap, **self.strategy_options)
+        elif self.chunk_strategy in ["xml", "xmlStructure"]:
+            return XmlStructureStrategy(self.chunk_size, self.chunk_overlap)
+        elif self.chunk_strategy in ["json", "jsonStructure"]:
+            return JsonStructureStrategy(self.chunk_size, self.chunk_overlap)
         else:
             # Fallback - domyślnie zdania
             logger.warning(f"Nieznana strategia '{self.chunk_strategy}', używam SentencesStrategy.")
@@ -98,82 +115,119 @@ class NoLibChunker:
     # =========================================================================
     def process_content(self, content: str, base_metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """
-        ### Główny Pipeline Przetwarzania
+        ### Główny Pipeline Przetwarzania (format słownikowy)
 
         Ujednolica interfejs z `LangChainChunker`. Dzięki temu reszta aplikacji
         nie musi wiedzieć, którego chunkera używa.
 
-        **Etapy procesu:**
-        1.  **Primary Split:** Wywołanie strategii logicznej (np. sentences/markdown).
-        2.  **Safety Net (`_enforce_limit`):** Sprawdzenie, czy chunki nie przekroczyły limitu znaków.
-        3.  **Metadata Injection & Formatting:** Opakowanie stringów w słowniki i nadanie UUID.
+        Zwraca listę `{"text", "metadata"(płaski payload)[, "vector"]}`.
+        Pipeline ingestii korzysta bezpośrednio z kompaktowej `process_batch`.
 
         Args:
             content (str): Tekst do podziału.
             base_metadata (Dict): Metadane pliku źródłowego (np. nazwa pliku).
         """
+        return self.process_batch(content, base_metadata).to_dicts()
+
+    def process_batch(self, content: str, base_metadata: Dict[str, Any] = None) -> ChunkBatch:
+        """
+        ### Główny Pipeline Przetwarzania (format kolumnowy)
+
+        **Etapy procesu:**
+        1.  **Primary Split:** Wywołanie strategii logicznej (np. sentences/markdown).
+        2.  **Safety Net (`_enforce_limit` / `_enforce_limit_spans`):** Sprawdzenie, czy chunki nie przekroczyły limitu znaków.
+        3.  **Formatting:** Rekordy `ChunkRecord` z UUID w `ChunkBatch` - metadane pliku zapisane raz,
+            przy chunku tylko jego własne metadane (np. offsety, XPath).
+
+        Strategie spanowe (sentences/markdown/fixed) działają na indeksach aż do kroku 3,
+        a `char_start`/`char_end` każdego chunka trafiają do payloadu.
+        """
+        if base_metadata is None:
+            base_metadata = {}
+
+        batch = ChunkBatch.for_file(base_metadata)
         if not content:
-            return []
+            return batch
+
+        strategy = self._get_strategy(content)
+
+        if strategy.supports_spans:
+            # 1. Strategia zwraca spany (start, end) nad oryginalnym tekstem (mogą być za długie!)
+            # 2. Hard Limit Enforcer na indeksach - bez kopiowania tekstu
+            spans: List[Span] = self._enforce_limit_spans(strategy.split_spans(content))
+
+            # Materializacja: jedyne miejsce, w którym powstają stringi chunków.
+            # Offsety trafiają do payloadu (pozwalają odtworzyć sąsiedztwo chunków w pliku).
+            safe_chunks = [
+                (content[start:end], {"char_start": start, "char_end": end})
+                for start, end in spans
+            ]
+        else:
+            # 1. Pobieramy surowe stringi ze strategii (mogą być za długie!)
+            # Każdy chunk niesie własne metadane strategii (np. XPath dla XML), domyślnie puste.
+            raw_chunks: List[Tuple[str, Dict[str, Any]]] = strategy.split_with_metadata(content)
 
+            # 2. Hard Limit Enforcer (Bezpiecznik)
+            # Gwarantuje, że żaden chunk nie przekroczy chunk_size.
+            safe_chunks = self._enforce_limit(raw_chunks)
+
+        # 3. Formatowanie do kolumnowej paczki
+        self._add_chunks(batch, safe_chunks)
+        return batch
+
+    def supports_stream(self) -> bool:
+        """Czy wybrana strategia czyta tekst ze strumienia (`process_stream`)."""
+        return self._get_strategy("").supports_stream
+
+    def process_stream(self, stream: TextIO, base_metadata: Dict[str, Any] = None,
+                       max_chunks: int = 256) -> Generator[ChunkBatch, None, None]:
+        """
+        ### Pipeline strumieniowy (pliki większe niż RAM)
+
+        Wariant `process_batch` dla otwartego pliku: strategia (`supports_stream`, np. `jsonStructure`)
+        czyta strumień porcjami, a chunki są oddawane paczkami po `max_chunks`.
+        W pamięci jest tylko bieżąca paczka - ani tekst pliku, ani lista wszystkich chunków.
+
+        Etapy 2-3 (`_enforce_limit`, formatowanie) jak w `process_batch`; indeksy chunków
+        (a więc ID) biegną dalej między paczkami.
+        """
         if base_metadata is None:
             base_metadata = {}
 
-        # 1. Pobieramy surowe stringi ze strategii (mogą być za długie!)
-        raw_chunks: List[str] = self.split_text(content)
+        strategy = self._get_strategy("")
+        if not strategy.supports_stream:
+            raise ValueError(f"Strategia '{self.chunk_strategy}' nie obsługuje strumieni.")
 
-        # 2. Hard Limit Enforcer (Bezpiecznik)
-        # Gwarantuje, że żaden chunk nie przekroczy chunk_size.
-        safe_chunks: List[str] = self._enforce_limit(raw_chunks)
+        raw_chunks = strategy.iter_stream_with_metadata(stream)
+        first_index = 0
+        while group := list(islice(raw_chunks, max_chunks)):
+            batch = ChunkBatch.for_file(base_metadata)
+            self._add_chunks(batch, self._enforce_limit(group), first_index)
+            first_index += len(batch)
+            yield batch
 
-        # 3. Formatowanie do ujednoliconego standardu (List[Dict])
-        results = []
-        for idx, chunk_text in enumerate(safe_chunks):
+    def _add_chunks(self, batch: ChunkBatch, safe_chunks: List[Tuple[str, Dict[str, Any]]],
+                    first_index: int = 0) -> None:
+        """
+        Krok 3 pipeline'u: nadaje chunkom ID i dopisuje je do paczki.
+        `first_index` - numer pierwszego chunka w pliku (paczki z `process_stream`).
+        """
+        source_uri = batch.shared["source"]
+        for idx, (chunk_text, chunk_metadata) in enumerate(safe_chunks, start=first_index):
             # A. Przygotowanie ID
-            source_uri = base_metadata.get("source", "unknown")
             unique_str = f"{source_uri}_{idx}_{chunk_text[:20]}"
             chunk_id = hashlib.md5(unique_str.encode("utf-8")).hexdigest()
 
-            # B. Separacja znanych pól od "extra"
-            # Wyciągamy znane pola ze słownika loadera, reszta idzie do extra_data
-            known_fields = {
-                "source": source_uri,
-                "title": base_metadata.get("title"),
-                "url": base_metadata.get("url"),
-                "extension": base_metadata.get("extension"),
-                "domain": base_metadata.get("domain"),
-                "tags": base_metadata.get("tags", []),
-                "page_number": base_metadata.get("page_number")
-            }
-
-            # Wszystko co nie jest znane, trafia do extra
-            extras = {k: v for k, v in base_metadata.items() if k not in known_fields}
-
-            # C. Instancjalizacja Dataclass
-            meta_obj = ChunkMetadata(
-                source=known_fields["source"],
-                phrase=chunk_text,  # Mandatory content
-                phrase_metadata_id=chunk_id,  # Mandatory ID
-
-                # Opcjonalne
-                title=known_fields["title"],
-                url=known_fields["url"],
-                extension=known_fields["extension"],
-                domain=known_fields["domain"],
-                tags=known_fields["tags"],
-                page_number=known_fields["page_number"],
-
-                extra_data=extras
-            )
-
-            # D. Budowanie wyniku
-            results.append({
-                "text": chunk_text,  # Do embeddingu
-                "metadata": meta_obj.to_payload()  # Do bazy (płaski słownik)
-            })
-
-        return results
-
-    def _enforce_limit(self, chunks: List[str]) -> List[str]:
+            # B. Gotowy wektor (jeśli strategia go policzyła) nie trafia do payloadu.
+            # Pola schematu pliku mają priorytet nad metadanymi strategii.
+            precomputed_vector = chunk_metadata.pop(PRECOMPUTED_VECTOR_KEY, None)
+            for key in SCHEMA_FIELDS:
+                if key in batch.shared:
+                    chunk_metadata.pop(key, None)
+
+            batch.add(chunk_text, chunk_id, chunk_metadata, precomputed_vector)
+
+    def _enforce_limit(self, chunks: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
         """
         ### Metoda pomocnicza: "Bezpiecznik rozmiaru" (Hard Limit Enforcer - NoLib Version)
 
@@ -188,14 +242,21 @@ class NoLibChunker:
         **Dlaczego implementacja ręczna?**
         W przeciwieństwie do `LangChainChunker`, tutaj nie importujemy `RecursiveCharacterTextSplitter`,
         aby zachować klasę lekką i niezależną od bibliotek zewnętrznych (Pure Python).
+
+        Pod-kawałki dziedziczą metadane chunka-rodzica (np. XPath), ale nie jego gotowy wektor.
+        Offsety `char_start`/`char_end` rodzica są przeliczane dla każdego pod-kawałka
+        (inaczej pakowanie kontekstu uznałoby je za ten sam fragment pliku).
         """
         final_chunks = []
 
-        for chunk in chunks:
+        for chunk, chunk_metadata in chunks:
             if len(chunk) <= self.chunk_size:
-                final_chunks.append(chunk)
+                final_chunks.append((chunk, chunk_metadata))
             else:
                 # Jeśli chunk jest za duży -> tniemy pętlą (logika FixedStrategy)
+                # Wektor całości nie opisuje pod-kawałków - zostaną zembeddowane w pipeline
+                chunk_metadata = {k: v for k, v in chunk_metadata.items() if k != PRECOMPUTED_VECTOR_KEY}
+                parent_start = chunk_metadata.get("char_start")
                 start = 0
                 step = self.chunk_size - self.chunk_overlap
 
@@ -207,7 +268,12 @@ class NoLibChunker:
                     end = start + self.chunk_size
                     # Wycinamy pod-kawałek
                     sub_chunk = chunk[start:end]
-                    final_chunks.append(sub_chunk)
+                    sub_metadata = dict(chunk_metadata)
+                    if isinstance(parent_start, int):
+                        # Offsety pod-kawałka względem pliku (chunk = content[char_start:char_end])
+                        sub_metadata["char_start"] = parent_start + start
+                        sub_metadata["char_end"] = parent_start + min(end, len(chunk))
+                    final_chunks.append((sub_chunk, sub_metadata))
 
                     # Warunek stopu, jeśli dotarliśmy do końca
                     if end >= len(chunk):
@@ -216,3 +282,34 @@ class NoLibChunker:
                     start += step
 
         return final_chunks
+
+    def _enforce_limit_spans(self, spans: List[Span]) -> List[Span]:
+        """
+        ### Bezpiecznik rozmiaru w wersji spanowej (zero-copy)
+
+        Ta sama logika co `_enforce_limit` (okno `chunk_size` przesuwane o `chunk_size - chunk_overlap`),
+        ale wyłącznie na indeksach - zbyt długi span jest dzielony na pod-spany bez wycinania tekstu.
+        """
+        step = self.chunk_size - self.chunk_overlap
+        # Zabezpieczenie przed pętlą nieskończoną (gdyby overlap >= size)
+        if step <= 0:
+            step = self.chunk_size
+
+        # Szybka ścieżka: wszystkie spany mieszczą się w limicie
+        if all(end - start <= self.chunk_size for start, end in spans):
+            return spans
+
+        final_spans = []
+        for start, end in spans:
+            if end - start <= self.chunk_size:
+                final_spans.append((start, end))
+                continue
+
+            while start < end:
+                sub_end = min(start + self.chunk_size, end)
+                final_spans.append((start, sub_end))
+                if sub_end >= end:
+                    break
+                start += step
+
+        return final_spans
@@ -1,5 +1,25 @@
+import re
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Tuple, Dict, Any, Iterator, TextIO
+
+# Fragment tekstu jako widok na oryginał: (start, end) - bez kopiowania znaków
+Span = Tuple[int, int]
+
+_NON_WHITESPACE = re.compile(r"\S")
+
+
+def strip_span(text: str, start: int, end: int) -> Span:
+    """
+    Odpowiednik `text[start:end].strip()` działający na indeksach.
+    Zwraca span bez białych znaków na brzegach (pusty span, jeśli fragment jest pusty).
+    """
+    match = _NON_WHITESPACE.search(text, start, end)
+    if match is None:
+        return start, start
+    start = match.start()
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
 
 
 class BaseNoLibStrategy(ABC):
@@ -8,8 +28,22 @@ class BaseNoLibStrategy(ABC):
 
     Definiuje interfejs dla wszystkich strategii, które nie wymagają ciężkich bibliotek (poza opcjonalnym Semantic).
     Gromadzi wspólną logikę, taką jak obsługa `chunk_overlap`.
+
+    **Spany (zero-copy):**
+    Strategie oparte o pozycje w tekście (`supports_spans = True`) implementują `split_spans`
+    i zwracają pary `(start, end)` nad oryginalnym tekstem. Stringi powstają dopiero raz,
+    przy materializacji wyniku w `NoLibChunker`.
+
+    **Strumienie:**
+    Strategie z `supports_stream = True` implementują `iter_stream_with_metadata` i czytają
+    otwarty plik porcjami (pliki większe niż RAM, `NoLibChunker.process_stream`).
     """
 
+    # True -> strategia implementuje split_spans (fragmenty są widokami na oryginalny tekst)
+    supports_spans: bool = False
+    # True -> strategia implementuje iter_stream_with_metadata (tekst czytany ze strumienia)
+    supports_stream: bool = False
+
     def __init__(self, chunk_size: int, chunk_overlap: int):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
@@ -22,34 +56,53 @@ class BaseNoLibStrategy(ABC):
         """
         pass
 
-    def _apply_overlap(self, chunks: List[str]) -> List[str]:
+    def split_spans(self, text: str) -> List[Span]:
         """
-        ### Metoda pomocnicza: Ręczna obsługa Overlapu
+        Zwraca fragmenty jako spany `(start, end)` nad `text`.
+        Implementowane przez strategie z `supports_spans = True`.
+        """
+        raise NotImplementedError(f"{type(self).__name__} nie obsługuje spanów.")
+
+    def split_with_metadata(self, text: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Wariant `split_text` zwracający pary (tekst, metadane chunka).
+
+        Domyślnie metadane są puste. Strategie strukturalne (np. XML) nadpisują tę metodę,
+        aby przekazać informacje o pochodzeniu fragmentu (np. XPath) do `NoLibChunker`.
+        """
+        return [(chunk, {}) for chunk in self.split_text(text)]
+
+    def iter_stream_with_metadata(self, stream: TextIO) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Wariant `split_with_metadata` dla otwartego strumienia tekstu - pary (tekst, metadane)
+        są oddawane na bieżąco, bez wczytywania całego pliku.
+        Implementowane przez strategie z `supports_stream = True`.
+        """
+        raise NotImplementedError(f"{type(self).__name__} nie obsługuje strumieni.")
+
+    def _apply_overlap(self, spans: List[Span]) -> List[Span]:
+        """
+        ### Metoda pomocnicza: Ręczna obsługa Overlapu (arytmetyka spanów)
 
         **Co robi:**
-        Bierze listę pociętych fragmentów i dokleja końcówkę poprzedniego fragmentu
-        na początek bieżącego.
+        Przesuwa początek każdego spana (poza pierwszym) wstecz, tak aby obejmował
+        końcówkę poprzedniego fragmentu (maks. `chunk_overlap` znaków, nie dalej niż jego początek).
 
         **Dlaczego:**
         Większość prostych metod podziału (np. split by regex) ucina kontekst.
         Dzięki overlapowi, jeśli zdanie jest przecięte między chunkami,
         model AI ma szansę zobaczyć jego brakującą część w sąsiednim chunku.
 
-        **Zmiana w refaktoringu:**
-        Metoda została przeniesiona do klasy bazowej, aby strategie `Sentences` i `Markdown`
-        mogły z niej dziedziczyć bez powielania kodu.
-        """
-        if self.chunk_overlap <= 0 or len(chunks) < 2:
-            return chunks
-
-        overlapped = []
-        for i, chunk in enumerate(chunks):
-            if i == 0:
-                overlapped.append(chunk)
-            else:
-                # Pobieramy końcówkę poprzedniego chunka
-                # Zabezpieczenie: bierzemy overlap, ale nie więcej niż długość chunka
-                overlap_len = min(len(chunks[i - 1]), self.chunk_overlap)
-                overlap = chunks[i - 1][-overlap_len:]
-                overlapped.append(overlap + " " + chunk)
-        return overlapped
\ No newline at end of file
+        **Zero-copy:**
+        Wcześniej overlap był doklejany jako nowy string (`overlap + " " + chunk`).
+        Teraz to wyłącznie operacja na indeksach - tekst między fragmentami pochodzi
+        z oryginału (zamiast sztucznej spacji), a string powstaje dopiero przy materializacji.
+        """
+        if self.chunk_overlap <= 0 or len(spans) < 2:
+            return spans
+
+        overlapped = [spans[0]]
+        for (prev_start, prev_end), (start, end) in zip(spans, spans[1:]):
+            overlap_start = max(prev_start, prev_end - self.chunk_overlap)
+            overlapped.append((min(start, overlap_start), end))
+        return overlapped
@@ -1,4 +1,7 @@
 from .fixed import FixedStrategy
 from .sentences import SentencesStrategy
 from .markdown import MarkdownStrategy
-from .semantic import SemanticStrategy
\ No newline at end of file
+from .semantic import SemanticStrategy
+from .xml_structure import XmlStructureStrategy
+from .json_structure import JsonStructureStrategy
+from .native_semantic import NativeSemanticStrategy
\ No newline at end of file
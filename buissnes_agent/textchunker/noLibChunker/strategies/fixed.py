@@ -1,5 +1,5 @@
 from typing import List
-from ..base import BaseNoLibStrategy
+from ..base import BaseNoLibStrategy, Span
 
 
 class FixedStrategy(BaseNoLibStrategy):
@@ -18,22 +18,21 @@ class FixedStrategy(BaseNoLibStrategy):
     Przecina słowa w połowie, co może utrudnić zrozumienie przez LLM.
 
     **Implementacja:**
-    Ta strategia oblicza overlap matematycznie w pętli `while`, więc nie korzysta
-    z metody pomocniczej `_apply_overlap`.
+    Ta strategia oblicza overlap matematycznie w pętli `while` (na spanach),
+    więc nie korzysta z metody pomocniczej `_apply_overlap`.
     """
 
+    supports_spans = True
+
     def split_text(self, text: str) -> List[str]:
-        chunks = []
-        start = 0
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def split_spans(self, text: str) -> List[Span]:
+        length = len(text)
 
         # Obliczamy krok przesunięcia okna
         step = self.chunk_size - self.chunk_overlap
         if step <= 0:
             step = self.chunk_size  # Zabezpieczenie przed pętlą nieskończoną
 
-        while start < len(text):
-            end = start + self.chunk_size
-            chunks.append(text[start:end])
-            start += step
-
-        return chunks
\ No newline at end of file
+        return [(start, min(start + self.chunk_size, length)) for start in range(0, length, step)]
@@ -0,0 +1,58 @@
+import logging
+from typing import List, Tuple, Dict, Any, Iterator, TextIO
+
+from ..base import BaseNoLibStrategy
+from ...json_blocks import iter_json_blocks, JsonStreamError
+
+logger = logging.getLogger(__name__)
+
+
+class JsonStructureStrategy(BaseNoLibStrategy):
+    """
+    ### Strategia 6: JSON Structure (Strumieniowa)
+
+    **Jak działa:**
+    Tokenizuje JSON przyrostowo (`iter_json_blocks`) i tnie go na granicach rekordów
+    (elementy tablic, pola obiektów). Małe sąsiednie rekordy są grupowane do `chunk_size`,
+    a zbyt duże pod-drzewa rozkładane na ich dzieci.
+
+    **Zastosowanie:**
+    Eksporty JSON (listy rekordów, konfiguracje). Każdy chunk jest poprawnym fragmentem JSON,
+    a jego JSON Pointer trafia do metadanych (`json_pointer`, opcjonalnie `json_range`).
+
+    **Strumień:**
+    `iter_stream_with_metadata` czyta otwarty plik porcjami - w pamięci jest tylko bieżący
+    rekord, a nie tekst pliku (ścieżka `NoLibChunker.process_stream`).
+
+    **Fallback:**
+    Jeśli plik nie jest poprawnym JSON, zwracany jest cały tekst
+    (docięty później przez `_enforce_limit` w `NoLibChunker`).
+    """
+
+    supports_stream = True
+
+    def split_text(self, text: str) -> List[str]:
+        return [chunk for chunk, _ in self.split_with_metadata(text)]
+
+    def split_with_metadata(self, text: str) -> List[Tuple[str, Dict[str, Any]]]:
+        try:
+            return [(block.text, block.to_metadata()) for block in iter_json_blocks(text, self.chunk_size)]
+        except JsonStreamError as e:
+            logger.warning(f"Niepoprawny JSON ({e}). Zwracam tekst bez podziału strukturalnego.")
+            return [(text, {})]
+
+    def iter_stream_with_metadata(self, stream: TextIO) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        emitted = False
+        try:
+            for block in iter_json_blocks(stream, self.chunk_size):
+                emitted = True
+                yield block.text, block.to_metadata()
+        except JsonStreamError as e:
+            # Fallback tylko przed pierwszym rekordem - oddanych chunków nie da się cofnąć
+            if emitted or not stream.seekable():
+                raise
+            logger.warning(f"Niepoprawny JSON ({e}). Zwracam tekst bez podziału strukturalnego.")
+            stream.seek(0)
+            text = stream.read()
+            if text.strip():
+                yield text, {}
@@ -1,6 +1,9 @@
 import re
 from typing import List
-from ..base import BaseNoLibStrategy
+from ..base import BaseNoLibStrategy, Span, strip_span
+
+# Nagłówek Markdown (#, ##, ###) na początku linii
+_HEADER = re.compile(r'^#{1,3}\s', flags=re.MULTILINE)
 
 
 class MarkdownStrategy(BaseNoLibStrategy):
@@ -15,9 +18,22 @@ class MarkdownStrategy(BaseNoLibStrategy):
     Dokumentacja techniczna, README.md. Pozwala zachować logiczną spójność sekcji.
     """
 
+    supports_spans = True
+
     def split_text(self, text: str) -> List[str]:
-        # Dzieli tekst używając lookahead (?=...), co pozwala zachować nagłówek w następnym bloku
-        blocks = re.split(r'(?=^#{1,3}\s)', text, flags=re.MULTILINE)
-        blocks = [b.strip() for b in blocks if b.strip()]
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def split_spans(self, text: str) -> List[Span]:
+        # Granice bloków = pozycje nagłówków (nagłówek zostaje na początku swojego bloku)
+        boundaries = [m.start() for m in _HEADER.finditer(text)]
+        boundaries.append(len(text))
+
+        blocks = []
+        start = 0
+        for boundary in boundaries:
+            block = strip_span(text, start, boundary)
+            if block[1] > block[0]:
+                blocks.append(block)
+            start = boundary
 
-        return self._apply_overlap(blocks)
\ No newline at end of file
+        return self._apply_overlap(blocks)
@@ -0,0 +1,205 @@
+import logging
+import os
+import re
+from typing import List, Tuple, Dict, Any, Optional
+
+from ..base import BaseNoLibStrategy, Span, strip_span
+from ...sentence_pooling import pool_sentence_vectors, PRECOMPUTED_VECTOR_KEY, DEFAULT_MIN_COHESION
+
+logger = logging.getLogger(__name__)
+
+# Koniec zdania: białe znaki poprzedzone interpunkcją (.!?) - jak w SentencesStrategy
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+# Domyślne progi dla typów breakpointów (zgodne z langchain_experimental.SemanticChunker)
+DEFAULT_THRESHOLD_AMOUNTS = {
+    "percentile": 95.0,
+    "standard_deviation": 3.0,
+    "interquartile": 1.5,
+    "gradient": 95.0,
+}
+
+# Współdzielony klient embeddingów (jeden na proces, zamiast nowego klienta per plik)
+_EMBEDDING_CLIENT = None
+
+
+def _get_embedding_client():
+    global _EMBEDDING_CLIENT
+    if _EMBEDDING_CLIENT is None:
+        from openai import OpenAI
+
+        _EMBEDDING_CLIENT = OpenAI(
+            api_key=os.getenv("EMBEDDING_API_KEY"),
+            base_url=os.getenv("EMBEDDING_BASE_URL")
+        )
+    return _EMBEDDING_CLIENT
+
+
+def _as_bool(value: Any) -> bool:
+    # Wartości z ENV (APP__...) przychodzą jako stringi
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+class NativeSemanticStrategy(BaseNoLibStrategy):
+    """
+    ### Strategia 7: Native Semantic (numpy, bez LangChain)
+
+    Własna implementacja podziału semantycznego zamiast wrappera `SemanticChunker`.
+
+    **Jak działa:**
+    1. Dzieli tekst na zdania (spany nad oryginałem) i buduje zdania "z kontekstem"
+       (`buffer_size` sąsiadów z każdej strony).
+    2. Embeduje je dużymi paczkami (`batch_size`) przez jeden współdzielony klient OpenAI.
+    3. Składa wektory w ciągłą macierz float32, normalizuje wiersze i liczy odległości
+       kosinusowe sąsiednich zdań jednym wektorowym wyrażeniem numpy.
+    4. Wyznacza punkty podziału wg progu: `percentile`, `standard_deviation`,
+       `interquartile` lub `gradient`.
+    5. Grupy dłuższe niż `chunk_size` dzieli dalej w miejscu największej odległości
+       wewnątrz grupy (podział nadal "semantyczny", a nie sztywny).
+
+    **Wynik:**
+    Chunki niosą `char_start`/`char_end`, a przy `reuse_embeddings=True` również wektor
+    uśredniony z embeddingów zdań (pipeline pomija wtedy drugi embedding).
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int,
+                 threshold_type: str = "percentile",
+                 threshold_amount: Optional[float] = None,
+                 buffer_size: int = 1,
+                 batch_size: int = 256,
+                 reuse_embeddings: bool = False,
+                 min_cohesion: float = DEFAULT_MIN_COHESION):
+        super().__init__(chunk_size, chunk_overlap)
+
+        if threshold_type not in DEFAULT_THRESHOLD_AMOUNTS:
+            logger.warning(f"Nieznany typ progu '{threshold_type}', używam 'percentile'.")
+            threshold_type = "percentile"
+
+        self.threshold_type = threshold_type
+        self.threshold_amount = float(
+            threshold_amount if threshold_amount is not None else DEFAULT_THRESHOLD_AMOUNTS[threshold_type])
+        self.buffer_size = int(buffer_size)
+        self.batch_size = max(1, int(batch_size))
+        self.reuse_embeddings = _as_bool(reuse_embeddings)
+        self.min_cohesion = float(min_cohesion)
+        self.model = os.getenv("EMBEDDING_MODEL")
+
+    def split_text(self, text: str) -> List[str]:
+        return [chunk for chunk, _ in self.split_with_metadata(text)]
+
+    def split_with_metadata(self, text: str) -> List[Tuple[str, Dict[str, Any]]]:
+        import numpy as np
+
+        sentences = self._sentence_spans(text)
+        if len(sentences) < 2:
+            start, end = sentences[0] if sentences else strip_span(text, 0, len(text))
+            return [(text[start:end], {"char_start": start, "char_end": end})] if end > start else []
+
+        # 1-2. Embeddingi zdań z kontekstem -> ciągła macierz float32 (n, dim), wiersze znormalizowane
+        matrix = self._embed_sentences(text, sentences)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+
+        # 3. Odległości kosinusowe sąsiednich zdań (wektorowo, bez pętli w Pythonie)
+        distances = 1.0 - np.einsum("ij,ij->i", matrix[:-1], matrix[1:])
+
+        # 4. Punkty podziału: indeksy i, po których zdaniu i następuje cięcie
+        scores = self._breakpoint_scores(distances)
+        breakpoints = np.flatnonzero(scores > self._threshold(scores))
+        bounds = np.concatenate(([0], breakpoints + 1, [len(sentences)]))
+        groups = [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+        # 5. Respektowanie chunk_size (dalszy podział w miejscu największej odległości)
+        groups = self._fit_to_size(groups, sentences, distances)
+
+        vectors: List[Optional[List[float]]] = [None] * len(groups)
+        if self.reuse_embeddings:
+            vectors = pool_sentence_vectors(matrix, groups, self.min_cohesion)
+
+        results = []
+        for (first, last), vector in zip(groups, vectors):
+            start, end = sentences[first][0], sentences[last - 1][1]
+            chunk_metadata: Dict[str, Any] = {"char_start": start, "char_end": end}
+            if vector is not None:
+                chunk_metadata[PRECOMPUTED_VECTOR_KEY] = vector
+            results.append((text[start:end], chunk_metadata))
+        return results
+
+    def _sentence_spans(self, text: str) -> List[Span]:
+        spans = []
+        start = 0
+        for separator in _SENTENCE_BREAK.finditer(text):
+            span = strip_span(text, start, separator.start())
+            if span[1] > span[0]:
+                spans.append(span)
+            start = separator.end()
+        span = strip_span(text, start, len(text))
+        if span[1] > span[0]:
+            spans.append(span)
+        return spans
+
+    def _embed_sentences(self, text: str, sentences: List[Span]):
+        """Embeduje zdania z kontekstem paczkami po `batch_size` do macierzy float32."""
+        import numpy as np
+
+        count = len(sentences)
+        combined = [
+            text[sentences[max(0, i - self.buffer_size)][0]:sentences[min(count - 1, i + self.buffer_size)][1]]
+            .replace("\n", " ")
+            for i in range(count)
+        ]
+
+        client = _get_embedding_client()
+        matrix = None
+        for offset in range(0, count, self.batch_size):
+            batch = combined[offset:offset + self.batch_size]
+            response = client.embeddings.create(input=batch, model=self.model)
+            batch_vectors = np.asarray([item.embedding for item in response.data], dtype=np.float32)
+            if matrix is None:
+                # Prealokacja ciągłej macierzy wynikowej po poznaniu wymiaru
+                matrix = np.empty((count, batch_vectors.shape[1]), dtype=np.float32)
+            matrix[offset:offset + len(batch)] = batch_vectors
+        return matrix
+
+    def _breakpoint_scores(self, distances):
+        import numpy as np
+
+        if self.threshold_type == "gradient" and len(distances) > 1:
+            return np.gradient(distances)
+        return distances
+
+    def _threshold(self, scores) -> float:
+        import numpy as np
+
+        if self.threshold_type in ("percentile", "gradient"):
+            return float(np.percentile(scores, self.threshold_amount))
+        if self.threshold_type == "standard_deviation":
+            return float(scores.mean() + self.threshold_amount * scores.std())
+        # interquartile
+        q1, q3 = np.percentile(scores, [25, 75])
+        return float(scores.mean() + self.threshold_amount * (q3 - q1))
+
+    def _fit_to_size(self, groups: List[Span], sentences: List[Span], distances) -> List[Span]:
+        """
+        Dzieli grupy zdań przekraczające `chunk_size` w miejscu największej odległości
+        kosinusowej wewnątrz grupy. Pojedyncze zdanie dłuższe niż limit zostaje
+        (docina je `_enforce_limit` w `NoLibChunker`).
+        """
+        import numpy as np
+
+        fitted = []
+        stack = list(reversed(groups))
+        while stack:
+            first, last = stack.pop()
+            length = sentences[last - 1][1] - sentences[first][0]
+            if length <= self.chunk_size or last - first < 2:
+                fitted.append((first, last))
+                continue
+            # distances[i] to odległość między zdaniem i a i+1
+            cut = first + int(np.argmax(distances[first:last - 1])) + 1
+            stack.append((cut, last))
+            stack.append((first, cut))
+        return fitted
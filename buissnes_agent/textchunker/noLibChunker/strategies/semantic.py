@@ -1,7 +1,14 @@
 import os
 import logging
-from typing import List
+from typing import List, Tuple, Dict, Any
 from ..base import BaseNoLibStrategy
+from ...sentence_pooling import (
+    RecordingEmbeddings,
+    sentence_groups,
+    pool_sentence_vectors,
+    PRECOMPUTED_VECTOR_KEY,
+    DEFAULT_MIN_COHESION
+)
 
 # Logger lokalny dla strategii
 logger = logging.getLogger(__name__)
@@ -17,11 +24,18 @@ class SemanticStrategy(BaseNoLibStrategy):
     **Obsługa błędów:**
     Jeśli biblioteka `langchain_openai` nie jest zainstalowana, klasa zaloguje błąd,
     zamiast wywalać całą aplikację przy imporcie.
+
+    **Ponowne użycie wektorów (`reuse_embeddings=True`):**
+    `split_with_metadata` zwraca uśredniony wektor zdań chunka pod kluczem `_vector`,
+    dzięki czemu pipeline nie embeduje chunka drugi raz.
     """
 
-    def __init__(self, chunk_size: int, chunk_overlap: int):
+    def __init__(self, chunk_size: int, chunk_overlap: int,
+                 reuse_embeddings: bool = False, min_cohesion: float = DEFAULT_MIN_COHESION):
         super().__init__(chunk_size, chunk_overlap)
         self.splitter = None
+        self.recorder = None
+        self.min_cohesion = min_cohesion
 
         try:
             from langchain_openai import OpenAIEmbeddings
@@ -33,6 +47,11 @@ class SemanticStrategy(BaseNoLibStrategy):
                 api_key=os.getenv('EMBEDDING_API_KEY'),
                 check_embedding_ctx_length=False
             )
+            if reuse_embeddings:
+                # Proxy zapamiętuje embeddingi zdań liczone przez SemanticChunker
+                self.recorder = RecordingEmbeddings(embeddings)
+                embeddings = self.recorder
+
             # Inicjalizacja splittera
             self.splitter = SemanticChunker(
                 embeddings,
@@ -44,10 +63,29 @@ class SemanticStrategy(BaseNoLibStrategy):
             logger.error(f"Błąd inicjalizacji SemanticStrategy: {e}")
 
     def split_text(self, text: str) -> List[str]:
+        return [chunk for chunk, _ in self.split_with_metadata(text)]
+
+    def split_with_metadata(self, text: str) -> List[Tuple[str, Dict[str, Any]]]:
         if not self.splitter:
             logger.warning("Semantic splitter nie został zainicjowany. Zwracam tekst bez zmian.")
-            return [text]
+            return [(text, {})]
+
+        if self.recorder:
+            self.recorder.reset()
 
         # SemanticChunker zwraca obiekty Document, a NoLibChunker oczekuje listy stringów
         docs = self.splitter.create_documents([text])
-        return [doc.page_content for doc in docs]
\ No newline at end of file
+        chunks = [doc.page_content for doc in docs]
+
+        if not (self.recorder and self.recorder.vectors):
+            return [(chunk, {}) for chunk in chunks]
+
+        groups = sentence_groups(chunks, len(self.recorder.vectors), self.splitter.sentence_split_regex)
+        if not groups:
+            return [(chunk, {}) for chunk in chunks]
+
+        vectors = pool_sentence_vectors(self.recorder.vectors, groups, self.min_cohesion)
+        return [
+            (chunk, {PRECOMPUTED_VECTOR_KEY: vector} if vector is not None else {})
+            for chunk, vector in zip(chunks, vectors)
+        ]
@@ -0,0 +1,38 @@
+import logging
+import xml.etree.ElementTree as ET
+from typing import List, Tuple, Dict, Any
+
+from ..base import BaseNoLibStrategy
+from ...xml_blocks import iter_xml_blocks
+
+logger = logging.getLogger(__name__)
+
+
+class XmlStructureStrategy(BaseNoLibStrategy):
+    """
+    ### Strategia 5: XML/XSD Structure (Strumieniowa, iterparse)
+
+    **Jak działa:**
+    Parsuje dokument przyrostowo (`iter_xml_blocks`) i zwraca jeden chunk na każdy
+    "klocek" struktury: globalny `xs:complexType` / `xs:simpleType` / `xs:element` w XSD
+    lub blok komunikatu (np. `GrpHdr`, `CdtTrfTxInf`) w instancji XML.
+
+    **Zastosowanie:**
+    Schematy ISO 20022 (XSD) i przykładowe komunikaty. Definicja typu nigdy nie jest
+    cięta w przypadkowym miejscu, a XPath bloku trafia do metadanych chunka.
+
+    **Fallback:**
+    Jeśli dokument nie jest poprawnym XML, zwracany jest cały tekst
+    (docięty później przez `_enforce_limit` w `NoLibChunker`). Poprawny XML bez elementów
+    na głębokości bloku daje jeden chunk z elementem głównym (również docinany).
+    """
+
+    def split_text(self, text: str) -> List[str]:
+        return [chunk for chunk, _ in self.split_with_metadata(text)]
+
+    def split_with_metadata(self, text: str) -> List[Tuple[str, Dict[str, Any]]]:
+        try:
+            return [(block.text, block.to_metadata()) for block in iter_xml_blocks(text)]
+        except ET.ParseError as e:
+            logger.warning(f"Niepoprawny XML ({e}). Zwracam tekst bez podziału strukturalnego.")
+            return [(text, {})]
@@ -0,0 +1,95 @@
+import logging
+import re
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Klucz w metadanych chunka, pod którym strategia przekazuje gotowy wektor.
+# Chunkery wyciągają go do result["vector"] - nie trafia do payloadu Qdrant.
+PRECOMPUTED_VECTOR_KEY = "_vector"
+
+# Minimalna spójność chunka (norma średniej znormalizowanych wektorów zdań = średni cosinus
+# do centroidu). Poniżej progu wektor uśredniony słabo reprezentuje chunk -> re-embedding.
+DEFAULT_MIN_COHESION = 0.85
+
+# Regex podziału na zdania używany domyślnie przez SemanticChunker (langchain_experimental)
+DEFAULT_SENTENCE_SPLIT_REGEX = r"(?<=[.?!])\s+"
+
+
+class RecordingEmbeddings:
+    """
+    ### Proxy Embeddingów rejestrujące wektory zdań
+
+    Opakowuje model embeddingów przekazywany do `SemanticChunker`. Każde wywołanie
+    `embed_documents` (embeddingi zdań liczone w celu znalezienia punktów podziału)
+    jest zapamiętywane, aby można je było ponownie wykorzystać jako wektory chunków
+    zamiast drugiego przebiegu w `SearchKnowledgebase._embed`.
+    """
+
+    def __init__(self, embeddings: Any):
+        self.embeddings = embeddings
+        self.vectors: List[List[float]] = []
+
+    def reset(self) -> None:
+        self.vectors = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.embeddings.embed_documents(texts)
+        self.vectors.extend(vectors)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+def sentence_groups(chunks: List[str], sentence_count: int,
+                    sentence_split_regex: str = DEFAULT_SENTENCE_SPLIT_REGEX) -> Optional[List[Tuple[int, int]]]:
+    """
+    Odtwarza zakresy zdań `[start, end)` składających się na kolejne chunki.
+
+    `SemanticChunker` skleja kolejne zdania spacją, więc ponowny podział chunka tym samym
+    regexem zwraca jego zdania. Jeśli suma się nie zgadza (np. zdanie bez interpunkcji
+    na granicy), zwraca None - wtedy wektory nie są wykorzystywane.
+    """
+    groups = []
+    start = 0
+    for chunk in chunks:
+        count = len(re.split(sentence_split_regex, chunk))
+        groups.append((start, start + count))
+        start += count
+
+    if start != sentence_count:
+        logger.warning(f"Niezgodna liczba zdań ({start} vs {sentence_count}). Pomijam ponowne użycie wektorów.")
+        return None
+    return groups
+
+
+def pool_sentence_vectors(sentence_vectors: Any, groups: List[Tuple[int, int]],
+                          min_cohesion: float = DEFAULT_MIN_COHESION) -> List[Optional[List[float]]]:
+    """
+    ### Wektor chunka z już policzonych embeddingów zdań (mean pooling)
+
+    Dla każdej grupy zdań liczy średnią znormalizowanych wektorów. Norma tej średniej
+    to średni cosinus zdań do centroidu (spójność chunka):
+    - >= `min_cohesion` -> zwracamy znormalizowany centroid jako wektor chunka,
+    - < `min_cohesion` -> None (chunk zostanie zembeddowany ponownie w pipeline).
+    """
+    import numpy as np
+
+    matrix = np.asarray(sentence_vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    unit = matrix / norms
+
+    pooled: List[Optional[List[float]]] = []
+    for start, end in groups:
+        if end <= start:
+            pooled.append(None)
+            continue
+        centroid = unit[start:end].mean(axis=0)
+        cohesion = float(np.linalg.norm(centroid))
+        if cohesion < min_cohesion or cohesion == 0.0:
+            pooled.append(None)
+        else:
+            pooled.append((centroid / cohesion).tolist())
+    return pooled
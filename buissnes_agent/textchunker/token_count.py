@@ -0,0 +1,50 @@
+import logging
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# LICZBA TOKENÓW CHUNKA (liczona raz, przy ingestii)
+# ==============================================================================
+# Pole payloadu `token_count` pozwala narzędziu RAG dopasować kontekst do budżetu
+# tokenów bez ponownej tokenizacji wyników przy każdym zapytaniu.
+# Tokenizer modelu LLM (np. Llama/Hermes) różni się od kodowań tiktoken -
+# wartość jest przybliżeniem, wystarczającym do budżetowania kontekstu.
+
+TOKEN_COUNT_FIELD = "token_count"
+DEFAULT_ENCODING = "cl100k_base"
+
+# Przybliżenie bez tokenizera (tekst angielski/techniczny: ~4 znaki na token)
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=4)
+def _get_encoding(encoding_name: str):
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(encoding_name)
+    except ImportError:
+        logger.warning("Brak biblioteki tiktoken - liczba tokenów szacowana z liczby znaków.")
+    except Exception as e:
+        # np. brak dostępu do pliku BPE (środowisko offline)
+        logger.warning(f"Nie udało się wczytać kodowania {encoding_name}: {e}. Liczba tokenów szacowana.")
+    return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Przybliżona liczba tokenów z długości tekstu (zaokrąglenie w górę)."""
+    return -(-len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def count_tokens(text: str, encoding_name: Optional[str] = DEFAULT_ENCODING) -> int:
+    """
+    Liczba tokenów tekstu w kodowaniu tiktoken `encoding_name`.
+    Bez tiktoken (lub bez kodowania) zwraca przybliżenie `estimate_tokens`.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(encoding_name) if encoding_name else None
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,221 @@
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+from dataclasses import dataclass
+from typing import Dict, Generator, List, Optional, TextIO, Union
+
+# Przestrzeń nazw XML Schema (XSD)
+XSD_NAMESPACE = "http://www.w3.org/2001/XMLSchema"
+
+# Wielkość porcji tekstu podawanej do parsera przyrostowego (znaki)
+_FEED_SIZE = 64 * 1024
+
+
+@dataclass
+class XmlBlock:
+    """
+    Pojedynczy "klocek" dokumentu XML/XSD (np. xs:complexType, xs:element, GrpHdr).
+    """
+    xpath: str  # Ścieżka XPath bloku (np. /xs:schema/xs:complexType[@name='GroupHeader93'])
+    tag: str  # Nazwa lokalna tagu (np. complexType)
+    name: Optional[str]  # Wartość atrybutu @name (jeśli istnieje)
+    text: str  # Zserializowany fragment XML
+
+    def to_metadata(self) -> Dict[str, str]:
+        """Metadane bloku doklejane do chunka (trafiają do payloadu Qdrant)."""
+        meta = {"xpath": self.xpath, "xml_tag": self.tag}
+        if self.name:
+            meta["xml_name"] = self.name
+        return meta
+
+
+def _split_tag(tag: str) -> tuple[str, str]:
+    """Rozbija '{uri}local' na (uri, local)."""
+    if tag.startswith("{"):
+        uri, local = tag[1:].split("}", 1)
+        return uri, local
+    return "", tag
+
+
+def _to_xml(elem: ET.Element, uri_to_prefix: Dict[str, str]) -> str:
+    """
+    Serializacja bloku z prefiksami z dokumentu (lokalna mapa, bez globalnego
+    `ET.register_namespace`). Przestrzeń bez prefiksu staje się domyślną (`xmlns=`),
+    a deklaracje używanych przestrzeni trafiają do elementu bloku.
+    """
+    declared: Dict[str, str] = {}  # uri -> prefiks ("" = przestrzeń domyślna)
+
+    def _name(tag: str, is_attribute: bool = False) -> str:
+        uri, local = _split_tag(tag)
+        if not uri:
+            return local
+        if uri not in declared:
+            prefix = uri_to_prefix.get(uri)
+            if prefix is None:
+                # Druga przestrzeń bez prefiksu (lub atrybut) - sztuczny, lokalny prefiks
+                prefix = "" if not is_attribute and "" not in declared.values() else f"ns{len(declared)}"
+            declared[uri] = prefix
+        prefix = declared[uri]
+        return f"{prefix}:{local}" if prefix else local
+
+    parts: List[str] = []
+
+    def _walk(node: ET.Element) -> None:
+        parts.append("<" + _name(node.tag))
+        for key, value in node.attrib.items():
+            parts.append(f" {_name(key, is_attribute=True)}={quoteattr(value)}")
+        if node.text or len(node):
+            parts.append(">")
+            parts.append(escape(node.text or ""))
+            for child in node:
+                _walk(child)
+                parts.append(escape(child.tail or ""))
+            parts.append(f"</{_name(node.tag)}>")
+        else:
+            parts.append(" />")
+
+    _walk(elem)
+    declarations = "".join(
+        f" xmlns:{prefix}={quoteattr(uri)}" if prefix else f" xmlns={quoteattr(uri)}"
+        for uri, prefix in declared.items()
+    )
+    parts.insert(1, declarations)
+    return "".join(parts).strip()
+
+
+def iter_xml_blocks(source: Union[str, TextIO], block_depth: Optional[int] = None) -> Generator[XmlBlock, None, None]:
+    """
+    ### Strumieniowy podział XML/XSD na bloki (iterparse)
+
+    **Jak działa:**
+    1. Źródło (tekst albo strumień, np. otwarty plik) jest podawane do `XMLPullParser`
+       porcjami (`_FEED_SIZE`), zdarzenia `start`/`end` są konsumowane na bieżąco.
+    2. Gdy zamyka się element na głębokości `block_depth`, cały jego pod-drzewo jest serializowane
+       jako jeden blok (z XPath), a następnie usuwane z drzewa (`clear()` + `remove()`).
+
+    **Głębokość bloku (`block_depth`):**
+    - XSD (root = `xs:schema`): 1 -> każdy globalny `complexType`/`simpleType`/`element`.
+    - Instancja komunikatu (Document/FIToFICstmrCdtTrf/GrpHdr): 2 -> każdy blok komunikatu.
+
+    **Treść poza blokami:**
+    - Dokument bez elementów na głębokości bloku (np. płaski `<Document><a/><b/></Document>`)
+      daje jeden blok z całym elementem głównym - nigdy zero bloków.
+    - Tekst elementów powyżej głębokości bloku (także między blokami) trafia do osobnych
+      bloków z XPath swojego elementu, emitowanych po blokach strukturalnych.
+
+    **Pamięć:**
+    Dzięki usuwaniu przetworzonych elementów drzewo w pamięci nigdy nie jest większe niż
+    jeden blok (plus tekst spoza bloków). Tekst źródłowy nie jest kopiowany, ale gdy
+    `source` jest napisem, cały dokument i tak jest w pamięci - stałe zużycie niezależne
+    od rozmiaru pliku daje dopiero strumień.
+
+    Raises:
+        xml.etree.ElementTree.ParseError: Jeśli dokument nie jest poprawnym XML.
+    """
+    parser = ET.XMLPullParser(events=("start-ns", "start", "end"))
+    uri_to_prefix: Dict[str, str] = {}
+    stack: List[ET.Element] = []
+    path: List[str] = []
+    # Liczniki rodzeństwa (per rodzic) do pozycyjnych predykatów XPath, np. CdtTrfTxInf[2]
+    sibling_counters: List[Dict[str, int]] = [{}]
+    # Tekst między blokami (ogony usuniętych bloków) per poziom stosu
+    loose_text: List[List[str]] = []
+    loose_blocks: List[XmlBlock] = []
+    # Ostatni wyemitowany blok: jego ogon (tekst za znacznikiem końca) parser ustawia dopiero
+    # przy kolejnym zdarzeniu - wtedy przenosimy go do rodzica i czyścimy element
+    detached: Optional[ET.Element] = None
+    blocks_emitted = 0
+    depth = block_depth
+
+    def _qualified(tag: str) -> str:
+        uri, local = _split_tag(tag)
+        prefix = uri_to_prefix.get(uri)
+        return f"{prefix}:{local}" if prefix else local
+
+    def _settle_detached() -> None:
+        nonlocal detached
+        if detached is None:
+            return
+        tail = (detached.tail or "").strip()
+        if tail and loose_text:
+            loose_text[-1].append(tail)
+        detached.clear()
+        detached = None
+
+    def _drain() -> Generator[XmlBlock, None, None]:
+        nonlocal depth, detached, blocks_emitted
+        for event, payload in parser.read_events():
+            if event == "start-ns":
+                prefix, uri = payload
+                if prefix and uri not in uri_to_prefix:
+                    uri_to_prefix[uri] = prefix
+                continue
+
+            _settle_detached()
+            elem = payload
+            if event == "start":
+                if depth is None:
+                    # Heurystyka: root xs:schema -> bloki na poziomie 1, komunikat -> poziom 2
+                    depth = 1 if _split_tag(elem.tag) == (XSD_NAMESPACE, "schema") else 2
+
+                qname = _qualified(elem.tag)
+                name = elem.get("name")
+                counters = sibling_counters[-1]
+                counters[qname] = counters.get(qname, 0) + 1
+                if name:
+                    step = f"{qname}[@name='{name}']"
+                elif stack:
+                    step = f"{qname}[{counters[qname]}]"
+                else:
+                    step = qname
+
+                stack.append(elem)
+                path.append(step)
+                sibling_counters.append({})
+                loose_text.append([])
+                continue
+
+            # event == "end"
+            level = len(stack) - 1
+            _, local = _split_tag(elem.tag)
+            xpath = "/" + "/".join(path)
+            if level == depth:
+                blocks_emitted += 1
+                yield XmlBlock(xpath=xpath, tag=local, name=elem.get("name"), text=_to_xml(elem, uri_to_prefix))
+                # Zwalniamy pamięć - rodzic nie trzyma już referencji do bloku
+                if len(stack) > 1:
+                    stack[-2].remove(elem)
+                detached = elem
+            elif level < depth:
+                texts = [elem.text.strip()] if elem.text and elem.text.strip() else []
+                texts += loose_text[-1]
+                texts += [child.tail.strip() for child in elem if child.tail and child.tail.strip()]
+                if level == 0:
+                    if blocks_emitted == 0:
+                        # Brak elementów na głębokości bloku - cały dokument jako jeden blok
+                        yield XmlBlock(xpath=xpath, tag=local, name=elem.get("name"),
+                                       text=_to_xml(elem, uri_to_prefix))
+                    else:
+                        if texts:
+                            loose_blocks.append(XmlBlock(xpath=xpath, tag=local, name=elem.get("name"),
+                                                         text=" ".join(texts)))
+                        yield from loose_blocks
+                elif texts:
+                    loose_blocks.append(XmlBlock(xpath=xpath, tag=local, name=elem.get("name"),
+                                                 text=" ".join(texts)))
+
+            stack.pop()
+            path.pop()
+            sibling_counters.pop()
+            loose_text.pop()
+
+    if isinstance(source, str):
+        pieces = (source[offset:offset + _FEED_SIZE] for offset in range(0, len(source), _FEED_SIZE))
+    else:
+        pieces = iter(lambda: source.read(_FEED_SIZE), "")
+
+    for piece in pieces:
+        parser.feed(piece)
+        yield from _drain()
+
+    parser.close()
+    yield from _drain()
@@ -0,0 +1,124 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .metrics import LatencyStats
+
+
+class ToolBusyError(Exception):
+    """Narzędzie osiągnęło limit równoczesnych wywołań i kolejki (backpressure)."""
+
+    def __init__(self, tool_name: str, reason: str):
+        super().__init__(f"{tool_name}: {reason}")
+        self.tool_name = tool_name
+        self.reason = reason
+
+
+class ToolBulkhead:
+    """
+    ### Grodzie (bulkhead) dla narzędzia MCP: limit współbieżności + ograniczona kolejka
+
+    Wszystkie narzędzia korzystały z domyślnej puli `asyncio.to_thread` - lawina wolnych
+    wywołań Confluence/Wikipedii zajmowała wątki potrzebne narzędziu ISO RAG, a nadmiar
+    ruchu nie był nigdy odrzucany. Każde narzędzie dostaje własną grodź:
+
+    - `max_concurrency`: liczba równoczesnych wykonań (semafor, dla funkcji
+      synchronicznych także rozmiar WŁASNEJ puli wątków),
+    - `max_queue`: ile wywołań może czekać na wolny slot - kolejne są odrzucane od razu,
+    - `queue_timeout`: maksymalny czas oczekiwania w kolejce (0 = bez limitu).
+
+    Odrzucenie to `ToolBusyError` - serwer zamienia go na czytelny wynik "zajęte".
+
+    **Metryki (`stats()`):** aktywne / oczekujące wywołania, maks. głębokość kolejki,
+    odrzucenia, czas oczekiwania na slot (p50 / p95).
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 8, max_queue: int = 16, queue_timeout: float = 10.0):
+        self.name = name
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = float(queue_timeout or 0)
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self._stats_lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_time = LatencyStats()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                thread_name_prefix=f"tool-{self.name}")
+        return self._executor
+
+    async def run(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Wykonuje korutynę `factory()` w ramach limitów grodzi."""
+        with self._stats_lock:
+            if self.queued >= self.max_queue and self._semaphore.locked():
+                self.rejected += 1
+                raise ToolBusyError(self.name, f"kolejka pełna ({self.queued}/{self.max_queue})")
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        queued_at = time.perf_counter()
+        try:
+            if self.queue_timeout and self._semaphore.locked():
+                async with asyncio.timeout(self.queue_timeout):
+                    await self._semaphore.acquire()
+            else:
+                # Wolny slot: acquire bez przełączenia korutyny - licznik kolejki od razu aktualny
+                await self._semaphore.acquire()
+        except TimeoutError:
+            with self._stats_lock:
+                self.queued -= 1
+                self.timeouts += 1
+                self.rejected += 1
+            raise ToolBusyError(self.name, f"brak wolnego slotu w {self.queue_timeout:.0f} s")
+        except BaseException:
+            with self._stats_lock:
+                self.queued -= 1
+            raise
+
+        with self._stats_lock:
+            self.queued -= 1
+            self.active += 1
+            self.wait_time.record(time.perf_counter() - queued_at)
+        try:
+            return await factory()
+        finally:
+            self._semaphore.release()
+            with self._stats_lock:
+                self.active -= 1
+                self.completed += 1
+
+    def run_in_executor(self, func: Callable[..., Any], *args: Any) -> "asyncio.Future":
+        """
+        Funkcja synchroniczna we WŁASNEJ puli wątków grodzi (nie w domyślnej puli `to_thread`).
+        Wywoływać wewnątrz `run(...)` - pula ma `max_concurrency` wątków, tyle co slotów.
+        Kontekst (ContextVar, np. bieżący span śledzenia) jest przenoszony do wątku jak w `to_thread`.
+        """
+        context = contextvars.copy_context()
+        return asyncio.get_running_loop().run_in_executor(self._get_executor(), context.run, func, *args)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "max_queued": self.max_queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "wait_time": self.wait_time.summary(),
+            }
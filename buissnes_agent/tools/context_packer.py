@@ -0,0 +1,158 @@
+from typing import Any, Dict, List, Optional
+
+from buissnes_agent.textchunker.token_count import TOKEN_COUNT_FIELD, estimate_tokens
+
+# Narzut nagłówków (źródło, zakres znaków) doliczany do budżetu
+_HEADER_TOKENS = 16
+
+
+class ContextBlock:
+    """
+    Ciągły fragment jednego dokumentu: pojedynczy chunk albo kilka sąsiednich chunków
+    sklejonych po offsetach `char_start` / `char_end` (bez powtórzonego overlapu).
+    """
+    __slots__ = ("source", "title", "page", "text", "score", "char_start", "char_end", "tokens", "chunks")
+
+    def __init__(self, payload: Dict[str, Any], score: Optional[float]):
+        self.source = payload.get("source", "nieznane źródło")
+        self.title = payload.get("title")
+        self.page = payload.get("page_number")
+        self.text = payload.get("phrase") or payload.get("text") or ""
+        self.score = score
+        self.char_start = payload.get("char_start")
+        self.char_end = payload.get("char_end")
+        # Liczba tokenów policzona przy ingestii (starsze kolekcje: przybliżenie z długości)
+        self.tokens = payload.get(TOKEN_COUNT_FIELD) or estimate_tokens(self.text)
+        self.chunks = 1
+
+    @property
+    def has_offsets(self) -> bool:
+        return isinstance(self.char_start, int) and isinstance(self.char_end, int)
+
+    def merge(self, other: "ContextBlock") -> None:
+        """Dokleja następny fragment tego samego dokumentu, pomijając część wspólną (overlap)."""
+        overlap = max(0, self.char_end - other.char_start)
+        if overlap >= len(other.text):
+            added = ""
+        else:
+            added = other.text[overlap:]
+        if added:
+            # Liczba tokenów doklejonej części proporcjonalnie do liczby znaków
+            self.tokens += -(-other.tokens * len(added) // max(1, len(other.text)))
+            self.text += added
+        self.char_end = max(self.char_end, other.char_end)
+        self.chunks += other.chunks
+        if other.score is not None and (self.score is None or other.score > self.score):
+            self.score = other.score
+
+
+def _merge_neighbours(blocks: List[ContextBlock], max_gap: int) -> List[ContextBlock]:
+    """
+    Scala chunki tego samego dokumentu (i strony), których zakresy znaków nachodzą na siebie
+    lub stykają się (przerwa <= `max_gap`). Chunki bez offsetów: usuwane dokładne duplikaty treści.
+    """
+    groups: Dict[tuple, List[ContextBlock]] = {}
+    for block in blocks:
+        groups.setdefault((block.source, block.page), []).append(block)
+
+    merged: List[ContextBlock] = []
+    for group in groups.values():
+        with_offsets = sorted((b for b in group if b.has_offsets), key=lambda b: (b.char_start, b.char_end))
+        current = None
+        for block in with_offsets:
+            if current is not None and block.char_start <= current.char_end + max_gap:
+                if block.char_start > current.char_end:
+                    # Przerwa (np. pominięte białe znaki) - łączymy nową linią
+                    current.text += "\n"
+                    current.char_end = block.char_start
+                current.merge(block)
+            else:
+                current = block
+                merged.append(current)
+
+        seen_texts = set()
+        for block in group:
+            if block.has_offsets:
+                continue
+            if block.text in seen_texts:
+                continue
+            seen_texts.add(block.text)
+            merged.append(block)
+    return merged
+
+
+def _truncate(block: ContextBlock, max_tokens: int) -> None:
+    """Przycina blok do `max_tokens` (proporcjonalnie do znaków, na granicy słowa)."""
+    limit = max(1, len(block.text) * max_tokens // max(1, block.tokens))
+    cut = block.text.rfind(" ", 0, limit)
+    block.text = block.text[:cut if cut > limit // 2 else limit].rstrip() + " [...]"
+    block.tokens = max_tokens
+
+
+def pack_context(points, token_budget: int = 1500, max_gap: int = 2) -> str:
+    """
+    ### Pakowanie wyników wyszukiwania w budżet tokenów
+
+    1. **Scalanie sąsiadów:** chunki tego samego pliku o nachodzących/stykających się
+       offsetach `char_start`/`char_end` stają się jednym blokiem - overlap występuje raz.
+    2. **Budżet:** bloki wg malejącej relewancji, dopóki suma `token_count` (z ingestii)
+       mieści się w `token_budget`; pierwszy blok ponad budżet jest przycinany.
+    3. **Grupowanie:** wynik pogrupowany po źródle (źródła wg najlepszego bloku,
+       bloki w kolejności występowania w dokumencie).
+
+    `points` - punkty Qdrant / `ScoredRecord` (atrybuty `payload` i opcjonalnie `score`).
+    """
+    blocks = [ContextBlock(point.payload or {}, getattr(point, "score", None)) for point in points]
+    blocks = [block for block in _merge_neighbours(blocks, max_gap) if block.text.strip()]
+    if not blocks:
+        return "Nie znaleziono relewantnych dokumentów w bazie wiedzy ISO 20022."
+
+    # Kolejność wg relewancji (punkty ze scrolla bez score - kolejność zwrócona przez bazę)
+    ranked = sorted(blocks, key=lambda b: -b.score if b.score is not None else 0.0)
+
+    selected: List[ContextBlock] = []
+    used = 0
+    for block in ranked:
+        cost = block.tokens + _HEADER_TOKENS
+        if used + cost <= token_budget:
+            selected.append(block)
+            used += cost
+        elif not selected:
+            _truncate(block, max(1, token_budget - _HEADER_TOKENS))
+            selected.append(block)
+            used = token_budget
+
+    skipped = len(ranked) - len(selected)
+
+    # Grupowanie po źródle: źródło z najlepszym blokiem pierwsze
+    by_source: Dict[str, List[ContextBlock]] = {}
+    for block in selected:
+        by_source.setdefault(block.source, []).append(block)
+
+    sections = []
+    for number, (source, source_blocks) in enumerate(by_source.items(), 1):
+        best = max((b.score for b in source_blocks if b.score is not None), default=None)
+        title = source_blocks[0].title
+        header = f"=== ŹRÓDŁO {number}: {source}"
+        if title and title not in source:
+            header += f" ({title})"
+        header += f" | Relewancja: {best:.4f} ===" if best is not None else " | Dopasowanie identyfikatora ==="
+
+        parts = [header]
+        ordered = sorted(source_blocks, key=lambda b: (b.page or 0, b.char_start if b.has_offsets else 0))
+        for block in ordered:
+            location = []
+            if block.page:
+                location.append(f"Strona: {block.page}")
+            if block.has_offsets:
+                location.append(f"znaki {block.char_start}-{block.char_end}")
+            if block.chunks > 1:
+                location.append(f"scalone fragmenty: {block.chunks}")
+            parts.append(f"[{', '.join(location)}]" if location else "[fragment]")
+            parts.append(block.text.strip())
+        sections.append("\n".join(parts))
+
+    result = "\n\n".join(sections)
+    if skipped:
+        result += f"\n\n(Pominięto {skipped} fragmentów - limit kontekstu {token_budget} tokenów)"
+    return result
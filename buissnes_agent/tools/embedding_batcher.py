@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .metrics import LatencyStats
+
+EmbedMany = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingMicroBatcher:
+    """
+    ### Micro-batching współbieżnych embeddingów zapytań (asyncio)
+
+    Gdy wielu agentów pyta równocześnie, każde zapytanie wysyłało osobne żądanie HTTP
+    do API embeddingów. Batcher zbiera żądania z krótkiego okna czasowego i wysyła je
+    JEDNYM wywołaniem `embed_many` (np. `OpenAIEmbeddings.aembed_documents`),
+    a wektory rozdziela z powrotem do oczekujących korutyn.
+
+    **Wysyłka paczki:** po `window_ms` od pierwszego żądania w paczce albo od razu
+    po zebraniu `max_batch_size` żądań. Identyczne teksty w paczce są embeddowane raz.
+
+    **Metryki (`stats()`):** liczba paczek, rozmiar paczki (średnia / p50 / p95 / max),
+    opóźnienie kolejkowania (czas od zgłoszenia do wysyłki paczki).
+
+    Batcher jest wiązany z pętlą zdarzeń, w której pierwszy raz wywołano `embed`.
+    """
+
+    def __init__(self, embed_many: EmbedMany, window_ms: float = 5.0, max_batch_size: int = 32):
+        self.embed_many = embed_many
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+        # Metryki (odczytywane także z innych wątków, np. endpoint metryk)
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.failures = 0
+        self._batch_sizes: deque = deque(maxlen=1024)
+        self.queue_delay = LatencyStats()
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._dispatch(batch))
+        # Referencja do zadania, aby nie zostało usunięte przez GC przed zakończeniem
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        dispatched_at = time.perf_counter()
+        with self._stats_lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self._batch_sizes.append(len(batch))
+            for _, _, queued_at in batch:
+                self.queue_delay.record(dispatched_at - queued_at)
+
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        try:
+            vectors = await self.embed_many(texts)
+        except Exception as e:
+            with self._stats_lock:
+                self.failures += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(texts, vectors))
+        for text, future, _ in batch:
+            # Anulowane oczekiwanie (np. timeout klienta) - wynik pomijamy
+            if not future.done():
+                future.set_result(by_text[text])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            sizes = np.asarray(self._batch_sizes) if self._batch_sizes else None
+            return {
+                "window_ms": self.window * 1000.0,
+                "max_batch_size": self.max_batch_size,
+                "batches": self.batches,
+                "requests": self.requests,
+                "failures": self.failures,
+                "pending": len(self._pending),
+                "batch_size": {
+                    "mean": round(float(sizes.mean()), 2) if sizes is not None else None,
+                    "p50": float(np.percentile(sizes, 50)) if sizes is not None else None,
+                    "p95": float(np.percentile(sizes, 95)) if sizes is not None else None,
+                    "max": int(sizes.max()) if sizes is not None else None,
+                },
+                "queue_delay": self.queue_delay.summary(),
+            }
@@ -0,0 +1,33 @@
+from collections import deque
+from typing import Any, Dict
+
+import numpy as np
+
+# ==============================================================================
+# WSPÓLNE METRYKI W PROCESIE (cache, grodzie narzędzi, mikro-batche embeddingów)
+# ==============================================================================
+# Lekkie liczniki bez zależności od konfiguracji - histogramy spanów są w `tracing.py`.
+
+
+class LatencyStats:
+    """Ostatnie `window` pomiarów czasu (sekundy) -> count / mean / p50 / p95 w milisekundach."""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self._samples: deque = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self._samples.append(seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        if not self._samples:
+            return {"count": self.count, "mean_ms": None, "p50_ms": None, "p95_ms": None}
+        samples = np.asarray(self._samples) * 1000.0
+        p50, p95 = np.percentile(samples, [50, 95])
+        return {
+            "count": self.count,
+            "mean_ms": round(float(samples.mean()), 3),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+        }
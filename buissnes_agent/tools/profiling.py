@@ -0,0 +1,275 @@
+import marshal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+# ==============================================================================
+# PROFILOWANIE NA ŻĄDANIE (panel administracyjny serwera MCP)
+# ==============================================================================
+# Wolnej instancji produkcyjnej nie dało się sprofilować bez restartu pod profilerem.
+# Profiler próbkujący działa w osobnym wątku (`sys._current_frames()` co `interval`) -
+# obejmuje pętlę zdarzeń i wszystkie pule wątków (grodzie narzędzi, to_thread), a jego
+# narzut nie zależy od liczby wywołań funkcji (w przeciwieństwie do cProfile).
+# Wynik: collapsed stacks (flamegraph.pl / speedscope) albo plik pstats (snakeviz, pstats).
+
+# Funkcje-liście wątków bezczynnych (select pętli zdarzeń, pusty worker puli, Condition.wait)
+_IDLE_LEAVES = {"select", "poll", "wait", "_worker", "_wait_for_tstate_lock", "accept"}
+
+FrameKey = Tuple[str, int, str]  # (plik, pierwsza linia funkcji, nazwa) - jak klucze pstats
+
+
+class _SampledStats:
+    # pstats.Stats(obj) przyjmuje obiekt z `create_stats()` i słownikiem `stats`
+    def __init__(self, stats: Dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+class SamplingProfiler:
+    """
+    ### Profiler próbkujący (wszystkie wątki procesu)
+
+    `start(seconds, max_requests)` - próbkowanie do upływu czasu albo do obsłużenia
+    `max_requests` wywołań narzędzi (`note_request()` z serwera), co nastąpi pierwsze.
+    Wyniki ostatniego pomiaru są dostępne do kolejnego `start`:
+
+    - `collapsed()`: "wątek;funkcja;...;funkcja liczba_próbek" (format flamegraph),
+    - `pstats_dump()`: plik pstats (czasy = liczba próbek * interwał, liczba wywołań = liczba próbek),
+    - `top(n)`: najczęstsze funkcje (czas własny i skumulowany).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stacks: Counter = Counter()
+        self._stacks_lock = threading.Lock()
+        self.interval = 0.01
+        self.include_idle = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.deadline: Optional[float] = None
+        self.max_requests: Optional[int] = None
+        self.requests = 0
+        self.samples = 0
+        self.stop_reason: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, max_requests: Optional[int] = None,
+              interval: float = 0.01, include_idle: bool = False) -> None:
+        with self._lock:
+            if self.running:
+                raise RuntimeError("Profilowanie już trwa.")
+            with self._stacks_lock:
+                self._stacks = Counter()
+            self._stop.clear()
+            self.interval = max(0.001, float(interval))
+            self.include_idle = include_idle
+            self.started_at = time.time()
+            self.finished_at = None
+            self.deadline = time.monotonic() + float(seconds)
+            self.max_requests = int(max_requests) if max_requests else None
+            self.requests = 0
+            self.samples = 0
+            self.stop_reason = None
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self, reason: str = "stop") -> None:
+        if self.stop_reason is None:
+            self.stop_reason = reason
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    def note_request(self) -> None:
+        """Zakończone wywołanie narzędzia - limit `max_requests` kończy pomiar."""
+        if not self.running or self.max_requests is None:
+            return
+        with self._lock:
+            self.requests += 1
+            if self.requests >= self.max_requests and self.stop_reason is None:
+                self.stop_reason = "requests"
+                self._stop.set()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if time.monotonic() >= self.deadline:
+                self.stop_reason = self.stop_reason or "seconds"
+                break
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if not self.include_idle and frame.f_code.co_name in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stack.reverse()
+                with self._stacks_lock:
+                    self._stacks[(names.get(thread_id, str(thread_id)), tuple(stack))] += 1
+            self.samples += 1
+        self.finished_at = time.time()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "interval_ms": round(self.interval * 1000.0, 2),
+            "samples": self.samples,
+            "unique_stacks": len(self._stacks),
+            "requests": self.requests,
+            "max_requests": self.max_requests,
+            "stop_reason": self.stop_reason,
+        }
+
+    def _snapshot(self) -> List[Tuple[Tuple[str, Tuple[FrameKey, ...]], int]]:
+        # Odczyt w trakcie pomiaru jest dozwolony (kopia licznika)
+        with self._stacks_lock:
+            return list(self._stacks.items())
+
+    def collapsed(self) -> str:
+        lines = []
+        for (thread_name, stack), count in sorted(self._snapshot(), key=lambda item: -item[1]):
+            frames = ";".join(f"{name} ({_short_path(filename)}:{line})" for filename, line, name in stack)
+            lines.append(f"{thread_name};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def _pstats_dict(self) -> Dict:
+        self_samples: Counter = Counter()
+        total_samples: Counter = Counter()
+        callers: Dict[FrameKey, Counter] = defaultdict(Counter)
+        for (_, stack), count in self._snapshot():
+            if not stack:
+                continue
+            self_samples[stack[-1]] += count
+            for func in set(stack):  # rekurencja liczona raz na próbkę
+                total_samples[func] += count
+            for caller, callee in zip(stack, stack[1:]):
+                callers[callee][caller] += count
+
+        interval = self.interval
+        return {
+            func: (
+                total, total, self_samples[func] * interval, total * interval,
+                {caller: (n, n, 0.0, n * interval) for caller, n in callers[func].items()},
+            )
+            for func, total in total_samples.items()
+        }
+
+    def pstats_dump(self) -> bytes:
+        """Zawartość pliku .pstats (format `pstats.Stats.dump_stats`)."""
+        return marshal.dumps(self._pstats_dict())
+
+    def stats_object(self) -> _SampledStats:
+        """Obiekt do `pstats.Stats(profiler.stats_object())` (analiza w procesie)."""
+        return _SampledStats(self._pstats_dict())
+
+    def top(self, limit: int = 30) -> List[Dict[str, Any]]:
+        rows = [
+            {
+                "function": f"{name} ({_short_path(filename)}:{line})",
+                "self_samples": round(tt / self.interval),
+                "total_samples": cc,
+                "self_seconds": round(tt, 3),
+                "total_seconds": round(ct, 3),
+            }
+            for (filename, line, name), (cc, _, tt, ct, _) in self._pstats_dict().items()
+        ]
+        rows.sort(key=lambda row: (row["self_samples"], row["total_samples"]), reverse=True)
+        return rows[:limit]
+
+
+def _short_path(filename: str) -> str:
+    # Ścieżka względna wobec site-packages / katalogu projektu (czytelniejsze ramki)
+    for marker in ("site-packages/", "buissnes_agent/"):
+        index = filename.rfind(marker)
+        if index != -1:
+            return filename[index + len(marker):] if marker == "site-packages/" else filename[index:]
+    return filename
+
+
+class MemoryProfiler:
+    """
+    ### Migawki tracemalloc (największe miejsca alokacji)
+
+    `start(frames)` włącza śledzenie (narzut pamięci i CPU - tylko na czas diagnozy),
+    `snapshot(top)` zwraca największe alokacje, a od drugiej migawki także przyrost
+    względem poprzedniej (wykrywanie wycieków), `stop()` wyłącza śledzenie.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    def start(self, frames: int = 10) -> Dict[str, Any]:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(max(1, int(frames)))
+                self._previous = None
+            return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+            return self.status()
+
+    @staticmethod
+    def status() -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else None,
+            "traced_current_mb": round(current / 1024 ** 2, 2),
+            "traced_peak_mb": round(peak / 1024 ** 2, 2),
+        }
+
+    def snapshot(self, top: int = 20, key_type: str = "lineno") -> Dict[str, Any]:
+        if key_type not in ("lineno", "filename", "traceback"):
+            raise ValueError("key_type: lineno | filename | traceback")
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("tracemalloc nie jest włączony (najpierw start).")
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            ))
+            result = {
+                **self.status(),
+                "top": [_statistic(stat) for stat in snapshot.statistics(key_type)[:top]],
+            }
+            if self._previous is not None:
+                result["growth_since_previous"] = [
+                    {**_statistic(stat), "size_diff_kb": round(stat.size_diff / 1024, 1),
+                     "count_diff": stat.count_diff}
+                    for stat in snapshot.compare_to(self._previous, key_type)[:top]
+                ]
+            self._previous = snapshot
+            return result
+
+
+def _statistic(stat) -> Dict[str, Any]:
+    return {
+        "size_kb": round(stat.size / 1024, 1),
+        "count": stat.count,
+        "traceback": [f"{_short_path(frame.filename)}:{frame.lineno}" for frame in stat.traceback],
+    }
@@ -0,0 +1,217 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from .metrics import LatencyStats
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizacja pytania do klucza cache: zwinięte białe znaki + casefold.
+    "  Co to jest   GrpHdr? " i "co to jest grphdr?" dają ten sam klucz.
+    """
+    return " ".join(query.split()).casefold()
+
+
+class QueryVectorCache:
+    """
+    ### Cache wektorów zapytań (LRU + TTL, thread-safe)
+
+    Agent często ponawia te same (lub trywialnie różne) pytania - w obrębie jednej
+    rozmowy i między rozmowami. Cache pozwala pominąć round-trip do API embeddingów.
+
+    **Klucz:** (nazwa modelu, znormalizowane pytanie) - zmiana modelu nie zwraca starych wektorów.
+
+    **Ograniczenia:**
+    - `max_entries`: po przekroczeniu usuwany jest najdawniej używany wpis (LRU),
+    - `ttl_seconds`: wpis starszy niż TTL jest traktowany jak brak (0 = bez wygasania).
+
+    Wszystkie operacje są chronione blokadą - narzędzia MCP działają w wątkach (`asyncio.to_thread`).
+    Zwracane wektory są współdzielone - nie należy ich modyfikować.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds or 0)
+        self._entries: "OrderedDict[Hashable, Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Liczniki (eksportowane przez stats())
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(query: str, model: Optional[str]) -> Tuple[str, str]:
+        return model or "", normalize_query(query)
+
+    def get(self, key: Hashable) -> Optional[List[float]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, vector = entry
+            if self.ttl_seconds and now - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: Hashable, vector: List[float]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class SemanticResultCache:
+    """
+    ### Semantyczny cache wyników RAG (podobieństwo wektorów zapytań)
+
+    Przechowuje sformatowane wyniki wyszukiwania. Trafienie nie wymaga identycznego
+    pytania - wystarczy, że wektor nowego zapytania ma cosinus do zapamiętanego
+    wektora >= `similarity_threshold` (np. "Co to jest GrpHdr?" vs "Czym jest GrpHdr?").
+
+    **Struktura:**
+    Znormalizowane wektory w jednej prealokowanej macierzy float32 `(max_entries, dim)` -
+    wyszukiwanie to jeden iloczyn macierz-wektor. Wpisy są rozróżniane przez `context`
+    (np. top_k, filtry), aby nie zwracać wyników innego zapytania do bazy.
+    Po zapełnieniu nadpisywany jest najdawniej używany wpis (LRU), wpisy starsze niż
+    `ttl_seconds` są pomijane.
+
+    **Unieważnianie:**
+    `ensure_version(version)` czyści cache, gdy zmieni się wersja ingestii kolekcji.
+
+    Statystyki: trafienia/chybienia oraz opóźnienia obsługi obu przypadków (`stats()`).
+    """
+
+    def __init__(self, similarity_threshold: float = 0.97, max_entries: int = 256, ttl_seconds: float = 0.0):
+        self.similarity_threshold = float(similarity_threshold)
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds or 0)
+        self.version: Optional[str] = None
+
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None  # (max_entries, dim), alokowane przy pierwszym put
+        self._contexts: List[Hashable] = [None] * self.max_entries
+        self._results: List[Optional[str]] = [None] * self.max_entries
+        self._stored_at = np.zeros(self.max_entries)
+        self._last_used = np.zeros(self.max_entries)
+        self._used = np.zeros(self.max_entries, dtype=bool)
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.hit_latency = LatencyStats()
+        self.miss_latency = LatencyStats()
+
+    @staticmethod
+    def _unit(vector: Any) -> np.ndarray:
+        unit = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(unit))
+        return unit / norm if norm else unit
+
+    def ensure_version(self, version: Optional[str]) -> None:
+        """Czyści cache, jeśli wersja ingestii kolekcji różni się od zapamiętanej."""
+        with self._lock:
+            if version == self.version:
+                return
+            if self.version is not None:
+                self.invalidations += 1
+            self.version = version
+            self._used[:] = False
+            self._results = [None] * self.max_entries
+            self._contexts = [None] * self.max_entries
+
+    def get(self, query_vector: Any, context: Hashable = None) -> Optional[str]:
+        unit = self._unit(query_vector)
+        now = time.monotonic()
+        with self._lock:
+            if self._vectors is None or unit.shape[0] != self._vectors.shape[1] or not self._used.any():
+                self.misses += 1
+                return None
+
+            valid = self._used.copy()
+            if self.ttl_seconds:
+                valid &= (now - self._stored_at) <= self.ttl_seconds
+            valid &= np.fromiter((c == context for c in self._contexts), dtype=bool, count=self.max_entries)
+
+            similarities = self._vectors @ unit
+            similarities[~valid] = -np.inf
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            self._last_used[best] = now
+            self.hits += 1
+            return self._results[best]
+
+    def put(self, query_vector: Any, context: Hashable, result: str) -> None:
+        unit = self._unit(query_vector)
+        now = time.monotonic()
+        with self._lock:
+            if self._vectors is None or unit.shape[0] != self._vectors.shape[1]:
+                self._vectors = np.zeros((self.max_entries, unit.shape[0]), dtype=np.float32)
+                self._used[:] = False
+
+            free = np.flatnonzero(~self._used)
+            slot = int(free[0]) if free.size else int(np.argmin(self._last_used))
+
+            self._vectors[slot] = unit
+            self._contexts[slot] = context
+            self._results[slot] = result
+            self._stored_at[slot] = now
+            self._last_used[slot] = now
+            self._used[slot] = True
+
+    def record_latency(self, hit: bool, seconds: float) -> None:
+        with self._lock:
+            (self.hit_latency if hit else self.miss_latency).record(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": int(self._used.sum()),
+                "max_entries": self.max_entries,
+                "similarity_threshold": self.similarity_threshold,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "hit_latency": self.hit_latency.summary(),
+                "miss_latency": self.miss_latency.summary(),
+            }
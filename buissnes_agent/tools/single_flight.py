@@ -0,0 +1,87 @@
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .query_cache import normalize_query
+
+
+class SingleFlight:
+    """
+    ### Single-flight: współdzielenie identycznych wywołań w toku (asyncio)
+
+    Dwie rozmowy zadające to samo pytanie w tym samym momencie wykonywały całą pracę
+    dwukrotnie (embedding, Qdrant, HTTP do Confluence/Wikipedii). Pierwsze wywołanie
+    dla danego klucza uruchamia zadanie, kolejne - dopóki zadanie trwa - czekają na
+    ten sam wynik (lub wyjątek). Po zakończeniu klucz jest zwalniany (to nie jest cache).
+
+    **Klucz:** nazwa narzędzia + znormalizowane argumenty (`make_key`).
+
+    **Anulowanie:** wywołujący czekają przez `asyncio.shield` - przerwanie jednego
+    klienta nie anuluje pracy, na którą czekają pozostali.
+
+    **Metryki (`stats()`):** liczba wywołań, wykonań i zaoszczędzonych duplikatów,
+    także per klucz (ograniczone do `max_tracked_keys` ostatnio aktywnych kluczy).
+    """
+
+    def __init__(self, max_tracked_keys: int = 1024):
+        self.max_tracked_keys = max(1, int(max_tracked_keys))
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._saved_per_key: "OrderedDict[Hashable, int]" = OrderedDict()
+
+    @staticmethod
+    def make_key(tool_name: str, arguments: Dict[str, Any]) -> str:
+        """
+        Klucz wywołania: pomija argumenty None, normalizuje tylko pytania (`query` / `queries`:
+        białe znaki, wielkość liter) i sortuje `tags` - `tags=["b", "a"]` i `tags=["a", "b"]`
+        to to samo wywołanie. Pozostałe argumenty (source, domain, extension, wartości tagów)
+        są filtrami keyword rozróżniającymi wielkość liter - zostają bez zmian.
+        """
+        def normalize(name: str, value):
+            if name == "query":
+                return normalize_query(value)
+            if name == "queries":
+                return [normalize_query(item) for item in value]
+            if name == "tags":
+                return sorted(value)
+            return list(value) if isinstance(value, (tuple, set)) else value
+
+        normalized = {name: normalize(name, value) for name, value in arguments.items() if value is not None}
+        return f"{tool_name}:{json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)}"
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._in_flight.get(key)
+        with self._stats_lock:
+            self.calls += 1
+            if future is not None:
+                self.coalesced += 1
+                self._saved_per_key[key] = self._saved_per_key.get(key, 0) + 1
+                self._saved_per_key.move_to_end(key)
+                while len(self._saved_per_key) > self.max_tracked_keys:
+                    self._saved_per_key.popitem(last=False)
+            else:
+                self.executions += 1
+
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _, k=key: self._in_flight.pop(k, None))
+        return await asyncio.shield(future)
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        with self._stats_lock:
+            top_keys = sorted(self._saved_per_key.items(), key=lambda item: item[1], reverse=True)[:top]
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._in_flight),
+                "saved_ratio": self.coalesced / self.calls if self.calls else 0.0,
+                "saved_per_key": dict(top_keys),
+            }
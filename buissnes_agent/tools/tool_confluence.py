@@ -4,6 +4,8 @@ from atlassian import Confluence
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
+from .tracing import span, traced
+
 load_dotenv()
 
 def _get_confluence_client():
@@ -23,6 +25,7 @@ def _get_confluence_client():
     )
 
 
+@traced("confluence.run_search")
 def run_confluence_search(query: str) -> str:
     """
     ### WYSZUKIWANIE W CONFLUENCE (Wewnętrzna Baza Wiedzy)
@@ -43,7 +46,9 @@ def run_confluence_search(query: str) -> str:
         cql = f'(title ~ "{query}" OR text ~ "{query}") AND type = "page"'
 
         # Pobieramy max 3 wyniki, żeby nie zaśmiecić kontekstu
-        results = confluence.cql(cql, limit=3)
+        with span("confluence.cql") as stage:
+            results = confluence.cql(cql, limit=3)
+            stage.set(hits=len(results.get("results") or []))
 
         if not results.get("results"):
             return "Nie znaleziono żadnych dokumentów wewnętrznych pasujących do zapytania."
@@ -62,13 +67,15 @@ def run_confluence_search(query: str) -> str:
             page_url = f"{base_url}/wiki{webui}" if not webui.startswith('/wiki') else f"{base_url}{webui}"
 
             # Pobranie pełnej treści (body.storage = format HTML Confluence'a)
-            full_page = confluence.get_page_by_id(page_id, expand='body.storage')
+            with span("confluence.get_page", page_id=page_id):
+                full_page = confluence.get_page_by_id(page_id, expand='body.storage')
             raw_html = full_page['body']['storage']['value']
 
             # 3. HTML Parsing & Cleaning
             # LLM czysty tekst niż <div><span>...
-            soup = BeautifulSoup(raw_html, "html.parser")
-            text_content = soup.get_text(separator="\n").strip()
+            with span("confluence.html_parse", html_chars=len(raw_html)):
+                soup = BeautifulSoup(raw_html, "html.parser")
+                text_content = soup.get_text(separator="\n").strip()
 
             # Ograniczenie długości per strona
             max_chars = int(os.getenv("CONFLUENCE_MAX_CHARS", 2000))
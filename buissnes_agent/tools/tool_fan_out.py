@@ -0,0 +1,129 @@
+import asyncio
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from buissnes_agent.textchunker.token_count import count_tokens
+from .tracing import span
+
+# ==============================================================================
+# WYSZUKIWANIE RÓWNOLEGŁE (FAN-OUT): ISO 20022 + CONFLUENCE + WIKIPEDIA
+# ==============================================================================
+# Pytanie hybrydowe ("Co to jest camt.053 i jak go archiwizujemy?") wymagało
+# 2-3 kolejnych wywołań narzędzi - każde to pełny round-trip do modelu 70B.
+# Fan-out odpytuje wszystkie źródła jednocześnie (każde z własnym timeoutem)
+# i zwraca jeden wynik z sekcjami per źródło, zmieszczony w budżecie tokenów.
+
+# Kolejność sekcji i etykiety źródeł w wyniku
+SOURCE_LABELS = {
+    "iso": "BAZA WIEDZY ISO 20022 (oficjalna specyfikacja)",
+    "confluence": "CONFLUENCE (wewnętrzna dokumentacja firmy)",
+    "wikipedia": "WIKIPEDIA (wiedza ogólna)",
+}
+
+
+class SourceResult:
+    __slots__ = ("source", "text", "status", "duration_ms")
+
+    def __init__(self, source: str, text: str, status: str, duration_ms: float):
+        self.source = source
+        self.text = text
+        self.status = status  # ok | timeout | error
+        self.duration_ms = duration_ms
+
+
+async def gather_sources(factories: Dict[str, Callable[[], Awaitable[str]]],
+                         timeouts: Dict[str, float]) -> List[SourceResult]:
+    """
+    Uruchamia wszystkie źródła jednocześnie. Źródło, które nie zdąży w swoim timeoucie
+    (lub rzuci wyjątek), nie blokuje pozostałych - w wyniku pojawia się adnotacja.
+    """
+    async def run(source: str, factory) -> SourceResult:
+        timeout = float(timeouts.get(source, 10))
+        started = time.perf_counter()
+        try:
+            with span(f"fan_out.{source}", timeout_seconds=timeout):
+                async with asyncio.timeout(timeout):
+                    text = await factory()
+            status = "ok"
+        except TimeoutError:
+            text, status = f"Przekroczono limit czasu ({timeout:.0f} s) - źródło pominięte.", "timeout"
+        except Exception as e:
+            text, status = f"Błąd źródła: {e}", "error"
+        return SourceResult(source, text or "", status, (time.perf_counter() - started) * 1000.0)
+
+    return list(await asyncio.gather(*(run(source, factory) for source, factory in factories.items())))
+
+
+def allocate_budget(needed: Dict[str, int], weights: Dict[str, float], token_budget: int) -> Dict[str, int]:
+    """
+    Podział budżetu tokenów między źródła wg wag. Źródło, które potrzebuje mniej niż
+    swój udział, oddaje nadwyżkę pozostałym (water-filling).
+    """
+    allocation = {source: 0 for source in needed}
+    remaining = dict(needed)
+    budget = token_budget
+    while remaining and budget > 0:
+        total_weight = sum(weights.get(source, 1.0) for source in remaining) or 1.0
+        shares = {source: int(budget * weights.get(source, 1.0) / total_weight) for source in remaining}
+        satisfied = {source for source, tokens in remaining.items() if tokens <= shares[source]}
+        if not satisfied:
+            for source in remaining:
+                allocation[source] += shares[source]
+            break
+        for source in satisfied:
+            allocation[source] += remaining[source]
+            budget -= remaining.pop(source)
+    return allocation
+
+
+def _truncate_to_tokens(text: str, tokens: int, max_tokens: int) -> str:
+    if tokens <= max_tokens:
+        return text
+    limit = max(0, len(text) * max_tokens // max(1, tokens))
+    cut = text.rfind("\n", 0, limit)
+    if cut < limit // 2:
+        cut = text.rfind(" ", 0, limit)
+    return text[:cut if cut > limit // 2 else limit].rstrip() + "\n...(ucięto - limit kontekstu)..."
+
+
+def merge_results(results: List[SourceResult], token_budget: int, weights: Dict[str, float]) -> str:
+    """Scala wyniki w jedną odpowiedź: sekcja per źródło, łącznie w `token_budget` tokenów."""
+    ordered = sorted(results, key=lambda r: list(SOURCE_LABELS).index(r.source)
+                     if r.source in SOURCE_LABELS else len(SOURCE_LABELS))
+    headers = {
+        result.source: f"##### ŹRÓDŁO: {SOURCE_LABELS.get(result.source, result.source.upper())} "
+                       f"[{result.status}, {result.duration_ms:.0f} ms] #####"
+        for result in ordered
+    }
+    needed = {result.source: count_tokens(result.text) for result in ordered}
+    # Nagłówki sekcji i znacznik ucięcia też zajmują kontekst
+    reserved = sum(count_tokens(header) + 16 for header in headers.values())
+    allocation = allocate_budget(needed, weights, max(0, token_budget - reserved))
+
+    sections = []
+    for result in ordered:
+        body = _truncate_to_tokens(result.text.strip(), needed[result.source], allocation[result.source])
+        sections.append(f"{headers[result.source]}\n{body}")
+    return "\n\n".join(sections)
+
+
+async def arun_fan_out(query: str, factories: Dict[str, Callable[[], Awaitable[str]]],
+                       timeouts: Dict[str, float], token_budget: int = 3000,
+                       weights: Dict[str, float] | None = None) -> str:
+    """
+    ### GŁÓWNA LOGIKA FAN-OUT
+
+    1. Równoległe zapytania do wybranych źródeł (`factories`: nazwa -> korutyna), każde z timeoutem.
+    2. Scalenie wyników z etykietami źródeł (status i czas odpowiedzi w nagłówku sekcji).
+    3. Dopasowanie do budżetu tokenów (podział wg `weights`, nadwyżki przechodzą na inne źródła).
+    """
+    if not factories:
+        return "Nie wybrano żadnego źródła wiedzy."
+
+    print(f"[Fan-out] Szukam: '{query}' w źródłach: {', '.join(factories)}", file=sys.stderr)
+    results = await gather_sources(factories, timeouts)
+    print("[Fan-out] " + ", ".join(f"{r.source}: {r.status} ({r.duration_ms:.0f} ms)" for r in results),
+          file=sys.stderr)
+    with span("fan_out.merge", token_budget=token_budget):
+        return merge_results(results, token_budget, weights or {})
@@ -1,12 +1,25 @@
+import asyncio
 import logging
 import os
 import sys
+import threading
+import time
+from typing import Awaitable, Callable
 
+import httpx
 import qdrant_client
 from dotenv import load_dotenv
 from langchain_openai import OpenAIEmbeddings
+from qdrant_client.models import FieldCondition, Filter, MatchAny, MatchValue, QueryRequest, Record
 
+from buissnes_agent.LocalVectorStore import LocalVectorStore
+from buissnes_agent.QdrantDatabaseStore import build_search_params
 from buissnes_agent.config_loader import settings
+from buissnes_agent.textchunker.iso_identifiers import detect_identifier_query
+from .context_packer import pack_context
+from .embedding_batcher import EmbeddingMicroBatcher
+from .query_cache import QueryVectorCache, SemanticResultCache, normalize_query
+from .tracing import span, traced
 
 logger = logging.getLogger(__name__)
 
@@ -16,68 +29,575 @@ logger = logging.getLogger(__name__)
 # Przechowujemy instancje klienta Qdrant i modelu Embeddingów globalnie,
 # aby nie tworzyć nowego połączenia przy każdym zapytaniu (optymalizacja).
 _qdrant_client = None
+_async_qdrant_client = None  # AsyncQdrantClient dla ścieżki natywnie asynchronicznej (arun_iso_rag)
+_local_store = None  # vector_db.backend = "local" (LocalVectorStore zamiast Qdrant)
 _embeddings = None
+_embedding_model = None
+_init_lock = threading.Lock()
+
+# Cache wektorów zapytań (LRU + TTL) - powtórzone pytania pomijają API embeddingów
+_query_cache = QueryVectorCache(
+    max_entries=settings.get("rag.query_cache.max_entries", 1024),
+    ttl_seconds=settings.get("rag.query_cache.ttl_seconds", 3600),
+)
+
+# Micro-batching embeddingów zapytań ścieżki async (tworzony leniwie w pętli zdarzeń serwera)
+_embedding_batcher: EmbeddingMicroBatcher | None = None
+
+# Semantyczny cache sformatowanych wyników (osobny dla każdej kolekcji)
+_result_caches: dict[str, SemanticResultCache] = {}
+_result_caches_lock = threading.Lock()
+# Ostatnie sprawdzenie wersji ingestii kolekcji: {kolekcja: monotonic()}
+_version_checked_at: dict[str, float] = {}
 
 load_dotenv()
 
+
+def _http_limits() -> httpx.Limits:
+    """
+    Limity puli połączeń klientów asynchronicznych (Qdrant, embeddingi).
+    Połączenia keep-alive są utrzymywane - bez tego każde zapytanie otwiera nowe połączenie TCP/TLS.
+    """
+    max_connections = int(settings.get("rag.async.max_connections", 64))
+    return httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+
 def _init_resources():
     """
     ### LENIWA INICJALIZACJA ZASOBÓW (Lazy Loading)
 
-    Ta funkcja jest wywoływana dopiero przy pierwszym użyciu narzędzia.
+    Ta funkcja jest wywoływana przy pierwszym użyciu narzędzia (lub w fazie startu serwera MCP).
 
     Dlaczego:
     1. Szybszy start serwera (nie czekamy na połączenie z bazą przy bootowaniu).
     2. Odporność na błędy (jeśli Qdrant leży, serwer wstanie, a błąd pojawi się dopiero przy pytaniu).
+
+    **Wątki:** równoczesne pierwsze wywołania (wątki `asyncio.to_thread`) tworzyły kilka
+    klientów naraz. Inicjalizacja odbywa się pod blokadą (double-checked locking),
+    a globalne zmienne są przypisywane dopiero po zbudowaniu WSZYSTKICH zasobów -
+    inne wątki nigdy nie widzą stanu częściowego.
     """
-    global _qdrant_client, _embeddings
+    global _qdrant_client, _async_qdrant_client, _local_store, _embeddings, _embedding_model
 
-    # Jeśli zasoby już istnieją, nie rób nic.
-    if _qdrant_client and _embeddings:
+    # Jeśli zasoby już istnieją, nie rób nic (bez blokady - szybka ścieżka).
+    if resources_ready():
         return
 
-    try:
-        # Pobranie konfiguracji z .env
-        emb_model = os.getenv('EMBEDDING_MODEL')
-        emb_url = os.getenv('EMBEDDING_BASE_URL')
-        emb_key = os.getenv('EMBEDDING_API_KEY')
-        qdrant_url = os.getenv('QDRANT_API')
-        qdrant_key = os.getenv('QDRANT_API_KEY')
-
-        if not emb_model:
-            raise ValueError("Brak zmiennej EMBEDDING_MODEL w pliku .env")
-
-        # 1. Inicjalizacja klienta bazy wektorowej Qdrant
-        _qdrant_client = qdrant_client.QdrantClient(
-            url=qdrant_url,
-            api_key=qdrant_key,
+    with _init_lock:
+        if resources_ready():
+            return
+
+        try:
+            # Pobranie konfiguracji z .env
+            emb_model = os.getenv('EMBEDDING_MODEL')
+            emb_url = os.getenv('EMBEDDING_BASE_URL')
+            emb_key = os.getenv('EMBEDDING_API_KEY')
+            qdrant_url = os.getenv('QDRANT_API')
+            qdrant_key = os.getenv('QDRANT_API_KEY')
+
+            if not emb_model:
+                raise ValueError("Brak zmiennej EMBEDDING_MODEL w pliku .env")
+
+            # 1. Inicjalizacja bazy wektorowej: klient Qdrant lub lokalny plik memmap
+            local_store = sync_client = async_client = None
+            if settings.get("vector_db.backend", "qdrant") == "local":
+                local_store = LocalVectorStore.from_settings(
+                    collection_name=settings.get("vector_db.collection_name"),
+                    vector_size=int(os.getenv("EMBEDDING_DIM", settings.get("vector_db.dimension", 1536))),
+                )
+            else:
+                sync_client = qdrant_client.QdrantClient(
+                    url=qdrant_url,
+                    api_key=qdrant_key,
+                )
+                # Klient asynchroniczny: jedna pula połączeń współdzielona przez wszystkie korutyny
+                async_client = qdrant_client.AsyncQdrantClient(
+                    url=qdrant_url,
+                    api_key=qdrant_key,
+                    limits=_http_limits(),
+                )
+
+            # 2. Inicjalizacja modelu Embeddingów (OpenAI lub Local/Nomic)
+            # check_embedding_ctx_length=False pozwala na dłuższe teksty (ważne przy RAG)
+            # http_async_client: wspólna pula połączeń dla aembed_query / aembed_documents
+            embeddings = OpenAIEmbeddings(
+                model=emb_model,
+                base_url=emb_url,
+                api_key=emb_key,
+                check_embedding_ctx_length=False,
+                http_async_client=httpx.AsyncClient(limits=_http_limits()),
+            )
+
+            # 3. Publikacja (embeddingi na końcu - od nich zależy resources_ready())
+            _local_store, _qdrant_client, _async_qdrant_client = local_store, sync_client, async_client
+            _embedding_model = emb_model
+            _embeddings = embeddings
+            print(f"[ISO Tool] Połączono z Qdrant i skonfigurowano Embeddingi ({emb_model}).", file=sys.stderr)
+
+        except Exception as e:
+            print(f"[ISO Tool] Błąd krytyczny inicjalizacji: {e}", file=sys.stderr)
+            raise e
+
+
+def resources_ready() -> bool:
+    """Czy klienty bazy wektorowej i embeddingów są zainicjalizowane."""
+    return bool((_qdrant_client or _local_store) and _embeddings)
+
+
+async def awarmup(queries: list[str] | None = None) -> dict:
+    """
+    ### ROZGRZEWKA (faza startu serwera MCP)
+
+    1. Inicjalizacja klientów (pod blokadą, w wątku - nie blokuje pętli zdarzeń).
+    2. Odczyt metadanych kolekcji (połączenie + weryfikacja, że kolekcja istnieje).
+    3. Zapytania rozgrzewkowe: embedding + wyszukiwanie - model embeddingów i segmenty
+       HNSW w Qdrant są "gorące" przed pierwszym użytkownikiem.
+
+    Zapytania omijają cache wektorów i cache wyników (nie zaśmiecają ich i nie zawyżają trafień).
+    Wyjątki są propagowane - wywołujący decyduje o ponowieniu.
+    """
+    started = time.perf_counter()
+    await asyncio.to_thread(_init_resources)
+
+    collection_name = settings.get("vector_db.collection_name")
+    version = await _acollection_version(collection_name)
+
+    top_k = _clamp_top_k(None)
+    for query in queries or []:
+        query_vector = await _embeddings.aembed_query(query)
+        await _asearch_and_format(collection_name, query_vector, top_k)
+
+    return {
+        "collection": collection_name,
+        "version": version,
+        "queries": len(queries or []),
+        "duration_ms": round((time.perf_counter() - started) * 1000.0, 1),
+    }
+
+
+def _embed_query(query: str) -> list[float]:
+    """
+    Wektor zapytania z cache (klucz: model + znormalizowane pytanie) lub z API embeddingów.
+    """
+    with span("rag.embed", model=_embedding_model) as stage:
+        if not _setting_enabled("rag.query_cache.enabled"):
+            return _embeddings.embed_query(query)
+
+        key = _query_cache.make_key(query, _embedding_model)
+        vector = _query_cache.get(key)
+        stage.set(cache_hit=vector is not None)
+        if vector is None:
+            vector = _embeddings.embed_query(query)
+            _query_cache.put(key, vector)
+        else:
+            print(f"[RAG] Wektor zapytania z cache (hit rate: {_query_cache.stats()['hit_rate']:.0%})", file=sys.stderr)
+        return vector
+
+
+def _embed_queries(queries: list[str]) -> list[list[float]]:
+    """
+    Wektory wielu zapytań: trafienia z cache + JEDNO żądanie do API embeddingów
+    (`embed_documents`) dla wszystkich brakujących pytań.
+    """
+    use_cache = _setting_enabled("rag.query_cache.enabled")
+    vectors: list[list[float] | None] = [None] * len(queries)
+    if use_cache:
+        for i, query in enumerate(queries):
+            vectors[i] = _query_cache.get(_query_cache.make_key(query, _embedding_model))
+
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        with span("rag.embed", model=_embedding_model, texts=len(missing), cache_hits=len(queries) - len(missing)):
+            embedded = _embeddings.embed_documents([queries[i] for i in missing])
+        for i, vector in zip(missing, embedded):
+            vectors[i] = vector
+            if use_cache:
+                _query_cache.put(_query_cache.make_key(queries[i], _embedding_model), vector)
+    return vectors
+
+
+async def _aembed_queries(queries: list[str]) -> list[list[float]]:
+    """Asynchroniczny odpowiednik `_embed_queries` (cache + jedno `aembed_documents`)."""
+    use_cache = _setting_enabled("rag.query_cache.enabled")
+    vectors: list[list[float] | None] = [None] * len(queries)
+    if use_cache:
+        for i, query in enumerate(queries):
+            vectors[i] = _query_cache.get(_query_cache.make_key(query, _embedding_model))
+
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        with span("rag.embed", model=_embedding_model, texts=len(missing), cache_hits=len(queries) - len(missing)):
+            embedded = await _embeddings.aembed_documents([queries[i] for i in missing])
+        for i, vector in zip(missing, embedded):
+            vectors[i] = vector
+            if use_cache:
+                _query_cache.put(_query_cache.make_key(queries[i], _embedding_model), vector)
+    return vectors
+
+
+async def _aembed_query(query: str) -> list[float]:
+    """
+    Asynchroniczny odpowiednik `_embed_query` (ten sam cache wektorów zapytań).
+    Chybienia idą przez micro-batcher - współbieżne zapytania dzielą jedno żądanie do API.
+    """
+    with span("rag.embed", model=_embedding_model) as stage:
+        if not _setting_enabled("rag.query_cache.enabled"):
+            return await _aembed_uncached(query)
+
+        key = _query_cache.make_key(query, _embedding_model)
+        vector = _query_cache.get(key)
+        stage.set(cache_hit=vector is not None)
+        if vector is None:
+            vector = await _aembed_uncached(query)
+            _query_cache.put(key, vector)
+        return vector
+
+
+async def _aembed_uncached(query: str) -> list[float]:
+    global _embedding_batcher
+
+    if not _setting_enabled("rag.embedding_batcher.enabled"):
+        return await _embeddings.aembed_query(query)
+
+    if _embedding_batcher is None:
+        _embedding_batcher = EmbeddingMicroBatcher(
+            embed_many=_embeddings.aembed_documents,
+            window_ms=float(settings.get("rag.embedding_batcher.window_ms", 5)),
+            max_batch_size=int(settings.get("rag.embedding_batcher.max_batch_size", 32)),
         )
+    return await _embedding_batcher.embed(query)
+
+
+def get_embedding_batcher_stats() -> dict:
+    """Metryki micro-batchera embeddingów (rozmiar paczek, opóźnienie kolejkowania)."""
+    if _embedding_batcher is None:
+        return {"batches": 0, "requests": 0}
+    return _embedding_batcher.stats()
+
+
+def get_query_cache_stats() -> dict:
+    """Liczniki cache wektorów zapytań (hits, misses, hit_rate, evictions...)."""
+    return _query_cache.stats()
+
+
+def _setting_enabled(key: str, default: bool = True) -> bool:
+    # Wartości z ENV (APP__...) przychodzą jako stringi
+    return str(settings.get(key, default)).lower() in ("true", "1", "yes", "on")
+
+
+def _get_result_cache(collection_name: str) -> SemanticResultCache:
+    with _result_caches_lock:
+        cache = _result_caches.get(collection_name)
+        if cache is None:
+            cache = SemanticResultCache(
+                similarity_threshold=settings.get("rag.result_cache.similarity_threshold", 0.97),
+                max_entries=settings.get("rag.result_cache.max_entries", 256),
+                ttl_seconds=settings.get("rag.result_cache.ttl_seconds", 0),
+            )
+            _result_caches[collection_name] = cache
+        return cache
+
 
-        # 2. Inicjalizacja modelu Embeddingów (OpenAI lub Local/Nomic)
-        # check_embedding_ctx_length=False pozwala na dłuższe teksty (ważne przy RAG)
-        _embeddings = OpenAIEmbeddings(
-            model=emb_model,
-            base_url=emb_url,
-            api_key=emb_key,
-            check_embedding_ctx_length=False
+def _collection_version(collection_name: str) -> str:
+    """
+    Wersja danych kolekcji: `ingestion_version` z metadanych kolekcji (zapisywana przez
+    `QdrantDatabaseStore.mark_ingestion`) + liczba punktów (dla kolekcji sprzed wersjonowania).
+    """
+    if _local_store is not None:
+        return _local_store.version()
+
+    return _version_string(_qdrant_client.get_collection(collection_name))
+
+
+async def _acollection_version(collection_name: str) -> str:
+    if _local_store is not None:
+        return _local_store.version()
+    return _version_string(await _async_qdrant_client.get_collection(collection_name))
+
+
+def _version_string(info) -> str:
+    metadata = getattr(info.config, "metadata", None) or {}
+    return f"{metadata.get('ingestion_version', '-')}:{info.points_count}"
+
+
+def _version_check_due(collection_name: str, cache: SemanticResultCache) -> bool:
+    """Czy sprawdzić wersję ingestii kolekcji (nie częściej niż co `version_check_seconds`)."""
+    interval = float(settings.get("rag.result_cache.version_check_seconds", 30))
+    now = time.monotonic()
+    if cache.version is not None and now - _version_checked_at.get(collection_name, 0.0) < interval:
+        return False
+    _version_checked_at[collection_name] = now
+    return True
+
+
+def _sync_result_cache(collection_name: str, cache: SemanticResultCache) -> None:
+    """
+    Sprawdza wersję ingestii kolekcji (nie częściej niż co `version_check_seconds`)
+    i czyści cache, jeśli dane w kolekcji się zmieniły.
+    """
+    if _version_check_due(collection_name, cache):
+        cache.ensure_version(_collection_version(collection_name))
+
+
+def get_result_cache_stats() -> dict:
+    """Statystyki semantycznego cache wyników per kolekcja (trafienia, opóźnienia hit/miss)."""
+    with _result_caches_lock:
+        caches = dict(_result_caches)
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+def filter_values(domain: str | None = None, extension: str | None = None,
+                  source: str | None = None, tags: list[str] | None = None) -> dict:
+    """
+    Normalizuje opcjonalne argumenty narzędzia do słownika {pole payloadu: wartość/lista}.
+    Wszystkie podane warunki muszą być spełnione; lista (`tags`) pasuje, gdy chunk ma którąkolwiek wartość.
+    """
+    filters = {}
+    if domain:
+        filters["domain"] = domain
+    if extension:
+        # Loadery zapisują rozszerzenie z kropką i małymi literami (".xml")
+        filters["extension"] = extension.lower() if extension.startswith(".") else f".{extension.lower()}"
+    if source:
+        filters["source"] = source
+    if tags:
+        filters["tags"] = list(tags)
+    return filters
+
+
+def _qdrant_conditions(filters: dict) -> list[FieldCondition]:
+    return [
+        FieldCondition(key=key, match=MatchAny(any=value) if isinstance(value, list) else MatchValue(value=value))
+        for key, value in filters.items()
+    ]
+
+
+def build_payload_filter(domain: str | None = None, extension: str | None = None,
+                         source: str | None = None, tags: list[str] | None = None) -> Filter | None:
+    """
+    Buduje filtr Qdrant z opcjonalnych argumentów narzędzia (pola z indeksem keyword).
+    Zwraca None, gdy nie podano żadnego warunku.
+    """
+    conditions = _qdrant_conditions(filter_values(domain, extension, source, tags))
+    return Filter(must=conditions) if conditions else None
+
+
+def _search_and_format(collection_name: str, query_vector: list[float], top_k: int,
+                       filters: dict | None = None, hnsw_ef: int | None = None) -> str:
+    """
+    Wyszukuje w Qdrant (query_points) i formatuje wyniki dla LLM.
+    Filtr payloadu jest stosowany w trakcie przeszukiwania grafu HNSW (filtered HNSW),
+    a parametry zapytania (hnsw_ef, rescore/oversampling przy kwantyzacji) wg `vector_db`.
+    Backend "local": dokładne top-k w `LocalVectorStore` (bez serwera).
+    """
+    with span("rag.search", backend="local" if _local_store is not None else "qdrant", top_k=top_k) as stage:
+        if _local_store is not None:
+            points = _local_store.query(query_vector, limit=top_k, filters=filters)
+        else:
+            # ZMIANA: Używamy query_points zamiast search
+            # ZMIANA: query_points zwraca obiekt QueryResponse, a punkty są w atrybucie .points
+            points = _qdrant_client.query_points(**_query_points_args(
+                collection_name, query_vector, top_k, filters, hnsw_ef)).points
+        stage.set(hits=len(points))
+
+    if not points:
+        return "Nie znaleziono relewantnych dokumentów w bazie wiedzy ISO 20022."
+
+    return _render_points(points)
+
+
+async def _asearch_and_format(collection_name: str, query_vector: list[float], top_k: int,
+                              filters: dict | None = None, hnsw_ef: int | None = None) -> str:
+    """Asynchroniczny odpowiednik `_search_and_format` (AsyncQdrantClient)."""
+    with span("rag.search", backend="local" if _local_store is not None else "qdrant", top_k=top_k) as stage:
+        if _local_store is not None:
+            # Lokalny backend to obliczenia numpy (zwalniają GIL) - w wątku, bez blokowania pętli
+            points = await asyncio.to_thread(_local_store.query, query_vector, top_k, filters)
+        else:
+            response = await _async_qdrant_client.query_points(**_query_points_args(
+                collection_name, query_vector, top_k, filters, hnsw_ef))
+            points = response.points
+        stage.set(hits=len(points))
+
+    if not points:
+        return "Nie znaleziono relewantnych dokumentów w bazie wiedzy ISO 20022."
+
+    return _render_points(points)
+
+
+def _query_points_args(collection_name: str, query_vector: list[float], top_k: int,
+                       filters: dict | None, hnsw_ef: int | None) -> dict:
+    conditions = _qdrant_conditions(filters or {})
+    return dict(
+        collection_name=collection_name,
+        query=query_vector,  # ZMIANA: parametr nazywa się 'query', a nie 'query_vector'
+        query_filter=Filter(must=conditions) if conditions else None,
+        search_params=build_search_params(settings.get("vector_db") or {}, hnsw_ef),
+        limit=top_k,
+        with_payload=True,
+    )
+
+
+def _identifier_lookup(collection_name: str, identifiers: dict[str, list[str]], embed: Callable[[], list[float]],
+                       top_k: int, filters: dict | None = None, hnsw_ef: int | None = None) -> str | None:
+    """
+    ### Szybka ścieżka dla identyfikatorów (AM09, VR00060, pacs.008.001.08, GrpHdr)
+
+    Najpierw `scroll` z filtrem keyword po polach wypełnianych przy ingestii (`iso_identifiers`)
+    i limitem `top_k + 1` - bez embeddingu zapytania:
+    - co najwyżej `top_k` trafień -> zwracane od razu (dokładne dopasowanie identyfikatora),
+    - więcej niż `top_k` -> dopiero wtedy `embed()` i `query_points` z tym samym filtrem
+      wybiera `top_k` najtrafniejszych (scroll zwraca punkty w kolejności ID, nie wg relewancji).
+
+    Zwraca None, gdy nic nie pasuje (fallback na zwykłe wyszukiwanie wektorowe).
+    Backend "local" nie ma indeksów keyword - zawsze fallback na wyszukiwanie wektorowe.
+    """
+    if _local_store is not None:
+        return None
+
+    identifier_filter = _identifier_filter(identifiers, filters)
+    with span("rag.identifier_lookup", identifiers=sorted(identifiers)) as stage:
+        points, _ = _qdrant_client.scroll(collection_name=collection_name, scroll_filter=identifier_filter,
+                                          limit=top_k + 1, with_payload=True, with_vectors=False)
+        stage.set(hits=len(points), ranked=len(points) > top_k)
+        if len(points) > top_k:
+            points = _qdrant_client.query_points(**_identifier_query_args(
+                collection_name, identifier_filter, embed(), top_k, hnsw_ef)).points
+    if not points:
+        return None
+    return _render_points(points)
+
+
+async def _aidentifier_lookup(collection_name: str, identifiers: dict[str, list[str]],
+                              embed: Callable[[], Awaitable[list[float]]], top_k: int,
+                              filters: dict | None = None, hnsw_ef: int | None = None) -> str | None:
+    """Asynchroniczny odpowiednik `_identifier_lookup` (`embed` - korutyna, wołana tylko przy rankingu)."""
+    if _local_store is not None:
+        return None
+
+    identifier_filter = _identifier_filter(identifiers, filters)
+    with span("rag.identifier_lookup", identifiers=sorted(identifiers)) as stage:
+        points, _ = await _async_qdrant_client.scroll(collection_name=collection_name,
+                                                      scroll_filter=identifier_filter,
+                                                      limit=top_k + 1, with_payload=True, with_vectors=False)
+        stage.set(hits=len(points), ranked=len(points) > top_k)
+        if len(points) > top_k:
+            response = await _async_qdrant_client.query_points(**_identifier_query_args(
+                collection_name, identifier_filter, await embed(), top_k, hnsw_ef))
+            points = response.points
+    if not points:
+        return None
+    return _render_points(points)
+
+
+def _identifier_filter(identifiers: dict[str, list[str]], filters: dict | None) -> Filter:
+    # Filtry narzędzia obowiązkowe (must), identyfikatory - dowolny z nich (should)
+    return Filter(
+        must=_qdrant_conditions(filters) if filters else None,
+        should=[
+            FieldCondition(key=field_name, match=MatchAny(any=values))
+            for field_name, values in identifiers.items()
+        ]
+    )
+
+
+def _identifier_query_args(collection_name: str, identifier_filter: Filter, query_vector: list[float],
+                           top_k: int, hnsw_ef: int | None) -> dict:
+    args = _query_points_args(collection_name, query_vector, top_k, None, hnsw_ef)
+    args["query_filter"] = identifier_filter
+    return args
+
+
+@traced("rag.format")
+def _render_points(points) -> str:
+    """
+    Wynik dla LLM: spakowany kontekst (scalanie sąsiednich chunków, grupowanie po źródle,
+    budżet tokenów `rag.context.token_budget`) albo lista fragmentów 1:1 (`rag.context.packing: false`).
+    """
+    if _setting_enabled("rag.context.packing"):
+        return pack_context(
+            points,
+            token_budget=int(settings.get("rag.context.token_budget", 1500)),
+            max_gap=int(settings.get("rag.context.max_gap_chars", 2)),
         )
-        print(f"[ISO Tool] Połączono z Qdrant i skonfigurowano Embeddingi ({emb_model}).", file=sys.stderr)
+    return _format_points(points)
 
-    except Exception as e:
-        print(f"[ISO Tool] Błąd krytyczny inicjalizacji: {e}", file=sys.stderr)
-        raise e
 
+def _format_points(points, labels: list[str] | None = None) -> str:
+    """
+    Formatowanie wyniku dla LLM. Punkty bez score (np. ze scrolla) -
+    nagłówek informuje wtedy o dokładnym dopasowaniu identyfikatora.
+    `labels` (opcjonalnie) - dopisek do nagłówka każdego punktu (np. numery zapytań wsadu).
+    """
+    formatted_output = []
+    for i, point in enumerate(points, 1):
+        payload = point.payload or {}
+
+        # Pobieranie pól zgodnie z nowym schematem
+        # Priorytet: 'phrase' -> 'text' -> Placeholder
+        content = payload.get("phrase") or payload.get("text") or "[BRAK TREŚCI]"
+
+        # Metadane źródłowe
+        source_uri = payload.get("source", "nieznane źródło")
+        title = payload.get("title")
+        page = payload.get("page_number")
+
+        # Budowanie nagłówka
+        source_info = f"Źródło: {source_uri}"
+        if title and title not in source_uri:
+            source_info += f" ({title})"
+        if page:
+            source_info += f", Strona: {page}"
 
-def run_iso_rag(query: str) -> str:
+        score = getattr(point, "score", None)
+        relevance = f"Relewancja: {score:.4f}" if score is not None else "Dopasowanie identyfikatora"
+        if labels:
+            relevance += f" | {labels[i - 1]}"
+
+        entry = (
+            f"--- DOKUMENT {i} ({relevance}) ---\n"
+            f"{source_info}\n"
+            f"Treść:\n{content.strip()}"
+        )
+        formatted_output.append(entry)
+
+    return "\n\n".join(formatted_output)
+
+
+def _clamp_top_k(top_k: int | None) -> int:
+    # Ilość zwracanych fragmentów (ograniczona z góry - chroni kontekst LLM)
+    max_top_k = int(settings.get("rag.max_top_k", 20))
+    return max(1, min(int(top_k or settings.get("rag.top_k", 5)), max_top_k))
+
+
+def _search_context(top_k: int, domain, extension, source, tags, hnsw_ef) -> tuple:
+    # Parametry wyszukiwania rozróżniające wpisy semantycznego cache
+    return top_k, domain, extension, source, tuple(sorted(tags)) if tags else None, hnsw_ef
+
+
+@traced("rag.run_iso_rag")
+def run_iso_rag(query: str, top_k: int | None = None, domain: str | None = None,
+                extension: str | None = None, source: str | None = None,
+                tags: list[str] | None = None, hnsw_ef: int | None = None) -> str:
     """
     ### GŁÓWNA LOGIKA NARZĘDZIA RAG
 
-    1. Zamienia pytanie tekstowe na wektor (Embedding).
-    2. Szuka w bazie Qdrant wektorów najbardziej podobnych (Search).
-    3. Zwraca surowy tekst dokumentacji wraz z metadanymi.
+    Opcjonalne `domain` / `extension` / `source` / `tags` zawężają wyszukiwanie filtrem
+    payloadu (indeksy keyword), a `top_k` określa liczbę zwracanych fragmentów.
+    `hnsw_ef` nadpisuje `vector_db.hnsw.ef` (większy = dokładniej, wolniej).
+
+    1. Zapytanie złożone z samych identyfikatorów ISO -> filtr keyword (bez embeddingu,
+       wektor tylko do rankingu, gdy trafień jest więcej niż `top_k`).
+    2. Zamienia pytanie tekstowe na wektor (Embedding, z cache wektorów zapytań).
+       Sprawdza semantyczny cache wyników (podobne pytanie -> gotowy wynik).
+    3. Szuka w bazie Qdrant wektorów najbardziej podobnych (Search).
+    4. Zwraca surowy tekst dokumentacji wraz z metadanymi.
     """
     collection_name = settings.get("vector_db.collection_name")
-    top_k = 5  # Ilość zwracanych fragmentów
+
+    top_k = _clamp_top_k(top_k)
+    filters = filter_values(domain, extension, source, tags)
+    search_context = _search_context(top_k, domain, extension, source, tags, hnsw_ef)
 
     # Upewnij się, że mamy połączenie z bazą
     try:
@@ -85,61 +605,398 @@ def run_iso_rag(query: str) -> str:
     except Exception as e:
         return f"Błąd techniczny: Nie udało się połączyć z bazą wiedzy ({str(e)})."
 
-    if not _qdrant_client or not _embeddings:
+    if not (_qdrant_client or _local_store) or not _embeddings:
         return "Błąd techniczny: Narzędzie RAG nie jest poprawnie skonfigurowane."
 
-    print(f"[RAG] Szukam: '{query}' w kolekcji '{collection_name}'", file=sys.stderr)
+    print(f"[RAG] Szukam: '{query}' w kolekcji '{collection_name}' (top_k={top_k}, filtr: {search_context[1:5]})",
+          file=sys.stderr)
 
+    started = time.perf_counter()
     try:
-        # KROK 1: Generowanie wektora zapytania
-        query_vector = _embeddings.embed_query(query)
-
-        # KROK 2: Wyszukiwanie w Qdrant (Metoda query_points)
-        # ZMIANA: Używamy query_points zamiast search
-        search_response = _qdrant_client.query_points(
-            collection_name=collection_name,
-            query=query_vector,  # ZMIANA: parametr nazywa się 'query', a nie 'query_vector'
-            limit=top_k,
-            with_payload=True
-        )
+        # KROK 1: Szybka ścieżka dla identyfikatorów (brak trafień -> wyszukiwanie wektorowe)
+        identifiers = detect_identifier_query(query) if _setting_enabled("rag.identifier_lookup") else {}
+        if identifiers:
+            result = _identifier_lookup(collection_name, identifiers, lambda: _embed_query(query),
+                                        top_k, filters, hnsw_ef)
+            if result is not None:
+                print(f"[RAG] Dopasowanie identyfikatorów {identifiers} "
+                      f"({(time.perf_counter() - started) * 1000:.1f} ms)", file=sys.stderr)
+                return result
+            print(f"[RAG] Brak trafień dla {identifiers} - wyszukiwanie wektorowe.", file=sys.stderr)
 
-        # ZMIANA: query_points zwraca obiekt QueryResponse, a punkty są w atrybucie .points
-        points = search_response.points
-
-        if not points:
-            return "Nie znaleziono relewantnych dokumentów w bazie wiedzy ISO 20022."
-
-        # KROK 3: Formatowanie wyniku dla LLM
-        formatted_output = []
-        for i, point in enumerate(points, 1):
-            payload = point.payload or {}
-
-            # Pobieranie pól zgodnie z nowym schematem
-            # Priorytet: 'phrase' -> 'text' -> Placeholder
-            content = payload.get("phrase") or payload.get("text") or "[BRAK TREŚCI]"
-
-            # Metadane źródłowe
-            source_uri = payload.get("source", "nieznane źródło")
-            title = payload.get("title")
-            page = payload.get("page_number")
-
-            # Budowanie nagłówka
-            source_info = f"Źródło: {source_uri}"
-            if title and title not in source_uri:
-                source_info += f" ({title})"
-            if page:
-                source_info += f", Strona: {page}"
-
-            entry = (
-                f"--- DOKUMENT {i} (Relewancja: {point.score:.4f}) ---\n"
-                f"{source_info}\n"
-                f"Treść:\n{content.strip()}"
-            )
-            formatted_output.append(entry)
+        # KROK 1a: Generowanie wektora zapytania (lub odczyt z cache)
+        query_vector = _embed_query(query)
+
+        # KROK 2: Semantyczny cache wyników (klucz: podobieństwo wektora + parametry wyszukiwania)
+        cache = None
+        if _setting_enabled("rag.result_cache.enabled"):
+            cache = _get_result_cache(collection_name)
+            with span("rag.result_cache") as stage:
+                _sync_result_cache(collection_name, cache)
+                cached = cache.get(query_vector, context=search_context)
+                stage.set(hit=cached is not None)
+            if cached is not None:
+                cache.record_latency(True, time.perf_counter() - started)
+                print("[RAG] Wynik z semantycznego cache.", file=sys.stderr)
+                return cached
 
-        return "\n\n".join(formatted_output)
+        # KROK 3-4: Wyszukiwanie w Qdrant i formatowanie
+        result = _search_and_format(collection_name, query_vector, top_k, filters, hnsw_ef)
+
+        if cache is not None:
+            cache.put(query_vector, search_context, result)
+            cache.record_latency(False, time.perf_counter() - started)
+        return result
 
     except Exception as e:
         err_msg = f"Błąd podczas przeszukiwania bazy wiedzy: {str(e)}"
         print(f"[RAG Error] {err_msg}", file=sys.stderr)
-        return err_msg
\ No newline at end of file
+        return err_msg
+
+
+@traced("rag.run_iso_rag")
+async def arun_iso_rag(query: str, top_k: int | None = None, domain: str | None = None,
+                       extension: str | None = None, source: str | None = None,
+                       tags: list[str] | None = None, hnsw_ef: int | None = None) -> str:
+    """
+    ### NATYWNIE ASYNCHRONICZNA WERSJA `run_iso_rag`
+
+    Te same kroki (identyfikatory -> embedding -> semantyczny cache -> wyszukiwanie),
+    ale I/O przez `AsyncQdrantClient` i `aembed_query` na współdzielonych pulach połączeń
+    (`rag.async.max_connections`). Serwer MCP wywołuje ją bezpośrednio w pętli zdarzeń -
+    współbieżne zapytania nie konkurują o wątki domyślnej puli `asyncio.to_thread`.
+
+    Klienty asynchroniczne są wiązane z pętlą zdarzeń przy pierwszym użyciu -
+    funkcję należy wywoływać zawsze z tej samej pętli (serwer MCP).
+    """
+    collection_name = settings.get("vector_db.collection_name")
+    top_k = _clamp_top_k(top_k)
+    filters = filter_values(domain, extension, source, tags)
+    search_context = _search_context(top_k, domain, extension, source, tags, hnsw_ef)
+
+    try:
+        # Inicjalizacja blokuje (blokada, budowa klientów, I/O) - w wątku, poza pętlą zdarzeń
+        if not resources_ready():
+            await asyncio.to_thread(_init_resources)
+    except Exception as e:
+        return f"Błąd techniczny: Nie udało się połączyć z bazą wiedzy ({str(e)})."
+
+    if not (_async_qdrant_client or _local_store) or not _embeddings:
+        return "Błąd techniczny: Narzędzie RAG nie jest poprawnie skonfigurowane."
+
+    print(f"[RAG] Szukam (async): '{query}' w kolekcji '{collection_name}' "
+          f"(top_k={top_k}, filtr: {search_context[1:5]})", file=sys.stderr)
+
+    started = time.perf_counter()
+    try:
+        # KROK 1: Szybka ścieżka dla identyfikatorów (bez embeddingu)
+        identifiers = detect_identifier_query(query) if _setting_enabled("rag.identifier_lookup") else {}
+        if identifiers:
+            result = await _aidentifier_lookup(collection_name, identifiers, lambda: _aembed_query(query),
+                                               top_k, filters, hnsw_ef)
+            if result is not None:
+                print(f"[RAG] Dopasowanie identyfikatorów {identifiers} "
+                      f"({(time.perf_counter() - started) * 1000:.1f} ms)", file=sys.stderr)
+                return result
+            print(f"[RAG] Brak trafień dla {identifiers} - wyszukiwanie wektorowe.", file=sys.stderr)
+
+        # KROK 1a: Wektor zapytania (cache lub async API embeddingów)
+        query_vector = await _aembed_query(query)
+
+        # KROK 2: Semantyczny cache wyników
+        cache = None
+        if _setting_enabled("rag.result_cache.enabled"):
+            cache = _get_result_cache(collection_name)
+            with span("rag.result_cache") as stage:
+                if _version_check_due(collection_name, cache):
+                    cache.ensure_version(await _acollection_version(collection_name))
+                cached = cache.get(query_vector, context=search_context)
+                stage.set(hit=cached is not None)
+            if cached is not None:
+                cache.record_latency(True, time.perf_counter() - started)
+                print("[RAG] Wynik z semantycznego cache.", file=sys.stderr)
+                return cached
+
+        # KROK 3-4: Wyszukiwanie i formatowanie
+        result = await _asearch_and_format(collection_name, query_vector, top_k, filters, hnsw_ef)
+
+        if cache is not None:
+            cache.put(query_vector, search_context, result)
+            cache.record_latency(False, time.perf_counter() - started)
+        return result
+
+    except Exception as e:
+        err_msg = f"Błąd podczas przeszukiwania bazy wiedzy: {str(e)}"
+        print(f"[RAG Error] {err_msg}", file=sys.stderr)
+        return err_msg
+
+
+def _identifier_hit_requests(identifiers: list[dict], top_k: int, filters: dict) -> tuple[list[QueryRequest], list[int]]:
+    """
+    Żądania bez wektora (sam filtr keyword, limit `top_k + 1`) dla zapytań złożonych
+    z identyfikatorów - odpowiednik `scroll` ścieżki pojedynczej, wykonywany przed embeddingiem.
+    Zwraca żądania i numery zapytań, których dotyczą.
+    """
+    positions = [i for i, found in enumerate(identifiers) if found]
+    requests = [
+        QueryRequest(filter=_identifier_filter(identifiers[i], filters), limit=top_k + 1, with_payload=True)
+        for i in positions
+    ]
+    return requests, positions
+
+
+def _split_identifier_hits(responses, positions: list[int], top_k: int) -> tuple[dict[int, list], set[int]]:
+    """
+    `exact`: {nr zapytania: trafienia} - co najwyżej `top_k` trafień, wynik bez embeddingu
+    (jako `Record` bez score - kolejność z bazy, nie relewancja).
+    `ranked`: zapytania z więcej niż `top_k` trafieniami - ranking wektorem w obrębie filtra.
+    """
+    exact, ranked = {}, set()
+    for i, response in zip(positions, responses):
+        if len(response.points) > top_k:
+            ranked.add(i)
+        elif response.points:
+            exact[i] = [Record(id=point.id, payload=point.payload) for point in response.points]
+    return exact, ranked
+
+
+def _batch_identifier_hits(collection_name: str, identifiers: list[dict], top_k: int,
+                           filters: dict) -> tuple[dict[int, list], set[int]]:
+    """Szybka ścieżka identyfikatorów dla wsadu - jedno `query_batch_points` bez wektorów."""
+    requests, positions = _identifier_hit_requests(identifiers, top_k, filters)
+    if _local_store is not None or not requests:
+        return {}, set()
+    with span("rag.identifier_lookup", queries=len(requests)):
+        responses = _qdrant_client.query_batch_points(collection_name=collection_name, requests=requests)
+    return _split_identifier_hits(responses, positions, top_k)
+
+
+async def _abatch_identifier_hits(collection_name: str, identifiers: list[dict], top_k: int,
+                                  filters: dict) -> tuple[dict[int, list], set[int]]:
+    """Asynchroniczny odpowiednik `_batch_identifier_hits`."""
+    requests, positions = _identifier_hit_requests(identifiers, top_k, filters)
+    if _local_store is not None or not requests:
+        return {}, set()
+    with span("rag.identifier_lookup", queries=len(requests)):
+        responses = await _async_qdrant_client.query_batch_points(collection_name=collection_name,
+                                                                  requests=requests)
+    return _split_identifier_hits(responses, positions, top_k)
+
+
+def _batch_requests(query_vectors: list[list[float]], top_k: int, filters: dict,
+                    identifiers: list[dict], hnsw_ef: int | None) -> list[QueryRequest]:
+    """
+    Żądania `query_batch_points` dla zapytań wymagających wyszukiwania wektorowego.
+    Zapytanie z identyfikatorami (więcej trafień niż `top_k`) jest rankingowane wektorem
+    w obrębie filtra keyword, pozostałe - zwykłe wyszukiwanie z filtrami narzędzia.
+    """
+    conditions = _qdrant_conditions(filters)
+    search_params = build_search_params(settings.get("vector_db") or {}, hnsw_ef)
+    return [
+        QueryRequest(
+            query=vector,
+            filter=(_identifier_filter(identifiers[i], filters) if identifiers[i]
+                    else Filter(must=conditions) if conditions else None),
+            params=search_params, limit=top_k, with_payload=True,
+        )
+        for i, vector in enumerate(query_vectors)
+    ]
+
+
+def _batch_search(collection_name: str, query_vectors: list[list[float]], top_k: int,
+                  filters: dict, identifiers: list[dict], hnsw_ef: int | None = None) -> list[list]:
+    """
+    Wyszukiwanie dla wszystkich zapytań w JEDNYM wywołaniu `query_batch_points`
+    (żądania wg `_batch_requests`). Backend "local": `query_batch`.
+    """
+    if not query_vectors:
+        return []
+    if _local_store is not None:
+        with span("rag.search", backend="local", queries=len(query_vectors)):
+            return _local_store.query_batch(query_vectors, limit=top_k, filters=filters or None)
+
+    requests = _batch_requests(query_vectors, top_k, filters, identifiers, hnsw_ef)
+    with span("rag.search", backend="qdrant", queries=len(query_vectors)):
+        responses = _qdrant_client.query_batch_points(collection_name=collection_name, requests=requests)
+    return [response.points for response in responses]
+
+
+async def _abatch_search(collection_name: str, query_vectors: list[list[float]], top_k: int,
+                         filters: dict, identifiers: list[dict], hnsw_ef: int | None = None) -> list[list]:
+    """Asynchroniczny odpowiednik `_batch_search` (AsyncQdrantClient)."""
+    if not query_vectors:
+        return []
+    if _local_store is not None:
+        with span("rag.search", backend="local", queries=len(query_vectors)):
+            return await asyncio.to_thread(_local_store.query_batch, query_vectors, top_k, filters or None)
+
+    requests = _batch_requests(query_vectors, top_k, filters, identifiers, hnsw_ef)
+    with span("rag.search", backend="qdrant", queries=len(query_vectors)):
+        responses = await _async_qdrant_client.query_batch_points(collection_name=collection_name,
+                                                                  requests=requests)
+    return [response.points for response in responses]
+
+
+def _pending_queries(query_count: int, exact: dict[int, list]) -> list[int]:
+    # Zapytania bez dokładnego wyniku identyfikatorów - wymagają embeddingu
+    return [i for i in range(query_count) if i not in exact]
+
+
+def _merge_batch_results(query_count: int, exact: dict[int, list], pending: list[int],
+                         searched: list[list]) -> list[list]:
+    searched_by_query = dict(zip(pending, searched))
+    return [exact[i] if i in exact else searched_by_query[i] for i in range(query_count)]
+
+
+def _unique_batch_queries(queries: list[str] | None) -> list[str]:
+    # Deduplikacja pytań (po normalizacji) i limit `rag.batch.max_queries`
+    unique_queries, seen = [], set()
+    for query in queries or []:
+        key = normalize_query(query)
+        if key and key not in seen:
+            seen.add(key)
+            unique_queries.append(query.strip())
+
+    max_queries = int(settings.get("rag.batch.max_queries", 8))
+    if len(unique_queries) > max_queries:
+        print(f"[RAG] Wsad ograniczony do {max_queries} z {len(unique_queries)} pytań.", file=sys.stderr)
+        unique_queries = unique_queries[:max_queries]
+    return unique_queries
+
+
+def _batch_identifiers(queries: list[str]) -> list[dict]:
+    use_identifiers = _setting_enabled("rag.identifier_lookup")
+    return [detect_identifier_query(query) if use_identifiers else {} for query in queries]
+
+
+def _rank_score(point) -> float:
+    # Dokładne dopasowanie identyfikatora (Record bez score) przed trafieniami wektorowymi
+    score = getattr(point, "score", None)
+    return float("inf") if score is None else score
+
+
+def _format_batch(queries: list[str], results: list[list], started: float) -> str:
+    """
+    Deduplikacja trafień między pytaniami (po ID punktu, najwyższy score) -
+    każdy fragment jest zwracany raz, z numerami pytań, do których pasuje.
+    """
+    best: dict = {}
+    matched_by: dict = {}
+    for query_number, points in enumerate(results, 1):
+        for point in points:
+            if point.id not in best or _rank_score(point) > _rank_score(best[point.id]):
+                best[point.id] = point
+            matched_by.setdefault(point.id, []).append(query_number)
+
+    print(f"[RAG] Wsad: {sum(len(points) for points in results)} trafień, {len(best)} unikalnych "
+          f"({(time.perf_counter() - started) * 1000:.1f} ms)", file=sys.stderr)
+
+    header = "PYTANIA:\n" + "\n".join(f"[{n}] {query}" for n, query in enumerate(queries, 1))
+    if not best:
+        return f"{header}\n\nNie znaleziono relewantnych dokumentów w bazie wiedzy ISO 20022."
+
+    points = sorted(best.values(), key=_rank_score, reverse=True)
+    labels = ["pytania: " + ", ".join(map(str, matched_by[point.id])) for point in points]
+    with span("rag.format", points=len(points)):
+        return f"{header}\n\n{_format_points(points, labels)}"
+
+
+@traced("rag.run_iso_rag_batch")
+def run_iso_rag_batch(queries: list[str], top_k: int | None = None, domain: str | None = None,
+                      extension: str | None = None, source: str | None = None,
+                      tags: list[str] | None = None, hnsw_ef: int | None = None) -> str:
+    """
+    ### WSADOWE WYSZUKIWANIE (wiele pod-pytań w jednym wywołaniu)
+
+    Pytanie złożone ("pola obowiązkowe GrpHdr", "długość EndToEndId", "VR00060") obsługiwane
+    jednym round-tripem zamiast osobnego wywołania narzędzia na każde pod-pytanie:
+
+    1. Deduplikacja pytań (po normalizacji) i limit `rag.batch.max_queries`.
+    2. Pytania z identyfikatorami: jedno `query_batch_points` z samym filtrem keyword -
+       co najwyżej `top_k` trafień to gotowy wynik (bez embeddingu).
+    3. Wektory pozostałych pytań: cache + jedno żądanie embeddingów dla brakujących.
+    4. Jedno `query_batch_points` w Qdrant (lub `query_batch` w backendzie lokalnym).
+    5. Deduplikacja trafień między pytaniami (po ID punktu, najwyższy score) -
+       każdy fragment jest zwracany raz, z numerami pytań, do których pasuje.
+
+    `top_k` i filtry (`domain` / `extension` / `source` / `tags`) dotyczą każdego pytania.
+    Semantyczny cache wyników nie jest używany (dotyczy pojedynczych pytań).
+    """
+    collection_name = settings.get("vector_db.collection_name")
+    top_k = _clamp_top_k(top_k)
+    unique_queries = _unique_batch_queries(queries)
+    if not unique_queries:
+        return "Brak pytań do wyszukania."
+    filters = filter_values(domain, extension, source, tags)
+
+    try:
+        _init_resources()
+    except Exception as e:
+        return f"Błąd techniczny: Nie udało się połączyć z bazą wiedzy ({str(e)})."
+
+    if not (_qdrant_client or _local_store) or not _embeddings:
+        return "Błąd techniczny: Narzędzie RAG nie jest poprawnie skonfigurowane."
+
+    print(f"[RAG] Wsad {len(unique_queries)} pytań w kolekcji '{collection_name}' (top_k={top_k})", file=sys.stderr)
+
+    started = time.perf_counter()
+    try:
+        identifiers = _batch_identifiers(unique_queries)
+        exact, ranked = _batch_identifier_hits(collection_name, identifiers, top_k, filters)
+        pending = _pending_queries(len(unique_queries), exact)
+        query_vectors = _embed_queries([unique_queries[i] for i in pending]) if pending else []
+        searched = _batch_search(collection_name, query_vectors, top_k, filters,
+                                 [identifiers[i] if i in ranked else {} for i in pending], hnsw_ef)
+        results = _merge_batch_results(len(unique_queries), exact, pending, searched)
+        return _format_batch(unique_queries, results, started)
+
+    except Exception as e:
+        err_msg = f"Błąd podczas wsadowego przeszukiwania bazy wiedzy: {str(e)}"
+        print(f"[RAG Error] {err_msg}", file=sys.stderr)
+        return err_msg
+
+
+@traced("rag.run_iso_rag_batch")
+async def arun_iso_rag_batch(queries: list[str], top_k: int | None = None, domain: str | None = None,
+                             extension: str | None = None, source: str | None = None,
+                             tags: list[str] | None = None, hnsw_ef: int | None = None) -> str:
+    """
+    ### NATYWNIE ASYNCHRONICZNA WERSJA `run_iso_rag_batch`
+
+    Te same kroki, ale embeddingi przez `aembed_documents`, a wyszukiwanie przez
+    `AsyncQdrantClient.query_batch_points` - bez zajmowania wątku na czas I/O.
+    """
+    collection_name = settings.get("vector_db.collection_name")
+    top_k = _clamp_top_k(top_k)
+    unique_queries = _unique_batch_queries(queries)
+    if not unique_queries:
+        return "Brak pytań do wyszukania."
+    filters = filter_values(domain, extension, source, tags)
+
+    try:
+        if not resources_ready():
+            await asyncio.to_thread(_init_resources)
+    except Exception as e:
+        return f"Błąd techniczny: Nie udało się połączyć z bazą wiedzy ({str(e)})."
+
+    if not (_async_qdrant_client or _local_store) or not _embeddings:
+        return "Błąd techniczny: Narzędzie RAG nie jest poprawnie skonfigurowane."
+
+    print(f"[RAG] Wsad (async) {len(unique_queries)} pytań w kolekcji '{collection_name}' (top_k={top_k})",
+          file=sys.stderr)
+
+    started = time.perf_counter()
+    try:
+        identifiers = _batch_identifiers(unique_queries)
+        exact, ranked = await _abatch_identifier_hits(collection_name, identifiers, top_k, filters)
+        pending = _pending_queries(len(unique_queries), exact)
+        query_vectors = await _aembed_queries([unique_queries[i] for i in pending]) if pending else []
+        searched = await _abatch_search(collection_name, query_vectors, top_k, filters,
+                                        [identifiers[i] if i in ranked else {} for i in pending], hnsw_ef)
+        results = _merge_batch_results(len(unique_queries), exact, pending, searched)
+        return _format_batch(unique_queries, results, started)
+
+    except Exception as e:
+        err_msg = f"Błąd podczas wsadowego przeszukiwania bazy wiedzy: {str(e)}"
+        print(f"[RAG Error] {err_msg}", file=sys.stderr)
+        return err_msg
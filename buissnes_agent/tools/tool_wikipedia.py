@@ -1,7 +1,10 @@
 import sys
 import wikipedia
 
+from .tracing import span, traced
 
+
+@traced("wikipedia.run_search")
 def run_wikipedia_search(query: str) -> str:
     """
     ### WYSZUKIWANIE W WIKIPEDII
@@ -16,7 +19,9 @@ def run_wikipedia_search(query: str) -> str:
 
     try:
         # 1. Wyszukiwanie listy pasujących artykułów
-        search_results = wikipedia.search(query)
+        with span("wikipedia.search") as stage:
+            search_results = wikipedia.search(query)
+            stage.set(hits=len(search_results))
 
         if not search_results:
             return "Nie znaleziono artykułów w Wikipedii na ten temat."
@@ -24,7 +29,8 @@ def run_wikipedia_search(query: str) -> str:
         # 2. Pobranie treści pierwszego (najbardziej trafnego) wyniku
         # auto_suggest=False wyłączamy, aby biblioteka nie zgadywała "za bardzo"
         page_title = search_results[0]
-        page = wikipedia.page(page_title, auto_suggest=False)
+        with span("wikipedia.get_page", title=page_title):
+            page = wikipedia.page(page_title, auto_suggest=False)
 
         # 3. Przycinanie treści (Content Truncation)
         # Pobieramy tylko pierwsze 1500 znaków. LLM nie potrzebuje całego artykułu,
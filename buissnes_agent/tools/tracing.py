@@ -0,0 +1,319 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from buissnes_agent.config_loader import settings
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# LEKKIE ŚLEDZENIE ETAPÓW (SPANY) + HISTOGRAMY OPÓŹNIEŃ
+# ==============================================================================
+# Narzędzia logowały tylko na stderr - nie było widać, jak 2 s wywołania rozkładają się
+# na embedding, Qdrant, HTTP do Confluence, parsowanie HTML i formatowanie.
+#
+# `span("rag.embed")` mierzy etap i zagnieżdża go w bieżącym spanie (ContextVar - działa
+# w korutynach, w `asyncio.to_thread` i w pulach grodzi). Każdy span trafia do histogramu
+# opóźnień (endpoint /metrics serwera MCP), a zakończony span główny (wywołanie narzędzia)
+# jest eksportowany wg `observability.tracing.exporter`:
+#   none  - tylko histogramy,
+#   json  - jedna linia JSON na wywołanie (drzewo spanów) w `json_log_path`,
+#   otel  - OpenTelemetry (OTLP, konfiguracja przez zmienne OTEL_*; wymaga pakietów opentelemetry).
+
+# Granice kubełków histogramu (sekundy) - od trafień w cache do wolnego Confluence
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "attributes", "trace_id", "started_at", "started", "duration",
+                 "status", "children", "_otel_span")
+
+    def __init__(self, name: str, attributes: Dict[str, Any], trace_id: str):
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = trace_id
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+        self.children: List["Span"] = []
+        self._otel_span = None
+
+    def set(self, **attributes: Any) -> None:
+        """Dopisuje atrybuty w trakcie etapu (np. liczba trafień, trafienie w cache)."""
+        self.attributes.update(attributes)
+        if self._otel_span is not None:
+            for key, value in attributes.items():
+                self._otel_span.set_attribute(key, _otel_value(value))
+
+    def mark_error(self, reason: str) -> None:
+        """Błąd zwrócony jako wynik (narzędzia zwracają tekst błędu zamiast wyjątku)."""
+        self.status = "error"
+        self.set(error=reason)
+
+    def to_dict(self) -> Dict[str, Any]:
+        entry = {
+            "name": self.name,
+            "duration_ms": round((self.duration or 0.0) * 1000.0, 2),
+            "status": self.status,
+        }
+        if self.attributes:
+            entry["attributes"] = self.attributes
+        if self.children:
+            entry["spans"] = [child.to_dict() for child in list(self.children)]
+        return entry
+
+
+class _NoopSpan:
+    # Śledzenie wyłączone: `with span(...) as s: s.set(...)` działa bez pomiaru
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def mark_error(self, reason: str) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class LatencyHistogram:
+    """Histogram skumulowany (jak w Prometheus): liczniki per kubełek, suma, liczba, błędy."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # ostatni kubełek: +Inf
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def record(self, seconds: float, error: bool = False) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Przybliżony kwantyl (górna granica kubełka) - do podglądu w JSON."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total / self.count * 1000.0, 2) if self.count else None,
+            "p50_le_ms": _ms(self.quantile(0.5)),
+            "p95_le_ms": _ms(self.quantile(0.95)),
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000.0, 2)
+
+
+# Histogramy per nazwa spanu ("tool.<narzędzie>" - całe wywołanie, pozostałe - etapy)
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+# Eksporter (inicjalizowany leniwie przy pierwszym spanie głównym)
+_exporter_lock = threading.Lock()
+_exporter: Optional[str] = None
+_json_log_path: Optional[str] = None
+_json_log_lock = threading.Lock()
+_otel_tracer = None
+
+
+def _setting_enabled(key: str, default: bool = True) -> bool:
+    # Wartości z ENV (APP__...) przychodzą jako stringi
+    return str(settings.get(key, default)).lower() in ("true", "1", "yes", "on")
+
+
+def _init_exporter() -> str:
+    global _exporter, _json_log_path, _otel_tracer
+    if _exporter is not None:
+        return _exporter
+
+    with _exporter_lock:
+        if _exporter is not None:
+            return _exporter
+
+        exporter = str(settings.get("observability.tracing.exporter", "none")).lower()
+        if exporter == "otel":
+            try:
+                from opentelemetry import trace
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                from opentelemetry.sdk.resources import Resource
+                from opentelemetry.sdk.trace import TracerProvider
+                from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+                service_name = settings.get("observability.tracing.service_name", "iso20022-mcp")
+                provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+                provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                trace.set_tracer_provider(provider)
+                _otel_tracer = trace.get_tracer("buissnes_agent.tools")
+            except ImportError:
+                logger.warning("Brak pakietów opentelemetry-sdk / opentelemetry-exporter-otlp - "
+                               "spany zapisywane lokalnie w JSON.")
+                exporter = "json"
+
+        if exporter == "json":
+            _json_log_path = settings.get("observability.tracing.json_log_path", "logs/traces.jsonl")
+            directory = os.path.dirname(_json_log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        _exporter = exporter
+        return _exporter
+
+
+def _otel_value(value: Any) -> Any:
+    # Atrybuty OpenTelemetry: tylko typy proste (i ich listy)
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, (list, tuple)) and all(isinstance(item, (str, bool, int, float)) for item in value):
+        return list(value)
+    return str(value)
+
+
+def _export(root: Span) -> None:
+    if _exporter != "json":
+        return
+    entry = {
+        "trace_id": root.trace_id,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(root.started_at)),
+        **root.to_dict(),
+    }
+    line = json.dumps(entry, ensure_ascii=False, default=str)
+    try:
+        with _json_log_lock, open(_json_log_path, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+    except OSError as e:
+        logger.warning(f"Nie udało się zapisać śladu do {_json_log_path}: {e}")
+
+
+def _record(name: str, seconds: float, error: bool) -> None:
+    with _histograms_lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = LatencyHistogram()
+        histogram.record(seconds, error)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    ### Pomiar etapu: `with span("rag.search", backend="qdrant") as s: ...`
+
+    Span bez rodzica (np. wywołanie narzędzia MCP) jest spanem głównym - po zakończeniu
+    całe drzewo jest eksportowane. Wyjątek oznacza span jako błąd i jest przekazywany dalej.
+    Przy `observability.tracing.enabled: false` zwraca pusty span (bez pomiaru i eksportu).
+    """
+    if not _setting_enabled("observability.tracing.enabled"):
+        yield _NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    if parent is None:
+        _init_exporter()
+    current = Span(name, attributes, parent.trace_id if parent else uuid.uuid4().hex)
+
+    otel_context = (_otel_tracer.start_as_current_span(
+        name, attributes={key: _otel_value(value) for key, value in attributes.items()})
+        if _otel_tracer is not None else nullcontext())
+    token = _current_span.set(current)
+    try:
+        with otel_context as otel_span:
+            current._otel_span = otel_span
+            yield current
+    except BaseException as e:
+        current.status = "error"
+        current.attributes.setdefault("error", type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.duration = time.perf_counter() - current.started
+        if parent is not None:
+            parent.children.append(current)
+        _record(name, current.duration, current.status == "error")
+        if parent is None:
+            _export(current)
+
+
+def traced(name: str):
+    """Dekorator: całe wywołanie funkcji (synchronicznej lub korutyny) jako span `name`."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_latency_histograms() -> Dict[str, Dict[str, Any]]:
+    """Podsumowanie histogramów per span (liczba, błędy, średnia, przybliżone p50 / p95)."""
+    with _histograms_lock:
+        return {name: histogram.summary() for name, histogram in sorted(_histograms.items())}
+
+
+def render_prometheus() -> str:
+    """
+    Histogramy w formacie tekstowym Prometheus:
+    `mcp_tool_duration_seconds{tool=...}` (spany "tool.*") i `mcp_stage_duration_seconds{stage=...}`.
+    """
+    with _histograms_lock:
+        snapshot = {name: (list(h.counts), h.total, h.count, h.errors, h.buckets)
+                    for name, h in sorted(_histograms.items())}
+
+    families = {
+        "mcp_tool_duration_seconds": ("tool", "Czas wywołania narzędzia MCP"),
+        "mcp_stage_duration_seconds": ("stage", "Czas etapu wewnątrz narzędzia"),
+    }
+    lines = []
+    for metric, (label, help_text) in families.items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        for name, (counts, total, count, _, buckets) in snapshot.items():
+            is_tool = name.startswith("tool.")
+            if is_tool != (label == "tool"):
+                continue
+            value = name[len("tool."):] if is_tool else name
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{label}="{value}",le="+Inf"}} {count}')
+            lines.append(f'{metric}_sum{{{label}="{value}"}} {total:.6f}')
+            lines.append(f'{metric}_count{{{label}="{value}"}} {count}')
+
+    lines += ["# HELP mcp_span_errors_total Liczba spanów zakończonych wyjątkiem",
+              "# TYPE mcp_span_errors_total counter"]
+    for name, (_, _, _, errors, _) in snapshot.items():
+        lines.append(f'mcp_span_errors_total{{span="{name}"}} {errors}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,101 @@
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+from buissnes_agent.tools.bulkhead import ToolBulkhead, ToolBusyError
+from buissnes_agent.tools.metrics import LatencyStats
+
+
+def test_concurrency_is_limited_and_queue_drains():
+    async def scenario():
+        bulkhead = ToolBulkhead("rag", max_concurrency=2, max_queue=10, queue_timeout=0)
+        running, peak = 0, 0
+
+        async def work():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "ok"
+
+        results = await asyncio.gather(*(bulkhead.run(work) for _ in range(6)))
+        return results, peak, bulkhead.stats()
+
+    results, peak, stats = asyncio.run(scenario())
+    assert results == ["ok"] * 6
+    assert peak == 2
+    assert stats["completed"] == 6 and stats["rejected"] == 0
+    assert stats["active"] == 0 and stats["queued"] == 0
+    assert stats["max_queued"] >= 4
+    assert stats["wait_time"]["count"] == 6
+
+
+def test_full_queue_rejects_immediately():
+    async def scenario():
+        bulkhead = ToolBulkhead("confluence", max_concurrency=1, max_queue=1, queue_timeout=0)
+        release = asyncio.Event()
+
+        async def blocked():
+            await release.wait()
+            return "ok"
+
+        first = asyncio.create_task(bulkhead.run(blocked))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(bulkhead.run(blocked))
+        await asyncio.sleep(0)
+        with pytest.raises(ToolBusyError) as error:
+            await bulkhead.run(blocked)
+        release.set()
+        return await asyncio.gather(first, second), error.value, bulkhead.stats()
+
+    results, error, stats = asyncio.run(scenario())
+    assert results == ["ok", "ok"]
+    assert error.tool_name == "confluence" and "kolejka pełna" in error.reason
+    assert stats["rejected"] == 1 and stats["completed"] == 2
+
+
+def test_queue_timeout_raises_busy():
+    async def scenario():
+        bulkhead = ToolBulkhead("wiki", max_concurrency=1, max_queue=5, queue_timeout=0.02)
+        release = asyncio.Event()
+        holder = asyncio.create_task(bulkhead.run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(ToolBusyError):
+            await bulkhead.run(release.wait)
+        release.set()
+        await holder
+        return bulkhead.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["timeouts"] == 1 and stats["rejected"] == 1
+    assert stats["queued"] == 0 and stats["completed"] == 1
+
+
+def test_run_in_executor_uses_own_pool_and_copies_context():
+    request_id = contextvars.ContextVar("request_id", default=None)
+
+    def blocking():
+        return threading.current_thread().name, request_id.get()
+
+    async def scenario():
+        bulkhead = ToolBulkhead("rag", max_concurrency=1)
+        request_id.set("abc")
+        return await bulkhead.run(lambda: bulkhead.run_in_executor(blocking))
+
+    thread_name, value = asyncio.run(scenario())
+    assert thread_name.startswith("tool-rag")
+    assert value == "abc"
+
+
+def test_latency_stats_window_and_summary():
+    stats = LatencyStats(window=3)
+    assert stats.summary() == {"count": 0, "mean_ms": None, "p50_ms": None, "p95_ms": None}
+    for seconds in (1.0, 0.001, 0.002, 0.003):
+        stats.record(seconds)
+    summary = stats.summary()
+    # Licznik obejmuje wszystkie pomiary, percentyle tylko ostatnie `window`
+    assert summary["count"] == 4
+    assert summary["p50_ms"] == 2.0 and summary["mean_ms"] == 2.0
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+
+from buissnes_agent.textchunker.langchain.LangChainChunker import LangChainChunker
+from buissnes_agent.tools.context_packer import pack_context
+
+
+def _point(text, score=None, **payload):
+    return SimpleNamespace(payload={"source": "a.md", "text": text, **payload}, score=score)
+
+
+def test_overlapping_neighbours_are_merged_once():
+    document = "Pierwsze zdanie o GrpHdr. Drugie zdanie o MsgId. Trzecie zdanie o CdtTrfTxInf."
+    points = [
+        _point(document[26:], 0.9, char_start=26, char_end=len(document)),
+        _point(document[:48], 0.8, char_start=0, char_end=48),
+    ]
+    result = pack_context(points)
+
+    assert document in result
+    assert result.count("MsgId") == 1
+    assert "scalone fragmenty: 2" in result
+    assert "Relewancja: 0.9000" in result
+
+
+def test_distant_chunks_and_duplicates_without_offsets():
+    points = [
+        _point("A" * 10, 0.9, char_start=0, char_end=10),
+        _point("B" * 10, 0.8, char_start=500, char_end=510),
+        _point("bez offsetów", 0.7),
+        _point("bez offsetów", 0.6),
+    ]
+    result = pack_context(points)
+
+    assert "scalone" not in result
+    assert result.count("bez offsetów") == 1
+    # Bloki jednego źródła w kolejności występowania w dokumencie
+    assert result.index("znaki 0-10") < result.index("znaki 500-510")
+
+
+def test_budget_skips_lower_ranked_blocks_and_truncates_first():
+    points = [_point("słowo " * 50, 0.9, token_count=60, source="x"),
+              _point("inne " * 50, 0.5, token_count=60, source="y")]
+    result = pack_context(points, token_budget=100)
+    assert "ŹRÓDŁO 1: x" in result and "ŹRÓDŁO 2" not in result
+    assert "Pominięto 1 fragmentów" in result
+
+    truncated = pack_context([_point("słowo " * 200, 0.9, token_count=200)], token_budget=40)
+    assert "[...]" in truncated
+
+
+def test_empty_result_message():
+    assert pack_context([]).startswith("Nie znaleziono")
+
+
+def test_langchain_recursive_chunks_carry_offsets_and_merge_back():
+    content = "Wstęp o GrpHdr. " + " ".join(f"słowo{i}" for i in range(120))
+    chunks = LangChainChunker("recursive", 200, 40).process_content(content, {"source": "a.txt"})
+
+    assert len(chunks) > 2
+    for chunk in chunks:
+        metadata = chunk["metadata"]
+        assert content[metadata["char_start"]:metadata["char_end"]] == chunk["text"]
+        assert "start_index" not in metadata
+
+    points = [SimpleNamespace(payload=chunk["metadata"] | {"text": chunk["text"]}, score=0.5) for chunk in chunks]
+    packed = pack_context(points, token_budget=10_000, max_gap=2)
+    assert f"scalone fragmenty: {len(chunks)}" in packed
+    # Overlap sąsiednich chunków występuje w wyniku raz
+    assert content in packed
+
+
+def test_langchain_enforce_limit_gives_sub_chunks_own_offsets():
+    chunker = LangChainChunker("recursive", 50, 10)
+    content = "x" * 20 + " " + "słowo " * 40
+    parent = Document(page_content=content[21:], metadata={"char_start": 21, "char_end": len(content)})
+
+    sub_docs = chunker._enforce_limit([parent])
+    assert len(sub_docs) > 1
+    for doc in sub_docs:
+        assert content[doc.metadata["char_start"]:doc.metadata["char_end"]] == doc.page_content
+
+
+def test_langchain_markdown_header_chunks_have_no_offsets():
+    content = "# A\nTekst sekcji A.\n\n## B\nTekst sekcji B."
+    chunks = LangChainChunker("markdownHeaderTextSplitter", 500, 0).process_content(content, {"source": "a.md"})
+    assert chunks and all("char_start" not in chunk["metadata"] for chunk in chunks)
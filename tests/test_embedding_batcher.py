@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from buissnes_agent.tools.embedding_batcher import EmbeddingMicroBatcher
+
+
+class _FakeEmbeddings:
+    # embed_many bez sieci: wektor = [długość tekstu], zapamiętuje paczki
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    async def __call__(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(0)
+        if self.error:
+            raise self.error
+        return [[float(len(text))] for text in texts]
+
+
+def test_concurrent_requests_share_one_call_and_deduplicate():
+    embed_many = _FakeEmbeddings()
+    batcher = EmbeddingMicroBatcher(embed_many, window_ms=20, max_batch_size=32)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.embed(text) for text in ("a", "bb", "a", "ccc")))
+
+    assert asyncio.run(scenario()) == [[1.0], [2.0], [1.0], [3.0]]
+    assert embed_many.calls == [["a", "bb", "ccc"]]
+    stats = batcher.stats()
+    assert (stats["batches"], stats["requests"], stats["pending"]) == (1, 4, 0)
+    assert stats["batch_size"]["max"] == 4 and stats["queue_delay"]["count"] == 4
+
+
+def test_full_batch_is_dispatched_without_waiting_for_window():
+    embed_many = _FakeEmbeddings()
+    # Okno 10 s: gdyby paczki czekały na timer, test przekroczyłby limit czasu
+    batcher = EmbeddingMicroBatcher(embed_many, window_ms=10_000, max_batch_size=2)
+
+    async def scenario():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.embed(str(i) * i) for i in (1, 2, 3, 4))), 1)
+
+    assert asyncio.run(scenario()) == [[1.0], [2.0], [3.0], [4.0]]
+    assert embed_many.calls == [["1", "22"], ["333", "4444"]]
+
+
+def test_failure_is_propagated_to_every_waiter():
+    batcher = EmbeddingMicroBatcher(_FakeEmbeddings(error=RuntimeError("API 503")), window_ms=1)
+
+    async def scenario():
+        return await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert batcher.stats()["failures"] == 1
+
+
+def test_cancelled_waiter_does_not_break_the_batch():
+    embed_many = _FakeEmbeddings()
+    batcher = EmbeddingMicroBatcher(embed_many, window_ms=20)
+
+    async def scenario():
+        cancelled = asyncio.ensure_future(batcher.embed("x"))
+        kept = asyncio.ensure_future(batcher.embed("yy"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await kept, cancelled
+
+    result, cancelled = asyncio.run(scenario())
+    assert result == [2.0]
+    with pytest.raises(asyncio.CancelledError):
+        cancelled.result()
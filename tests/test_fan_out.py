@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from buissnes_agent.textchunker.token_count import estimate_tokens
+from buissnes_agent.tools import tool_fan_out
+from buissnes_agent.tools.tool_fan_out import SourceResult, allocate_budget, gather_sources, merge_results
+
+
+@pytest.fixture(autouse=True)
+def offline_tokens(monkeypatch):
+    # Bez pobierania kodowania tiktoken - deterministyczne przybliżenie ~4 znaki na token
+    monkeypatch.setattr(tool_fan_out, "count_tokens", estimate_tokens)
+
+
+def test_allocate_budget_gives_everyone_what_fits():
+    assert allocate_budget({"iso": 100, "wikipedia": 50}, {}, 1000) == {"iso": 100, "wikipedia": 50}
+
+
+def test_allocate_budget_redistributes_surplus_by_weight():
+    allocation = allocate_budget({"iso": 900, "confluence": 900, "wikipedia": 50},
+                                 {"iso": 2.0, "confluence": 1.0, "wikipedia": 1.0}, 1000)
+    # Wikipedia potrzebuje mniej niż swój udział - reszta dzielona 2:1
+    assert allocation["wikipedia"] == 50
+    assert allocation["iso"] == 633 and allocation["confluence"] == 316
+    assert sum(allocation.values()) <= 1000
+
+
+def test_allocate_budget_with_no_budget():
+    assert allocate_budget({"iso": 10}, {}, 0) == {"iso": 0}
+
+
+def test_merge_results_orders_sections_and_truncates_to_budget():
+    results = [
+        SourceResult("wikipedia", "Krótki opis.", "ok", 12.0),
+        SourceResult("iso", "\n".join(f"Linia {i} specyfikacji GrpHdr." for i in range(400)), "ok", 80.0),
+        SourceResult("confluence", "Przekroczono limit czasu (5 s) - źródło pominięte.", "timeout", 5000.0),
+    ]
+    merged = merge_results(results, token_budget=400, weights={"iso": 2.0})
+
+    assert merged.index("ŹRÓDŁO: BAZA WIEDZY ISO") < merged.index("ŹRÓDŁO: CONFLUENCE") < merged.index("ŹRÓDŁO: WIKIPEDIA")
+    assert "[timeout, 5000 ms]" in merged
+    assert "Krótki opis." in merged
+    assert "(ucięto - limit kontekstu)" in merged
+    assert estimate_tokens(merged) <= 400
+
+
+def test_gather_sources_isolates_timeouts_and_errors():
+    async def fast():
+        return "wynik"
+
+    async def slow():
+        await asyncio.sleep(5)
+        return "za późno"
+
+    async def broken():
+        raise ConnectionError("brak sieci")
+
+    results = asyncio.run(gather_sources({"iso": fast, "confluence": slow, "wikipedia": broken},
+                                         {"confluence": 0.05}))
+    by_source = {result.source: result for result in results}
+    assert (by_source["iso"].status, by_source["iso"].text) == ("ok", "wynik")
+    assert by_source["confluence"].status == "timeout" and by_source["confluence"].duration_ms < 1000
+    assert by_source["wikipedia"].status == "error" and "brak sieci" in by_source["wikipedia"].text
@@ -0,0 +1,109 @@
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from buissnes_agent.textchunker.iso_identifiers import (
+    MESSAGE_FIELD, MESSAGE_VERSION_FIELD, REASON_CODES_FIELD, RULE_IDS_FIELD, XML_TAGS_FIELD,
+    detect_identifier_query, extract_identifiers,
+)
+from buissnes_agent.tools import tool_iso_rag
+
+
+def test_extracts_messages_rules_codes_and_tags():
+    found = extract_identifiers(
+        "Reguła VR00060 dla pacs.008.001.08: blok <GrpHdr> i pole EndToEndId, kod zwrotu AM09.")
+    assert found == {
+        MESSAGE_FIELD: ["pacs.008"],
+        MESSAGE_VERSION_FIELD: ["pacs.008.001.08"],
+        XML_TAGS_FIELD: ["EndToEndId", "GrpHdr"],
+        REASON_CODES_FIELD: ["AM09"],
+        RULE_IDS_FIELD: ["VR00060"],
+    }
+
+
+def test_xsd_names_are_tags_but_xsd_vocabulary_is_not():
+    found = extract_identifiers('<xs:complexType name="GroupHeader93"><xs:element name="MsgId"/>')
+    assert found[XML_TAGS_FIELD] == ["GroupHeader93", "MsgId"]
+
+
+def test_ordinary_pascal_case_words_are_not_tags():
+    assert XML_TAGS_FIELD not in extract_identifiers("Wideo na YouTube, kod na GitHub, płatność PayPal.")
+    assert extract_identifiers("IntrBkSttlmAmt i CdtTrfTxInf")[XML_TAGS_FIELD] == ["CdtTrfTxInf", "IntrBkSttlmAmt"]
+
+
+def test_reason_codes_only_from_iso_code_families():
+    assert extract_identifiers("Kody AC01, RR04 i DS0G")[REASON_CODES_FIELD] == ["AC01", "RR04"]
+    assert REASON_CODES_FIELD not in extract_identifiers("Kod pocztowy PL12, model XY99, formularz PIT37")
+
+
+def test_detect_identifier_query():
+    assert detect_identifier_query("am09?") == {REASON_CODES_FIELD: ["AM09"]}
+    assert detect_identifier_query("GrpHdr MsgId") == {XML_TAGS_FIELD: ["GrpHdr", "MsgId"]}
+    assert detect_identifier_query("pacs.008.001.08") == {MESSAGE_VERSION_FIELD: ["pacs.008.001.08"]}
+    assert detect_identifier_query("co oznacza AM09") == {}
+    assert detect_identifier_query("YouTube") == {}
+    assert detect_identifier_query("XY12") == {}
+    assert detect_identifier_query("AM09 AC01 RR04 DS01 MD01") == {}
+
+
+@pytest.fixture
+def iso_collection(monkeypatch):
+    client = QdrantClient(":memory:")
+    client.create_collection("iso", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    client.upsert("iso", points=[
+        PointStruct(id=1, vector=[1.0, 0.0], payload={"phrase": "AM09 wstęp", "source": "a", REASON_CODES_FIELD: ["AM09"]}),
+        PointStruct(id=2, vector=[0.0, 1.0], payload={"phrase": "AM09 definicja", "source": "b", REASON_CODES_FIELD: ["AM09"]}),
+        PointStruct(id=3, vector=[0.0, 1.0], payload={"phrase": "bez kodu", "source": "c"}),
+        PointStruct(id=4, vector=[1.0, 1.0], payload={"phrase": "VR00060", "source": "d", RULE_IDS_FIELD: ["VR00060"]}),
+    ])
+    monkeypatch.setattr(tool_iso_rag, "_qdrant_client", client)
+    monkeypatch.setattr(tool_iso_rag, "_local_store", None)
+    monkeypatch.setattr(tool_iso_rag, "_render_points", lambda points: [point.id for point in points])
+    return client
+
+
+def test_identifier_lookup_returns_exact_hits_without_embedding(iso_collection):
+    def embed():
+        raise AssertionError("embedding nie powinien być wywołany")
+
+    lookup = tool_iso_rag._identifier_lookup
+    assert lookup("iso", {REASON_CODES_FIELD: ["AM09"]}, embed, top_k=5) == [1, 2]
+    assert lookup("iso", {REASON_CODES_FIELD: ["AM09"]}, embed, top_k=5, filters={"source": "a"}) == [1]
+    assert lookup("iso", {REASON_CODES_FIELD: ["AC01"]}, embed, top_k=5) is None
+
+
+def test_identifier_lookup_ranks_by_vector_only_above_top_k(iso_collection):
+    calls = []
+
+    def embed():
+        calls.append(1)
+        return [0.0, 1.0]
+
+    assert tool_iso_rag._identifier_lookup("iso", {REASON_CODES_FIELD: ["AM09"]}, embed, top_k=1) == [2]
+    assert calls == [1]
+
+
+def test_batch_embeds_only_queries_without_exact_identifier_hits(iso_collection, monkeypatch):
+    embedded = []
+
+    def embed_queries(queries):
+        embedded.extend(queries)
+        return [[0.0, 1.0] for _ in queries]
+
+    monkeypatch.setattr(tool_iso_rag, "_embed_queries", embed_queries)
+    queries = ["VR00060", "AM09", "AC01", "co oznacza kod zwrotu"]
+    identifiers = tool_iso_rag._batch_identifiers(queries)
+
+    exact, ranked = tool_iso_rag._batch_identifier_hits("iso", identifiers, 1, {})
+    assert list(exact) == [0] and ranked == {1}
+    assert getattr(exact[0][0], "score", None) is None
+
+    pending = tool_iso_rag._pending_queries(len(queries), exact)
+    vectors = tool_iso_rag._embed_queries([queries[i] for i in pending])
+    searched = tool_iso_rag._batch_search("iso", vectors, 1, {}, [identifiers[i] if i in ranked else {} for i in pending])
+    results = tool_iso_rag._merge_batch_results(len(queries), exact, pending, searched)
+
+    assert embedded == ["AM09", "AC01", "co oznacza kod zwrotu"]
+    # VR00060 - dokładne trafienie, AM09 - ranking w obrębie filtra, reszta - zwykłe wyszukiwanie
+    assert [[point.id for point in points] for points in results][:2] == [[4], [2]]
+    assert [len(points) for points in results[2:]] == [1, 1]
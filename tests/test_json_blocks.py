@@ -0,0 +1,77 @@
+import io
+import json
+
+import pytest
+
+from buissnes_agent.textchunker import json_blocks
+from buissnes_agent.textchunker.json_blocks import iter_json_blocks, JsonStreamError
+from buissnes_agent.textchunker.langchain.LangChainChunker import LangChainChunker
+from buissnes_agent.textchunker.noLibChunker.NoLibChunker import NoLibChunker
+
+RECORDS = json.dumps({
+    "meta": {"version": "1.0", "source": "export/a~b"},
+    "records": [{"id": i, "name": f"Rekord {i}", "tags": ["x", "y"], "amount": i * 1.5e2} for i in range(40)],
+}, ensure_ascii=False)
+
+
+def _blocks(source, max_chars):
+    return [(block.pointer, block.text, block.first_key, block.last_key)
+            for block in iter_json_blocks(source, max_chars)]
+
+
+def test_small_document_is_single_block():
+    assert _blocks('{"a": [1, 2], "b": null}', 1000) == [("", '{"a": [1, 2], "b": null}', None, None)]
+
+
+def test_large_document_is_split_on_record_boundaries():
+    blocks = list(iter_json_blocks(RECORDS, 300))
+    assert len(blocks) > 5
+    for block in blocks:
+        json.loads(block.text)
+        if block.first_key is not None:
+            assert len(block.text) <= 300
+    pointers = {block.pointer for block in blocks}
+    assert "/records" in pointers
+    # Mały obiekt "meta" trafia do grupy dokumentu głównego
+    assert any(block.pointer == "" and '"meta"' in block.text for block in blocks)
+    grouped = [block for block in blocks if block.pointer == "/records"]
+    assert grouped[0].first_key == "0"
+    assert grouped[0].to_metadata()["json_range"] == f"0..{grouped[0].last_key}"
+
+
+def test_pointer_tokens_are_escaped():
+    blocks = list(iter_json_blocks(json.dumps({"a/b": "x" * 50, "c~d": "y" * 50}), 40))
+    assert [block.pointer for block in blocks] == ["/a~1b", "/c~0d"]
+
+
+def test_stream_source_matches_string_source(monkeypatch):
+    # Małe porcje: granice odczytu wypadają w środku napisów i liczb
+    monkeypatch.setattr(json_blocks, "_READ_SIZE", 5)
+    assert _blocks(io.StringIO(RECORDS), 300) == _blocks(RECORDS, 300)
+
+
+@pytest.mark.parametrize("document", ['{"a": [1, 2}', '{"a": tru}', '[1, 2', ']'])
+def test_invalid_json_raises(document):
+    with pytest.raises(JsonStreamError):
+        list(iter_json_blocks(document, 100))
+
+
+@pytest.mark.parametrize("chunker", [NoLibChunker("jsonStructure", 300, 0), LangChainChunker("jsonStructure", 300, 0)])
+def test_process_stream_matches_process_batch(chunker):
+    meta = {"source": "file:///export.json"}
+    expected = chunker.process_batch(RECORDS, dict(meta))
+    batches = list(chunker.process_stream(io.StringIO(RECORDS), dict(meta), max_chunks=3))
+
+    assert chunker.supports_stream() and len(batches) > 2
+    assert all(len(batch) <= 3 for batch in batches)
+    assert [record.chunk_id for batch in batches for record in batch.records] == \
+        [record.chunk_id for record in expected.records]
+    assert [record.metadata for batch in batches for record in batch.records] == \
+        [record.metadata for record in expected.records]
+
+
+def test_process_stream_falls_back_for_invalid_json():
+    batches = list(NoLibChunker("jsonStructure", 300, 0).process_stream(io.StringIO("nie JSON, tylko tekst."), {}))
+    assert [record.text for batch in batches for record in batch.records] == ["nie JSON, tylko tekst."]
+    with pytest.raises(ValueError):
+        next(NoLibChunker("sentences", 300, 0).process_stream(io.StringIO(RECORDS), {}))
@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pytest
+
+from buissnes_agent.KnowledgebasePipeline import SearchKnowledgebase
+from buissnes_agent.config_loader import settings
+
+
+class _Store:
+    # Baza w pamięci: zapamiętuje zapisane paczki
+    def __init__(self):
+        self.batches = []
+
+    def count(self):
+        return 0
+
+    def insert_chunk_batches(self, batches):
+        self.batches.append([record.text for batch in batches for record in batch.records])
+
+    def mark_ingestion(self):
+        return "v1"
+
+
+class _Loader:
+    # Loader plików z katalogu testu (jak DataLoaderLocalFileLoader dla plików tekstowych)
+    def __init__(self, directory, allow_full_read=True):
+        self.directory = directory
+        self.allow_full_read = allow_full_read
+
+    def list_objects(self):
+        return sorted(str(path) for path in self.directory.iterdir())
+
+    def load_file_with_metadata(self, file_path):
+        # Wczytanie całego pliku oznacza, że ścieżka strumieniowa nie zadziałała
+        assert self.allow_full_read, f"plik wczytany w całości: {file_path}"
+        with open(file_path, encoding="utf-8") as f:
+            return f.read(), {"source": f"file://{file_path}"}
+
+    def open_text_stream(self, file_path):
+        return open(file_path, encoding="utf-8"), {"source": f"file://{file_path}"}
+
+
+@pytest.fixture
+def streaming(monkeypatch):
+    # Bez liczenia tokenów (kodowanie tiktoken wymaga sieci) i bez API embeddingów
+    monkeypatch.setitem(settings._data["chunking"], "token_encoding", "")
+    monkeypatch.setattr(SearchKnowledgebase, "_embed", lambda self, text: np.ones(3, dtype=np.float32))
+    monkeypatch.setitem(settings._data["chunking"], "module", "legacy")
+    monkeypatch.setitem(settings._data["chunking"], "parallel", {"workers": 1})
+    monkeypatch.setitem(settings._data["chunking"], "streaming", {"enabled": True, "min_file_mb": 0, "max_chunks": 4})
+
+
+def test_large_json_file_is_ingested_from_stream(tmp_path, streaming):
+    records = [{"id": i, "name": f"Rekord {i}", "opis": "x" * 80} for i in range(60)]
+    (tmp_path / "export.json").write_text(json.dumps({"records": records}), encoding="utf-8")
+    store = _Store()
+
+    SearchKnowledgebase(None, store, _Loader(tmp_path, allow_full_read=False), "model", batch_size=10)
+
+    texts = [text for batch in store.batches for text in batch]
+    assert all(len(batch) <= 10 for batch in store.batches)
+    assert sum(text.count('"id"') for text in texts) == 60
+    for text in texts:
+        json.loads(text)
+
+
+def test_small_files_keep_regular_path(tmp_path, streaming, monkeypatch):
+    monkeypatch.setitem(settings._data["chunking"]["streaming"], "min_file_mb", 1)
+    (tmp_path / "small.json").write_text('{"a": 1}', encoding="utf-8")
+    store = _Store()
+
+    SearchKnowledgebase(None, store, _Loader(tmp_path), "model", batch_size=10)
+    assert store.batches == [['{"a": 1}']]
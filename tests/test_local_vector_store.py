@@ -0,0 +1,115 @@
+import numpy as np
+
+from buissnes_agent.LocalVectorStore import LocalVectorStore
+
+
+def _item(point_id, vector, **metadata):
+    return {"text": f"tekst {point_id}", "vector": vector,
+            "metadata": {"phrase_metadata_id": point_id, **metadata}}
+
+
+def _store(tmp_path, **options):
+    return LocalVectorStore(str(tmp_path), "kolekcja", vector_size=3, **options)
+
+
+def test_query_returns_cosine_top_k_with_payloads(tmp_path):
+    store = _store(tmp_path)
+    store.insert_batch([
+        _item("a", [1, 0, 0], source="a.md"),
+        _item("b", [0, 1, 0], source="b.md"),
+        _item("c", [1, 1, 0], source="c.md"),
+    ])
+
+    records = store.query([2, 0, 0], limit=2)
+    assert [record.id for record in records] == ["a", "c"]
+    assert records[0].score == np.float32(1.0)
+    assert records[0].payload["phrase"] == "tekst a"
+    assert store.search([0, 1, 0], limit=1)[0]["text"] == "tekst b"
+
+
+def test_upsert_overwrites_row_and_payload(tmp_path):
+    store = _store(tmp_path)
+    store.insert_batch([_item("a", [1, 0, 0], version=1)])
+    store.insert_batch([_item("a", [0, 0, 1], version=2)])
+
+    assert store.count() == 1
+    record = store.query([0, 0, 1], limit=1)[0]
+    assert (record.id, record.payload["version"]) == ("a", 2)
+
+
+def test_filters_match_any_value_and_list_fields(tmp_path):
+    store = _store(tmp_path)
+    store.insert_batch([
+        _item("a", [1, 0, 0], source="a.md", tags=["cbpr"]),
+        _item("b", [0.9, 0.1, 0], source="b.md", tags=["sepa"]),
+        _item("c", [0.8, 0.2, 0], source="c.md", tags=["cbpr", "sepa"]),
+    ])
+
+    assert [r.id for r in store.query([1, 0, 0], 5, {"tags": "sepa"})] == ["b", "c"]
+    assert [r.id for r in store.query([1, 0, 0], 5, {"source": ["a.md", "c.md"]})] == ["a", "c"]
+
+
+def test_selective_filter_widens_candidates_until_limit(tmp_path):
+    rng = np.random.default_rng(2)
+    store = _store(tmp_path, block_rows=64)
+    # Pasujące wiersze leżą daleko od zapytania - poza pierwszą pulą `limit * 10` kandydatów
+    items = [_item(str(i), [1, rng.random() * 0.1, 0], source="szum.md") for i in range(300)]
+    items += [_item(f"iso{i}", [0, 1, 0.1 * i], source="iso.md") for i in range(3)]
+    store.insert_batch(items)
+
+    batch = store.query_batch([[1, 0, 0], [0, 1, 0]], limit=3, filters={"source": "iso.md"})
+    assert [sorted(r.id for r in records) for records in batch] == [["iso0", "iso1", "iso2"]] * 2
+    assert store.query([1, 0, 0], limit=5, filters={"source": "brak.md"}) == []
+
+
+def test_selective_filter_falls_back_to_exact_search_with_ivf(tmp_path):
+    rng = np.random.default_rng(3)
+    store = _store(tmp_path, nprobe=1)
+    store.insert_batch([_item(str(i), vector.tolist(), source="szum.md") for i, vector in enumerate(rng.normal(size=(200, 3)))])
+    store.insert_batch([_item("iso", [-1, -1, -1], source="iso.md")])
+    store.build_ivf(8)
+
+    assert [r.id for r in store.query([1, 1, 1], limit=2, filters={"source": "iso.md"})] == ["iso"]
+
+
+def test_query_batch_matches_single_queries_across_blocks(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 3))
+    store = _store(tmp_path, block_rows=7)
+    store.insert_batch([_item(str(i), vector.tolist()) for i, vector in enumerate(vectors)])
+
+    queries = rng.normal(size=(4, 3)).tolist()
+    batch = store.query_batch(queries, limit=5)
+    assert [[r.id for r in records] for records in batch] == \
+        [[r.id for r in store.query(query, limit=5)] for query in queries]
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ np.asarray(queries[0])))[:5]
+    assert [r.id for r in batch[0]] == [str(i) for i in expected]
+
+
+def test_reader_sees_rows_written_by_another_instance(tmp_path):
+    reader = _store(tmp_path)
+    assert reader.query([1, 0, 0]) == []
+
+    writer = _store(tmp_path)
+    writer.insert_batch([_item("a", [1, 0, 0])])
+    version = reader.version()
+    writer.insert_batch([_item(str(i), [0, 1, i]) for i in range(2000)])
+    writer.mark_ingestion()
+
+    assert reader.count() == 2001
+    assert [r.id for r in reader.query([1, 0, 0], limit=1)] == ["a"]
+    assert reader.version() != version
+
+
+def test_ivf_search_covers_rows_added_after_build(tmp_path):
+    rng = np.random.default_rng(1)
+    store = _store(tmp_path, nprobe=2)
+    store.insert_batch([_item(str(i), vector.tolist()) for i, vector in enumerate(rng.normal(size=(200, 3)))])
+    store.build_ivf(4)
+    store.insert_batch([_item("nowy", [0, 0, 1])])
+
+    assert store.query([0, 0, 1], limit=1)[0].id == "nowy"
+    # Ponowne otwarcie wczytuje indeks z dysku
+    assert _store(tmp_path, nprobe=2).query([0, 0, 1], limit=1)[0].id == "nowy"
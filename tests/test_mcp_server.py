@@ -0,0 +1,102 @@
+import asyncio
+import importlib
+import marshal
+import os
+import sys
+import time
+
+import pytest
+from starlette.testclient import TestClient
+
+from buissnes_agent.config_loader import settings
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # MCPServer.py uruchamiany jako skrypt: katalog buissnes_agent na sys.path (importy tools.*)
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(__file__), "..", "buissnes_agent"))
+    module = importlib.import_module("MCPServer")
+    monkeypatch.setattr(module, "_warmup_task", None)
+    monkeypatch.setattr(module, "_readiness", {"ready": False, "warmup": None, "error": None, "attempts": 0})
+    return module
+
+
+@pytest.fixture
+def admin(server, monkeypatch):
+    # Trasy /admin/* są rejestrowane przy imporcie - świeży import z włączonym panelem
+    monkeypatch.setitem(settings._data["observability"], "admin", {"enabled": True, "max_profile_seconds": 60})
+    monkeypatch.delitem(sys.modules, "MCPServer")
+    module = importlib.import_module("MCPServer")
+    monkeypatch.setenv("MCP_ADMIN_TOKEN", "sekret")
+    yield module, TestClient(module.mcp.http_app())
+    module._profiler.stop()
+    module._memory_profiler.stop()
+
+
+def test_lifespan_cancels_retrying_warmup_on_shutdown(server, monkeypatch):
+    async def unavailable(queries):
+        raise ConnectionError("qdrant niedostępny")
+
+    monkeypatch.setattr(server, "awarmup", unavailable)
+    monkeypatch.setitem(server.settings._data["mcp_server"], "warmup", {"enabled": True, "retry_seconds": 60})
+
+    async def scenario():
+        async with server._lifespan(None):
+            await asyncio.sleep(0.01)
+            task = server._warmup_task
+        # Po wyjściu z lifespan zadanie jest już zakończone (nie dopiero przy zamykaniu pętli)
+        return task.cancelled()
+
+    assert asyncio.run(scenario())
+    assert server._warmup_task is None
+    assert server._readiness["attempts"] == 1 and not server._readiness["ready"]
+
+
+def test_server_and_tools_share_one_tracing_module(server):
+    # Histogramy /metrics są zapisywane przez narzędzia - musi to być ta sama instancja modułu
+    assert server.render_prometheus.__module__ == "tools.tracing"
+    assert sys.modules["tools.tool_iso_rag"].span is server.span
+    assert sys.modules["tools.tool_confluence"].span is server.span
+
+
+def test_admin_routes_refuse_missing_or_wrong_token(admin, monkeypatch):
+    server, client = admin
+    compared = []
+    compare_digest = server.hmac.compare_digest
+    monkeypatch.setattr(server.hmac, "compare_digest", lambda a, b: compared.append((a, b)) or compare_digest(a, b))
+
+    assert client.post("/admin/profile/start").status_code == 401
+    assert client.get("/admin/profile", headers={"Authorization": "Bearer inny"}).status_code == 401
+    assert client.post("/admin/tracemalloc/start", headers={"X-Admin-Token": "sekre"}).status_code == 401
+    assert compared[-1] == (b"sekre", b"sekret")
+    assert not server._profiler.running and not server._memory_profiler.status()["tracing"]
+
+    monkeypatch.delenv("MCP_ADMIN_TOKEN")
+    response = client.get("/admin/profile", headers={"Authorization": "Bearer sekret"})
+    assert response.status_code == 403 and "MCP_ADMIN_TOKEN" in response.json()["error"]
+
+
+def test_admin_profile_start_stop_and_snapshot(admin):
+    server, client = admin
+    headers = {"Authorization": "Bearer sekret"}
+
+    started = client.post("/admin/profile/start?seconds=600&interval_ms=2", headers=headers)
+    assert started.status_code == 200 and started.json()["running"]
+    assert client.post("/admin/profile/start", headers=headers).status_code == 409
+    assert client.post("/admin/profile/start?seconds=abc", headers={"X-Admin-Token": "sekret"}).status_code == 400
+    # Limit max_profile_seconds z konfiguracji
+    assert server._profiler.deadline - time.monotonic() <= 60
+
+    stopped = client.post("/admin/profile/stop", headers=headers).json()
+    assert not stopped["running"] and stopped["stop_reason"] == "stop"
+    assert client.get("/admin/profile?format=top&limit=3", headers=headers).json()["stop_reason"] == "stop"
+    assert client.get("/admin/profile?format=collapsed", headers=headers).headers["content-type"].startswith("text/plain")
+    pstats_file = client.get("/admin/profile?format=pstats", headers=headers)
+    assert isinstance(marshal.loads(pstats_file.content), dict)
+
+    assert client.post("/admin/tracemalloc/start?frames=3", headers=headers).json()["frames"] == 3
+    snapshot = client.get("/admin/tracemalloc/snapshot?top=5", headers=headers)
+    assert snapshot.status_code == 200 and len(snapshot.json()["top"]) <= 5
+    assert client.get("/admin/tracemalloc/snapshot?key=zły", headers=headers).status_code == 400
+    assert not client.post("/admin/tracemalloc/stop", headers=headers).json()["tracing"]
+    assert client.get("/admin/tracemalloc/snapshot", headers=headers).status_code == 409
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from buissnes_agent.textchunker.noLibChunker import NoLibChunker as chunker_module
+from buissnes_agent.textchunker.noLibChunker.NoLibChunker import NoLibChunker
+from buissnes_agent.textchunker.noLibChunker.strategies import native_semantic
+from buissnes_agent.textchunker.noLibChunker.strategies.native_semantic import NativeSemanticStrategy
+
+
+class _TopicEmbeddings:
+    # Klient w kształcie OpenAI: wektor = temat zdania ("alpha" / "beta"), bez sieci
+    def __init__(self):
+        self.embeddings = self
+        self.calls = 0
+
+    def create(self, input, model=None):
+        self.calls += 1
+        return SimpleNamespace(data=[
+            SimpleNamespace(embedding=[1.0, 0.0] if "alpha" in text.split()[-1] else [0.0, 1.0])
+            for text in input
+        ])
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    client = _TopicEmbeddings()
+    monkeypatch.setattr(native_semantic, "_get_embedding_client", lambda: client)
+    return client
+
+
+def _offsets_match(content, batch):
+    for chunk in batch.to_dicts():
+        metadata = chunk["metadata"]
+        assert content[metadata["char_start"]:metadata["char_end"]] == chunk["text"]
+
+
+def test_span_strategies_emit_offsets_of_their_text():
+    content = "Pierwsze zdanie. " * 40 + "# Nagłówek\n" + "Drugie zdanie! " * 40
+    for strategy in ("sentences", "markdown", "fixed"):
+        batch = NoLibChunker(strategy, 120, 20).process_batch(content, {"source": "a.txt"})
+        assert len(batch) > 1
+        _offsets_match(content, batch)
+
+
+def test_enforce_limit_recomputes_offsets_of_sub_chunks():
+    chunker = NoLibChunker("sentences", 100, 20)
+    parent = "x" * 250
+    chunks = chunker._enforce_limit([(parent, {"char_start": 1000, "char_end": 1250, "xpath": "/a"})])
+
+    assert [(m["char_start"], m["char_end"]) for _, m in chunks] == [(1000, 1100), (1080, 1180), (1160, 1250)]
+    assert all(m["xpath"] == "/a" for _, m in chunks)
+    # Każdy pod-kawałek ma własny słownik metadanych
+    assert len({id(m) for _, m in chunks}) == 3
+
+
+def test_enforce_limit_without_offsets_keeps_metadata():
+    chunks = NoLibChunker("sentences", 100, 0)._enforce_limit([("y" * 150, {"xpath": "/b"})])
+    assert [m for _, m in chunks] == [{"xpath": "/b"}, {"xpath": "/b"}]
+
+
+def test_native_semantic_splits_on_topic_change(embeddings):
+    content = "Ala ma alpha. Kot lubi alpha. Pies widzi beta. Koń je beta."
+    chunker = NoLibChunker("nativeSemantic", 1000, 0, strategy_options={"buffer_size": 0, "threshold_amount": 50})
+    batch = chunker.process_batch(content, {"source": "a.txt"})
+
+    assert [chunk["text"] for chunk in batch.to_dicts()] == ["Ala ma alpha. Kot lubi alpha.", "Pies widzi beta. Koń je beta."]
+    _offsets_match(content, batch)
+    assert embeddings.calls == 1
+
+
+def test_native_semantic_long_sentence_sub_chunks_have_own_offsets(embeddings):
+    content = "Krótkie alpha. " + "z" * 150 + " beta."
+    chunker = NoLibChunker("nativeSemantic", 60, 10, strategy_options={"buffer_size": 0})
+    batch = chunker.process_batch(content, {"source": "a.txt"})
+
+    offsets = [(chunk["metadata"]["char_start"], chunk["metadata"]["char_end"]) for chunk in batch.to_dicts()]
+    assert len(offsets) == len(set(offsets)) > 2
+    _offsets_match(content, batch)
+
+
+def test_native_semantic_rejects_unknown_options():
+    with pytest.raises(TypeError):
+        NoLibChunker("nativeSemantic", 600, 100, strategy_options={"treshold_type": "gradient"})._get_strategy("x")
+
+
+def test_native_semantic_reuses_pooled_vectors(embeddings):
+    content = "Ala ma alpha. Kot lubi alpha. Pies widzi beta. Koń je beta."
+    strategy = NativeSemanticStrategy(1000, 0, buffer_size=0, threshold_amount=50, reuse_embeddings="true")
+    vectors = [metadata.get(chunker_module.PRECOMPUTED_VECTOR_KEY) for _, metadata in strategy.split_with_metadata(content)]
+    assert np.allclose(vectors, [[1.0, 0.0], [0.0, 1.0]])
@@ -0,0 +1,84 @@
+import marshal
+import pstats
+import threading
+import time
+
+import pytest
+
+from buissnes_agent.tools.profiling import MemoryProfiler, SamplingProfiler
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=_busy_loop, args=(stop,), name="busy-worker", daemon=True)
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_sampling_profiler_start_stop_and_results(busy_thread):
+    profiler = SamplingProfiler()
+    profiler.start(seconds=30, interval=0.002)
+    _wait_for(lambda: profiler.samples >= 5)
+    assert profiler.running
+    with pytest.raises(RuntimeError):
+        profiler.start(seconds=1)
+
+    profiler.stop()
+    status = profiler.status()
+    assert not status["running"] and status["stop_reason"] == "stop"
+    assert status["finished_at"] >= status["started_at"]
+
+    # Wyniki ostatniego pomiaru: flamegraph, top funkcji i plik pstats
+    assert any(line.startswith("busy-worker;") and "_busy_loop" in line for line in profiler.collapsed().splitlines())
+    assert any("_busy_loop" in row["function"] and row["total_samples"] > 0 for row in profiler.top(50))
+    functions = {name for _, _, name in marshal.loads(profiler.pstats_dump())}
+    assert "_busy_loop" in functions
+    assert pstats.Stats(profiler.stats_object()).total_calls > 0
+
+
+def test_sampling_profiler_stops_after_requests_or_seconds():
+    profiler = SamplingProfiler()
+    profiler.start(seconds=30, max_requests=2, interval=0.002)
+    profiler.note_request()
+    assert profiler.running
+    profiler.note_request()
+    _wait_for(lambda: not profiler.running)
+    assert profiler.status()["stop_reason"] == "requests" and profiler.requests == 2
+
+    profiler.start(seconds=0.05, interval=0.002)
+    _wait_for(lambda: not profiler.running)
+    assert profiler.status()["stop_reason"] == "seconds" and profiler.requests == 0
+
+
+def test_memory_profiler_snapshots_and_growth():
+    profiler = MemoryProfiler()
+    with pytest.raises(RuntimeError):
+        profiler.snapshot()
+    try:
+        assert profiler.start(frames=5)["tracing"]
+        first = profiler.snapshot(top=5)
+        retained = [bytearray(1024) for _ in range(2000)]
+        second = profiler.snapshot(top=5, key_type="filename")
+
+        assert len(first["top"]) <= 5 and "growth_since_previous" not in first
+        assert second["growth_since_previous"][0]["size_diff_kb"] > 0 and len(retained) == 2000
+        with pytest.raises(ValueError):
+            profiler.snapshot(key_type="module")
+    finally:
+        status = profiler.stop()
+    assert not status["tracing"] and status["traced_current_mb"] == 0
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+
+from buissnes_agent import QdrantDatabaseStore as store_module
+from buissnes_agent.MetadataModels import ChunkBatch
+from buissnes_agent.QdrantDatabaseStore import QdrantDatabaseStore
+
+
+@pytest.fixture
+def store(monkeypatch):
+    # Qdrant w pamięci procesu (bez serwera)
+    monkeypatch.setattr(store_module, "QdrantClient", lambda url=None, api_key=None: QdrantClient(":memory:"))
+    return QdrantDatabaseStore(url=None, api_key=None, collection_name="iso", vector_size=3,
+                               index_config={"quantization": {"type": "none"}})
+
+
+def _batch(source, texts, vectors):
+    batch = ChunkBatch.for_file({"source": source, "tags": ["cbpr"]})
+    for i, text in enumerate(texts):
+        batch.add(text, f"{abs(hash((source, i))):032x}"[:32], {"char_start": i * 10})
+    batch.vectors = np.asarray(vectors, dtype=np.float32)
+    return batch
+
+
+def test_insert_chunk_batches_uploads_numpy_vectors_with_payloads(store):
+    store.insert_chunk_batches([
+        _batch("a.md", ["GrpHdr", "MsgId"], [[1, 0, 0], [0, 1, 0]]),
+        _batch("b.md", [], np.empty((0, 3))),
+        _batch("c.md", ["AM09"], [[0, 0, 1]]),
+    ])
+
+    assert store.count() == 3
+    hit = store.client.query_points("iso", query=[0, 0, 1], limit=1, with_payload=True).points[0]
+    assert hit.payload["source"] == "c.md"
+    assert hit.payload["tags"] == ["cbpr"]
+    assert hit.payload["char_start"] == 0
+
+
+def test_insert_chunk_batches_ignores_empty_input(store):
+    store.insert_chunk_batches([])
+    assert store.count() == 0
+
+
+def test_quantization_signature_ignores_server_defaults():
+    from qdrant_client.models import (BinaryQuantization, BinaryQuantizationConfig, Disabled,
+                                      ScalarQuantization, ScalarQuantizationConfig, ScalarType)
+    from buissnes_agent.QdrantDatabaseStore import build_quantization_config, quantization_signature
+
+    configured = build_quantization_config({"quantization": {"type": "scalar", "always_ram": True}})
+    from_server = ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, always_ram=True))
+    assert quantization_signature(configured) == quantization_signature(from_server) == ("scalar", "int8", None, True)
+
+    binary = BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=None))
+    assert quantization_signature(binary) == ("binary", False)
+    assert quantization_signature(None) is None and quantization_signature(Disabled.DISABLED) is None
+
+
+def test_migrate_collection_only_updates_real_differences(store, monkeypatch):
+    from qdrant_client.models import BinaryQuantization, BinaryQuantizationConfig, BinaryQuantizationEncoding
+
+    # Parametry istniejącej kolekcji w postaci zwracanej przez serwer (uzupełnione pola domyślne)
+    server_quantization = BinaryQuantization(binary=BinaryQuantizationConfig(
+        always_ram=True, encoding=BinaryQuantizationEncoding.ONE_BIT))
+    info = SimpleNamespace(config=SimpleNamespace(
+        params=SimpleNamespace(vectors=SimpleNamespace(on_disk=False)),
+        hnsw_config=SimpleNamespace(m=16, ef_construct=100),
+        quantization_config=server_quantization,
+    ))
+    updates = []
+    monkeypatch.setattr(store.client, "get_collection", lambda name: info)
+    monkeypatch.setattr(store.client, "update_collection", lambda **changes: updates.append(changes))
+
+    store.index_config = {"quantization": {"type": "binary"}, "hnsw": {"m": 16}}
+    assert store.migrate_collection() is False
+
+    store.index_config = {"quantization": {"type": "scalar", "quantile": "0.99"}, "hnsw": {"m": 16}}
+    assert store.migrate_collection() is True
+    assert sorted(updates[0]) == ["collection_name", "quantization_config"]
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+
+from buissnes_agent.tools import query_cache
+from buissnes_agent.tools.query_cache import QueryVectorCache, SemanticResultCache, normalize_query
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(query_cache, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_normalize_query_collapses_whitespace_and_case():
+    assert normalize_query("  Co to jest   GrpHdr? ") == normalize_query("co to jest grphdr?")
+    assert QueryVectorCache.make_key("GrpHdr", None) == ("", "grphdr")
+    assert QueryVectorCache.make_key("GrpHdr", "a") != QueryVectorCache.make_key("GrpHdr", "b")
+
+
+def test_vector_cache_evicts_least_recently_used(clock):
+    cache = QueryVectorCache(max_entries=2, ttl_seconds=0)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    assert cache.get("a") == [1.0]  # "a" staje się najświeższy
+    cache.put("c", [3.0])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0] and cache.get("c") == [3.0]
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"], stats["hits"], stats["misses"]) == (2, 1, 3, 1)
+
+
+def test_vector_cache_expires_entries_after_ttl(clock):
+    cache = QueryVectorCache(max_entries=4, ttl_seconds=60)
+    cache.put("a", [1.0])
+    clock.value += 59
+    assert cache.get("a") == [1.0]
+    clock.value += 2
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_semantic_cache_hits_on_similar_vector_in_same_context(clock):
+    cache = SemanticResultCache(similarity_threshold=0.95, max_entries=4)
+    cache.put([1.0, 0.0, 0.0], ("top_k", 5), "wynik GrpHdr")
+
+    assert cache.get([0.99, 0.05, 0.0], ("top_k", 5)) == "wynik GrpHdr"
+    assert cache.get([0.7, 0.7, 0.0], ("top_k", 5)) is None
+    # Inny kontekst (np. top_k) nie zwraca wyniku innego zapytania do bazy
+    assert cache.get([1.0, 0.0, 0.0], ("top_k", 10)) is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 2)
+
+
+def test_semantic_cache_overwrites_least_recently_used_slot(clock):
+    cache = SemanticResultCache(similarity_threshold=0.99, max_entries=2)
+    cache.put([1.0, 0.0], None, "a")
+    clock.value += 1
+    cache.put([0.0, 1.0], None, "b")
+    clock.value += 1
+    assert cache.get([1.0, 0.0]) == "a"
+    clock.value += 1
+    cache.put([-1.0, 0.0], None, "c")
+
+    assert cache.get([0.0, 1.0]) is None
+    assert cache.get([1.0, 0.0]) == "a" and cache.get([-1.0, 0.0]) == "c"
+
+
+def test_semantic_cache_ttl_and_version_invalidation(clock):
+    cache = SemanticResultCache(similarity_threshold=0.9, max_entries=2, ttl_seconds=30)
+    cache.ensure_version("v1")
+    cache.put([1.0, 0.0], None, "a")
+    clock.value += 31
+    assert cache.get([1.0, 0.0]) is None
+
+    cache.put([1.0, 0.0], None, "a")
+    cache.ensure_version("v1")
+    assert cache.get([1.0, 0.0]) == "a"
+    cache.ensure_version("v2")
+    assert cache.get([1.0, 0.0]) is None
+    assert cache.stats()["invalidations"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_semantic_cache_dimension_change_resets_matrix(clock):
+    cache = SemanticResultCache(similarity_threshold=0.9, max_entries=2)
+    cache.put([1.0, 0.0], None, "a")
+    assert cache.get([1.0, 0.0, 0.0]) is None
+    cache.put([1.0, 0.0, 0.0], None, "b")
+    assert cache.get([1.0, 0.0, 0.0]) == "b" and cache.stats()["entries"] == 1
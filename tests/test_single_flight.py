@@ -0,0 +1,70 @@
+import asyncio
+
+from buissnes_agent.tools.single_flight import SingleFlight
+
+
+def test_make_key_normalizes_only_questions_and_tag_order():
+    key = SingleFlight.make_key("tool", {"query": "  Co to jest   GrpHdr? ", "tags": ["b", "a"], "top_k": None})
+    assert key == SingleFlight.make_key("tool", {"query": "co to jest grphdr?", "tags": ["a", "b"]})
+
+
+def test_make_key_keeps_filter_values_verbatim():
+    upper = SingleFlight.make_key("tool", {"query": "q", "source": "Pacs.008.pdf"})
+    lower = SingleFlight.make_key("tool", {"query": "q", "source": "pacs.008.pdf"})
+    assert upper != lower
+    assert SingleFlight.make_key("tool", {"query": "q", "tags": ["CBPR"]}) != \
+        SingleFlight.make_key("tool", {"query": "q", "tags": ["cbpr"]})
+
+
+def test_make_key_keeps_batch_question_order():
+    assert SingleFlight.make_key("batch", {"queries": ["A", "b"]}) != \
+        SingleFlight.make_key("batch", {"queries": ["b", "a"]})
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    executions = 0
+
+    async def work():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return "wynik"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["wynik"] * 5
+    assert executions == 1
+    stats = flight.stats()
+    assert (stats["calls"], stats["executions"], stats["coalesced"], stats["in_flight"]) == (5, 1, 4, 0)
+
+
+def test_exception_is_shared_and_key_released():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError("błąd")
+
+    async def main():
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        again = await flight.do("k", lambda: asyncio.sleep(0, "ok"))
+        return results, again
+
+    results, again = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert again == "ok"
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    flight = SingleFlight()
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("k", lambda: asyncio.sleep(0.02, "ok")))
+        follower = asyncio.ensure_future(flight.do("k", lambda: asyncio.sleep(0.02, "inny")))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == "ok"
@@ -0,0 +1,50 @@
+import pytest
+
+from buissnes_agent.tools import tracing
+from buissnes_agent.tools.tracing import LatencyHistogram, render_prometheus, span
+
+
+@pytest.fixture
+def histograms(monkeypatch):
+    monkeypatch.setattr(tracing, "_histograms", {})
+    monkeypatch.setattr(tracing, "_exporter", "none")
+    return tracing._histograms
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = LatencyHistogram(buckets=(0.01, 0.1, 1.0))
+    for seconds in (0.005, 0.05, 0.05, 0.5, 5.0):
+        histogram.record(seconds, error=seconds > 1)
+
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(1.0) == float("inf")
+    assert histogram.summary()["errors"] == 1 and histogram.summary()["p50_le_ms"] == 100.0
+    assert LatencyHistogram().quantile(0.5) is None
+
+
+def test_nested_spans_are_recorded_per_name(histograms):
+    with span("tool.iso_rag") as root:
+        with span("rag.embed") as child:
+            child.set(cached=True)
+    with pytest.raises(ValueError):
+        with span("tool.iso_rag"):
+            raise ValueError("x")
+
+    assert root.children[0].name == "rag.embed" and root.children[0].trace_id == root.trace_id
+    assert root.to_dict()["spans"][0]["attributes"] == {"cached": True}
+    assert (histograms["tool.iso_rag"].count, histograms["tool.iso_rag"].errors) == (2, 1)
+    assert histograms["rag.embed"].count == 1
+
+
+def test_render_prometheus_splits_tools_and_stages(histograms):
+    with span("tool.confluence"):
+        with span("confluence.http"):
+            pass
+    text = render_prometheus()
+
+    assert "# TYPE mcp_tool_duration_seconds histogram" in text
+    assert 'mcp_tool_duration_seconds_count{tool="confluence"} 1' in text
+    assert 'mcp_stage_duration_seconds_bucket{stage="confluence.http",le="+Inf"} 1' in text
+    assert 'mcp_span_errors_total{span="tool.confluence"} 0' in text
+    assert 'stage="tool.confluence"' not in text
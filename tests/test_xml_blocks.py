@@ -0,0 +1,96 @@
+import io
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from buissnes_agent.textchunker import xml_blocks
+from buissnes_agent.textchunker.xml_blocks import iter_xml_blocks
+
+XSD = """<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:complexType name="GroupHeader93">
+    <xs:sequence><xs:element name="MsgId" type="Max35Text"/></xs:sequence>
+  </xs:complexType>
+  <xs:simpleType name="Max35Text"><xs:restriction base="xs:string"/></xs:simpleType>
+</xs:schema>
+"""
+
+MESSAGE = """<Document xmlns="urn:iso:std:iso:20022:tech:xsd:pacs.008.001.08">
+  <FIToFICstmrCdtTrf>
+    <GrpHdr><MsgId>A1</MsgId></GrpHdr>
+    <CdtTrfTxInf><EndToEndId>E1</EndToEndId></CdtTrfTxInf>
+    <CdtTrfTxInf><EndToEndId>E2</EndToEndId></CdtTrfTxInf>
+  </FIToFICstmrCdtTrf>
+</Document>
+"""
+
+
+def test_xsd_blocks_are_global_definitions():
+    blocks = list(iter_xml_blocks(XSD))
+    assert [block.xpath for block in blocks] == [
+        "/xs:schema/xs:complexType[@name='GroupHeader93']",
+        "/xs:schema/xs:simpleType[@name='Max35Text']",
+    ]
+    assert blocks[0].to_metadata() == {"xpath": blocks[0].xpath, "xml_tag": "complexType", "xml_name": "GroupHeader93"}
+
+
+def test_message_blocks_use_positional_xpath():
+    blocks = list(iter_xml_blocks(MESSAGE))
+    assert [block.xpath for block in blocks] == [
+        "/Document/FIToFICstmrCdtTrf[1]/GrpHdr[1]",
+        "/Document/FIToFICstmrCdtTrf[1]/CdtTrfTxInf[1]",
+        "/Document/FIToFICstmrCdtTrf[1]/CdtTrfTxInf[2]",
+    ]
+    assert "E2" in blocks[2].text and "E1" not in blocks[2].text
+
+
+def test_stream_source_matches_string_source(monkeypatch):
+    # Małe porcje: granice feed wypadają w środku tagów
+    monkeypatch.setattr(xml_blocks, "_FEED_SIZE", 7)
+    for document in (XSD, MESSAGE):
+        from_text = [(block.xpath, block.text) for block in iter_xml_blocks(document)]
+        from_stream = [(block.xpath, block.text) for block in iter_xml_blocks(io.StringIO(document))]
+        assert from_stream == from_text
+
+
+def test_invalid_xml_raises_parse_error():
+    with pytest.raises(ET.ParseError):
+        list(iter_xml_blocks(io.StringIO("<a><b></a>")))
+
+
+def test_document_without_elements_at_block_depth_falls_back_to_root():
+    blocks = list(iter_xml_blocks("<Document><a>1</a><b>2</b></Document>"))
+    assert [(block.xpath, block.text) for block in blocks] == [("/Document", "<Document><a>1</a><b>2</b></Document>")]
+
+
+def test_text_above_block_depth_is_kept():
+    document = "<Document>wstęp<Body><Blk>A</Blk>między<Blk>B</Blk></Body>koniec</Document>"
+    blocks = [(block.xpath, block.text) for block in iter_xml_blocks(document)]
+    assert blocks == [
+        ("/Document/Body[1]/Blk[1]", "<Blk>A</Blk>"),
+        ("/Document/Body[1]/Blk[2]", "<Blk>B</Blk>"),
+        ("/Document/Body[1]", "między"),
+        ("/Document", "wstęp koniec"),
+    ]
+
+
+def test_namespaces_use_document_prefixes_without_global_registration():
+    registered = dict(ET.register_namespace.__globals__["_namespace_map"])
+    document = '<a:Root xmlns:a="urn:test:a" xmlns="urn:test:d"><a:Hdr><Id a:v="1">X</Id></a:Hdr></a:Root>'
+    block = list(iter_xml_blocks(document, block_depth=1))[0]
+
+    assert block.xpath == "/a:Root/a:Hdr[1]"
+    assert ET.fromstring(block.text).find("{urn:test:d}Id").get("{urn:test:a}v") == "1"
+    assert block.text.startswith('<a:Hdr xmlns:a="urn:test:a" xmlns="urn:test:d">')
+    assert ET.register_namespace.__globals__["_namespace_map"] == registered
+
+
+def test_structure_strategies_never_ingest_well_formed_xml_as_zero_chunks():
+    from buissnes_agent.textchunker.langchain.LangChainChunker import LangChainChunker
+    from buissnes_agent.textchunker.noLibChunker.NoLibChunker import NoLibChunker
+
+    document = "<Document><a>1</a><b>2</b></Document>"
+    for chunker in (NoLibChunker("xmlStructure", 500, 0), LangChainChunker("xmlStructure", 500, 0)):
+        chunks = chunker.process_batch(document, {"source": "flat.xml"}).to_dicts()
+        assert [chunk["text"] for chunk in chunks] == [document]
+        assert chunks[0]["metadata"]["xpath"] == "/Document"
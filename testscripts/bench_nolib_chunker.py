@@ -0,0 +1,187 @@
+import argparse
+import re
+import sys
+import time
+import tracemalloc
+from typing import Callable, List
+
+from buissnes_agent.textchunker.noLibChunker.NoLibChunker import NoLibChunker
+
+# ==============================================================================
+# MICRO-BENCHMARK: NoLibChunker (stringi vs spany)
+# ==============================================================================
+# Porównuje dotychczasową implementację opartą o stringi (re.split, current += ...,
+# doklejanie overlapu) z silnikiem spanowym (start, end) na wielomegabajtowym tekście.
+# Raportuje przepustowość (znaki/s) oraz szczytową pamięć alokowaną (tracemalloc).
+#
+# Opcja --semantic porównuje dodatkowo nativeSemantic (numpy) z wrapperem semanticChunker
+# (LangChain SemanticChunker) na mniejszym korpusie. Oba warianty wołają API embeddingów
+# skonfigurowane w EMBEDDING_MODEL / EMBEDDING_BASE_URL / EMBEDDING_API_KEY.
+#
+# Uruchomienie (z katalogu głównego repozytorium):
+#   python -m testscripts.bench_nolib_chunker --mb 8
+#   python -m testscripts.bench_nolib_chunker --mb 8 --semantic --semantic-kb 64
+# ==============================================================================
+
+
+# --- Implementacja referencyjna (stringowa, sprzed wprowadzenia spanów) -------
+
+def _legacy_overlap(chunks: List[str], overlap: int) -> List[str]:
+    if overlap <= 0 or len(chunks) < 2:
+        return chunks
+    result = [chunks[0]]
+    for i in range(1, len(chunks)):
+        overlap_len = min(len(chunks[i - 1]), overlap)
+        result.append(chunks[i - 1][-overlap_len:] + " " + chunks[i])
+    return result
+
+
+def _legacy_enforce(chunks: List[str], size: int, overlap: int) -> List[str]:
+    final_chunks = []
+    step = size - overlap if size > overlap else size
+    for chunk in chunks:
+        if len(chunk) <= size:
+            final_chunks.append(chunk)
+            continue
+        start = 0
+        while start < len(chunk):
+            final_chunks.append(chunk[start:start + size])
+            if start + size >= len(chunk):
+                break
+            start += step
+    return final_chunks
+
+
+def legacy_sentences(text: str, size: int, overlap: int) -> List[str]:
+    sentences = re.split(r'(?<=[.!?])\s+', text)
+    chunks, current = [], ""
+    for sentence in sentences:
+        needed_space = 1 if current else 0
+        if len(current) + len(sentence) + needed_space <= size:
+            current = current + " " + sentence if current else sentence
+        else:
+            if current:
+                chunks.append(current.strip())
+            current = sentence
+    if current.strip():
+        chunks.append(current.strip())
+    return _legacy_enforce(_legacy_overlap(chunks, overlap), size, overlap)
+
+
+def legacy_markdown(text: str, size: int, overlap: int) -> List[str]:
+    blocks = re.split(r'(?=^#{1,3}\s)', text, flags=re.MULTILINE)
+    blocks = [b.strip() for b in blocks if b.strip()]
+    return _legacy_enforce(_legacy_overlap(blocks, overlap), size, overlap)
+
+
+def legacy_fixed(text: str, size: int, overlap: int) -> List[str]:
+    step = size - overlap if size > overlap else size
+    chunks = [text[start:start + size] for start in range(0, len(text), step)]
+    return _legacy_enforce(chunks, size, overlap)
+
+
+# --- Silnik spanowy ------------------------------------------------------------
+
+def span_engine(strategy_name: str) -> Callable[[str, int, int], List[str]]:
+    def _run(text: str, size: int, overlap: int) -> List[str]:
+        chunker = NoLibChunker(strategy_name, size, overlap)
+        strategy = chunker._get_strategy(text)
+        spans = chunker._enforce_limit_spans(strategy.split_spans(text))
+        # Materializacja (jak w process_content)
+        return [text[start:end] for start, end in spans]
+
+    return _run
+
+
+# --- Pomiar --------------------------------------------------------------------
+
+def build_corpus(megabytes: int) -> str:
+    section = (
+        "## Group Header\n"
+        "The GrpHdr block contains the MsgId. It is mandatory! Does it repeat? No. "
+        "EndToEndId is limited to 35 characters and must be unique per instruction. "
+        "The settlement method INDA or INGA determines the account servicer.\n\n"
+        "Cross-border payments follow CBPR+ usage guidelines. Each message version is validated "
+        "against the XSD schema published by ISO 20022 and the SWIFT network rules.\n\n"
+    )
+    repeats = (megabytes * 1024 * 1024) // len(section) + 1
+    return section * repeats
+
+
+def measure(name: str, func: Callable[[str, int, int], List[str]], text: str, size: int, overlap: int) -> dict:
+    # 1. Czas mierzony bez tracemalloc (śledzenie alokacji zawyża czas kodu alokującego)
+    started = time.perf_counter()
+    chunks = func(text, size, overlap)
+    elapsed = time.perf_counter() - started
+    del chunks
+
+    # 2. Osobny przebieg: szczyt pamięci zaalokowanej w trakcie podziału
+    tracemalloc.start()
+    chunks = func(text, size, overlap)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "chunks": len(chunks),
+        "chars_per_s": len(text) / elapsed if elapsed else float("inf"),
+        "peak_mb": peak / (1024 * 1024),
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark NoLibChunker: stringi vs spany")
+    parser.add_argument("--mb", type=int, default=8, help="Rozmiar korpusu w MB (domyślnie 8)")
+    parser.add_argument("--size", type=int, default=600, help="chunk_size")
+    parser.add_argument("--overlap", type=int, default=100, help="chunk_overlap")
+    parser.add_argument("--semantic", action="store_true",
+                        help="Porównaj też nativeSemantic z semanticChunker (wymaga API embeddingów)")
+    parser.add_argument("--semantic-kb", type=int, default=64, help="Rozmiar korpusu semantycznego w KB")
+    args = parser.parse_args()
+
+    text = build_corpus(args.mb)
+    print(f"Korpus: {len(text) / (1024 * 1024):.1f} MB, chunk_size={args.size}, overlap={args.overlap}\n")
+
+    cases = [
+        ("sentences", legacy_sentences, span_engine("sentences")),
+        ("markdown", legacy_markdown, span_engine("markdown")),
+        ("fixed", legacy_fixed, span_engine("fixed")),
+    ]
+
+    header = f"{'strategia':<10} {'wariant':<8} {'chunki':>8} {'MB/s':>9} {'peak MB':>9} {'czas [s]':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, legacy_func, span_func in cases:
+        for variant, func in (("string", legacy_func), ("span", span_func)):
+            r = measure(name, func, text, args.size, args.overlap)
+            print(f"{name:<10} {variant:<8} {r['chunks']:>8} {r['chars_per_s'] / 1e6:>9.1f} "
+                  f"{r['peak_mb']:>9.1f} {r['seconds']:>9.3f}")
+
+    if args.semantic:
+        semantic_bench(build_corpus(1)[:args.semantic_kb * 1024], args.size, args.overlap)
+
+
+def semantic_bench(text: str, size: int, overlap: int):
+    """
+    Jeden przebieg na wariant (każdy kosztuje wywołania API): czas, liczba chunków,
+    najdłuższy chunk i liczba chunków z offsetami (potrzebne do pakowania kontekstu).
+    """
+    print(f"\nKorpus semantyczny: {len(text) / 1024:.0f} KB")
+    header = f"{'wariant':<16} {'chunki':>8} {'max zn.':>8} {'offsety':>8} {'czas [s]':>9}"
+    print(header)
+    print("-" * len(header))
+    for name in ("semanticChunker", "nativeSemantic"):
+        chunker = NoLibChunker(name, size, overlap, strategy_options={"reuse_embeddings": False})
+        started = time.perf_counter()
+        batch = chunker.process_batch(text, {"source": "bench"})
+        elapsed = time.perf_counter() - started
+        chunks = batch.to_dicts()
+        longest = max((len(chunk["text"]) for chunk in chunks), default=0)
+        with_offsets = sum(1 for chunk in chunks if "char_start" in chunk["metadata"])
+        print(f"{name:<16} {len(chunks):>8} {longest:>8} {with_offsets:>8} {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    # Logi NoLibChunker idą na stderr - nie zaśmiecają tabeli wyników
+    sys.exit(main())
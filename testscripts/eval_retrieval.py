@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import yaml
+
+# ==============================================================================
+# OCENA JAKOŚCI I OPÓŹNIEŃ WYSZUKIWANIA (recall@k / MRR vs p50 / p95)
+# ==============================================================================
+# Zmiany chunking.strategies, chunk_size, parametrów HNSW i modelu embeddingów nie były
+# mierzone. Skrypt uruchamia run_iso_rag dla oznaczonego zbioru pytań (eval_queries.yaml)
+# w jednej lub kilku konfiguracjach i drukuje tabelę porównawczą:
+#   recall@k  - odsetek oczekiwanych trafień znalezionych w top-k (średnio na pytanie),
+#   MRR       - średnia odwrotność pozycji pierwszego relewantnego fragmentu,
+#   p50 / p95 - opóźnienie run_iso_rag (ms),
+#   wektory, RAM wektorów (float32, szacunek) i szczytowe RSS procesu oceny.
+#
+# Każda konfiguracja działa w osobnym procesie (własne nadpisania APP__* / .env, własne
+# klienty i pomiar RAM). Cache wektorów zapytań i wyników są wyłączone, a pakowanie kontekstu
+# - wyłączone (wynik 1:1 z rankingiem fragmentów).
+#
+# Uruchomienie (z katalogu głównego repozytorium), np. dwie kolekcje (różny chunk_size) x dwa ef:
+#   python -m testscripts.eval_retrieval --collections iso_512 iso_1024 --hnsw-ef 64 256
+# Konfiguracje z pliku (nazwa, env, hnsw_ef - np. inny EMBEDDING_MODEL i jego kolekcja):
+#   python -m testscripts.eval_retrieval --configs eval_configs.yaml --output wyniki.json
+# ==============================================================================
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_queries.yaml")
+
+# Nadpisania w procesie oceny: mierzymy wyszukiwanie, nie trafienia w cache
+EVAL_ENV = {
+    "APP__RAG__QUERY_CACHE__ENABLED": "false",
+    "APP__RAG__RESULT_CACHE__ENABLED": "false",
+    "APP__RAG__CONTEXT__PACKING": "false",
+    "APP__OBSERVABILITY__TRACING__ENABLED": "false",
+}
+
+_DOCUMENT_HEADER = re.compile(r"^--- DOKUMENT \d+ \(.*\) ---$", re.MULTILINE)
+
+
+def _as_list(value) -> list[str]:
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else [str(item) for item in value]
+
+
+def parse_documents(result: str) -> list[dict]:
+    """Ranking fragmentów z wyniku run_iso_rag (format bez pakowania: `--- DOKUMENT n (...) ---`)."""
+    documents = []
+    for block in _DOCUMENT_HEADER.split(result)[1:]:
+        header, _, content = block.strip().partition("\nTreść:\n")
+        documents.append({"source": header.strip(), "content": content})
+    return documents
+
+
+def _matches(document: dict, expected: dict) -> bool:
+    sources = _as_list(expected.get("source"))
+    sections = _as_list(expected.get("section"))
+    header = document["source"].casefold()
+    text = f"{header}\n{document['content']}".casefold()
+    if sources and not any(source.casefold() in header for source in sources):
+        return False
+    return not sections or any(section.casefold() in text for section in sections)
+
+
+def score_query(documents: list[dict], expected: list[dict], ks: list[int]) -> dict:
+    """recall@k (odsetek oczekiwanych wpisów znalezionych w top-k) i odwrotność rangi pierwszego trafienia."""
+    first_rank = next((rank for rank, document in enumerate(documents, 1)
+                       if any(_matches(document, item) for item in expected)), None)
+    recall = {}
+    for k in ks:
+        found = sum(1 for item in expected if any(_matches(document, item) for document in documents[:k]))
+        recall[k] = found / len(expected) if expected else 0.0
+    return {"recall": recall, "reciprocal_rank": 1.0 / first_rank if first_rank else 0.0}
+
+
+def _collection_stats() -> dict:
+    """Liczba wektorów i szacowany RAM wektorów (float32) kolekcji z konfiguracji."""
+    from buissnes_agent.config_loader import settings
+    from buissnes_agent.tools import tool_iso_rag
+
+    collection_name = settings.get("vector_db.collection_name")
+    if tool_iso_rag._local_store is not None:
+        store = tool_iso_rag._local_store
+        vectors, dimension = store.count(), store.vector_size
+    else:
+        info = tool_iso_rag._qdrant_client.get_collection(collection_name)
+        vectors = info.points_count or 0
+        dimension = getattr(info.config.params.vectors, "size", None) or int(settings.get("vector_db.dimension", 0))
+    return {
+        "collection": collection_name,
+        "vectors": vectors,
+        "dimension": dimension,
+        "vector_ram_mb": vectors * dimension * 4 / 1024 ** 2,
+    }
+
+
+def run_worker(spec: dict) -> dict:
+    """Ocena jednej konfiguracji (w procesie potomnym z jej nadpisaniami ENV)."""
+    from buissnes_agent.tools import tool_iso_rag
+
+    ks = spec["ks"]
+    top_k = max(ks)
+    hnsw_ef = spec.get("hnsw_ef")
+
+    tool_iso_rag._init_resources()
+    # Rozgrzewka (połączenia, segmenty HNSW) - nie wliczana do pomiaru
+    tool_iso_rag.run_iso_rag(spec["queries"][0]["question"], top_k=top_k, hnsw_ef=hnsw_ef)
+
+    latencies, per_query, errors = [], [], 0
+    for entry in spec["queries"]:
+        result = ""
+        for _ in range(spec["repeats"]):
+            started = time.perf_counter()
+            result = tool_iso_rag.run_iso_rag(entry["question"], top_k=top_k, hnsw_ef=hnsw_ef)
+            latencies.append((time.perf_counter() - started) * 1000.0)
+        if result.startswith("Błąd"):
+            errors += 1
+        per_query.append({"question": entry["question"],
+                          **score_query(parse_documents(result), entry["expected"], ks)})
+
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {
+        "name": spec["name"],
+        "hnsw_ef": hnsw_ef,
+        **_collection_stats(),
+        "recall": {k: float(np.mean([q["recall"][k] for q in per_query])) for k in ks},
+        "mrr": float(np.mean([q["reciprocal_rank"] for q in per_query])),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "errors": errors,
+        # ru_maxrss na Linuksie w KB
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "per_query": per_query,
+    }
+
+
+def _run_configuration(config: dict, queries: list[dict], args) -> dict:
+    spec = {"name": config["name"], "hnsw_ef": config.get("hnsw_ef"), "queries": queries,
+            "ks": args.k, "repeats": args.repeats}
+    env = {**os.environ, **EVAL_ENV, **{key: str(value) for key, value in (config.get("env") or {}).items()}}
+    completed = subprocess.run(
+        [sys.executable, "-m", "testscripts.eval_retrieval", "--worker"],
+        input=json.dumps(spec), env=env, capture_output=True, text=True,
+    )
+    if args.verbose or completed.returncode != 0:
+        sys.stderr.write(completed.stderr)
+    if completed.returncode != 0 or not completed.stdout.strip():
+        return {"name": config["name"], "error": f"proces oceny zakończony kodem {completed.returncode}"}
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["recall"] = {int(k): v for k, v in result["recall"].items()}
+    return result
+
+
+def _configurations(args) -> list[dict]:
+    if args.configs:
+        with open(args.configs, encoding="utf-8") as f:
+            return yaml.safe_load(f)["configurations"]
+
+    collections = args.collections or [None]
+    ef_values = args.hnsw_ef or [None]
+    configurations = []
+    for collection in collections:
+        for ef in ef_values:
+            name = " / ".join(part for part in (collection or "domyślna", f"ef={ef}" if ef else "") if part)
+            env = {"APP__VECTOR_DB__COLLECTION_NAME": collection} if collection else {}
+            configurations.append({"name": name, "env": env, "hnsw_ef": ef})
+    return configurations
+
+
+def _print_table(results: list[dict], ks: list[int]) -> None:
+    recall_columns = "".join(f"{f'R@{k}':>7}" for k in ks)
+    print(f"\n{'konfiguracja':<32}{recall_columns}{'MRR':>7}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'wektory':>10}{'RAM wekt. MB':>14}{'RSS MB':>9}{'błędy':>7}")
+    for row in results:
+        if "error" in row:
+            print(f"{row['name']:<32}  {row['error']}")
+            continue
+        recall = "".join(f"{row['recall'][k]:>7.2f}" for k in ks)
+        print(f"{row['name']:<32}{recall}{row['mrr']:>7.2f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+              f"{row['vectors']:>10}{row['vector_ram_mb']:>14.1f}{row['rss_mb']:>9.0f}{row['errors']:>7}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Ocena recall@k / MRR / opóźnień run_iso_rag w wielu konfiguracjach")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="Plik YAML z oznaczonymi pytaniami")
+    parser.add_argument("--collections", nargs="+", help="Kolekcje do porównania (vector_db.collection_name)")
+    parser.add_argument("--hnsw-ef", nargs="+", type=int, help="Wartości hnsw_ef do porównania")
+    parser.add_argument("--configs", help="Plik YAML z listą `configurations` (name, env, hnsw_ef)")
+    parser.add_argument("--k", nargs="+", type=int, default=[1, 3, 5], help="Wartości k dla recall@k")
+    parser.add_argument("--repeats", type=int, default=3, help="Powtórzenia każdego pytania (pomiar opóźnień)")
+    parser.add_argument("--output", help="Zapis pełnych wyników (także per pytanie) do pliku JSON")
+    parser.add_argument("--verbose", action="store_true", help="Pokaż logi procesów oceny")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args, _ = parser.parse_known_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(json.loads(sys.stdin.read())), ensure_ascii=False))
+        return 0
+
+    with open(args.queries, encoding="utf-8") as f:
+        queries = yaml.safe_load(f)["queries"]
+    for entry in queries:
+        if not entry.get("expected") or any(not (item.get("source") or item.get("section"))
+                                            for item in entry["expected"]):
+            print(f"Pytanie bez oczekiwanego źródła/sekcji: {entry.get('question')}", file=sys.stderr)
+            return 1
+    args.k = sorted(set(args.k))
+
+    results = []
+    for config in _configurations(args):
+        print(f"--- {config['name']}: {len(queries)} pytań x {args.repeats} ---", file=sys.stderr)
+        results.append(_run_configuration(config, queries, args))
+
+    _print_table(results, args.k)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0 if all("error" not in row for row in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+# ==============================================================================
+# TEST OBCIĄŻENIOWY: run_iso_rag (asyncio.to_thread) vs arun_iso_rag (natywnie async)
+# ==============================================================================
+# Wysyła N zapytań z zadaną współbieżnością do bazy wiedzy ISO 20022 na dwa sposoby:
+#   thread - jak dotychczas w MCPServer: asyncio.to_thread(run_iso_rag, ...)
+#   async  - arun_iso_rag (AsyncQdrantClient + async embeddingi, wspólna pula połączeń)
+# Raportuje przepustowość (zapytania/s) oraz opóźnienia p50 / p95 / p99.
+#
+# Cache wektorów zapytań i semantyczny cache wyników są domyślnie WYŁĄCZANE
+# (mierzymy Qdrant + API embeddingów, nie trafienia w cache). Wymaga .env jak serwer MCP.
+#
+# Uruchomienie (z katalogu głównego repozytorium):
+#   python -m testscripts.load_test_iso_rag --requests 200 --concurrency 32
+# ==============================================================================
+
+QUERIES = [
+    "Wymień pola obowiązkowe w bloku Group Header dla komunikatu pacs.008",
+    "Jaki jest maksymalny limit znaków dla pola EndToEndIdentification?",
+    "Czego dotyczy reguła walidacyjna VR00060 w komunikacie pacs.008?",
+    "Czy blok Remittance Information jest obowiązkowy w komunikacie camt.053?",
+    "Jakie kody powodów zwrotu są dozwolone w pacs.004?",
+    "Struktura bloku CdtTrfTxInf w pacs.008.001.08",
+]
+
+
+async def _run_mode(name: str, call, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(index: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            result = await call(f"{QUERIES[index % len(QUERIES)]} ({index})")
+            latencies.append(time.perf_counter() - started)
+            if result.startswith("Błąd"):
+                errors += 1
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    wall = time.perf_counter() - wall_started
+
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000.0, [50, 95, 99])
+    return {"mode": name, "qps": total / wall, "p50": p50, "p95": p95, "p99": p99, "errors": errors}
+
+
+async def _main(args) -> int:
+    from buissnes_agent.tools import tool_iso_rag
+
+    modes = {
+        "thread": lambda query: asyncio.to_thread(tool_iso_rag.run_iso_rag, query),
+        "async": lambda query: tool_iso_rag.arun_iso_rag(query),
+    }
+    selected = list(modes) if args.mode == "both" else [args.mode]
+
+    # Rozgrzewka: inicjalizacja klientów i połączeń (nie wliczana do pomiaru)
+    for name in selected:
+        await modes[name](QUERIES[0])
+
+    results = []
+    for name in selected:
+        print(f"--- {name}: {args.requests} zapytań, współbieżność {args.concurrency} ---", file=sys.stderr)
+        results.append(await _run_mode(name, modes[name], args.requests, args.concurrency))
+
+    print(f"\n{'tryb':<8} {'zapytania/s':>12} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'błędy':>7}")
+    for row in results:
+        print(f"{row['mode']:<8} {row['qps']:>12.1f} {row['p50']:>10.1f} {row['p95']:>10.1f} "
+              f"{row['p99']:>10.1f} {row['errors']:>7}")
+
+    if "async" in selected:
+        stats = tool_iso_rag.get_embedding_batcher_stats()
+        print(f"\nMicro-batching embeddingów: {stats.get('batches')} paczek / {stats.get('requests')} zapytań, "
+              f"rozmiar paczki {stats.get('batch_size')}, opóźnienie kolejkowania {stats.get('queue_delay')}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Test obciążeniowy narzędzia ISO RAG (thread vs async)")
+    parser.add_argument("--requests", type=int, default=200, help="Łączna liczba zapytań na tryb")
+    parser.add_argument("--concurrency", type=int, default=32, help="Liczba równoczesnych zapytań")
+    parser.add_argument("--mode", choices=["thread", "async", "both"], default="both")
+    parser.add_argument("--with-cache", action="store_true",
+                        help="Nie wyłączaj cache wektorów zapytań i cache wyników")
+    args, _ = parser.parse_known_args()
+
+    if not args.with_cache:
+        # Nadpisania ENV muszą być ustawione przed pierwszym importem konfiguracji
+        os.environ["APP__RAG__QUERY_CACHE__ENABLED"] = "false"
+        os.environ["APP__RAG__RESULT_CACHE__ENABLED"] = "false"
+
+    return asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from buissnes_agent.QdrantDatabaseStore import QdrantDatabaseStore, quantization_type
+from buissnes_agent.config_loader import settings
+
+# ==============================================================================
+# MIGRACJA KOLEKCJI: HNSW / KWANTYZACJA / ON_DISK
+# ==============================================================================
+# Stosuje parametry z sekcji `vector_db` (hnsw.m, hnsw.ef_construct, quantization, on_disk)
+# do ISTNIEJĄCEJ kolekcji przez update_collection - bez ponownej ingestii.
+# Qdrant przebudowuje indeks i kwantyzację w tle (kolekcja pozostaje dostępna).
+#
+# Uruchomienie (z katalogu głównego repozytorium), np. int8 + wektory na dysku:
+#   APP__VECTOR_DB__QUANTIZATION__TYPE=scalar APP__VECTOR_DB__ON_DISK=true \
+#   python -m testscripts.migrate_collection
+# ==============================================================================
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger("DB-Migrate")
+
+load_dotenv()
+
+
+def migrate():
+    qdrant_url = os.getenv("QDRANT_API")
+    collection_name = settings.get("vector_db.collection_name")
+
+    if not qdrant_url:
+        logger.error("Brak QDRANT_API w pliku .env")
+        return 1
+
+    index_config = settings.get("vector_db") or {}
+    # Migracja wykonywana jawnie poniżej (niezależnie od vector_db.migrate_existing)
+    store = QdrantDatabaseStore(
+        url=qdrant_url,
+        api_key=os.getenv("QDRANT_API_KEY"),
+        collection_name=collection_name,
+        vector_size=int(os.getenv("EMBEDDING_DIM", "1536")),
+        index_config={**index_config, "migrate_existing": False},
+    )
+
+    print(f"\n--- MIGRACJA KOLEKCJI: {collection_name} "
+          f"(kwantyzacja: {quantization_type(index_config)}, on_disk: {index_config.get('on_disk')}) ---")
+    if store.migrate_collection():
+        info = store.client.get_collection(collection_name)
+        print(f"Wysłano zmianę. Status kolekcji: {info.status} (optymalizacja w tle).")
+    else:
+        print("Brak zmian - kolekcja zgodna z konfiguracją.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(migrate())
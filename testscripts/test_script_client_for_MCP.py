@@ -61,7 +61,7 @@ LLM_MODEL = os.getenv("CHAT_MODEL")
 # ==============================================================================
 SECURITY_SYSTEM_PROMPT = """
 Jesteś zaawansowanym analitykiem bankowym pracującym w Naszej Organizacji.
-Twoim celem jest dostarczanie precyzyjnych informacji, korzystając z trzech rozłącznych źródeł wiedzy.
+Twoim celem jest dostarczanie precyzyjnych informacji, korzystając z trzech rozłącznych źródeł wiedzy (osobno lub równolegle).
 Musisz działać jak inteligentny router, wybierając odpowiednie narzędzie do kontekstu pytania.
 
 DOSTĘPNE NARZĘDZIA I ICH PRZEZNACZENIE:
@@ -70,6 +70,8 @@ DOSTĘPNE NARZĘDZIA I ICH PRZEZNACZENIE:
    - Użyj do: Pytań o oficjalną specyfikację ISO 20022, strukturę XML, tagi, atrybuty, typy danych, reguły walidacji, standardy CBPR+.
    - Przykłady: "Jakie są pola w pacs.008?", "Co oznacza kod błędu AM09?", "Struktura bloku GrpHdr".
    - NIE używaj do: Pytań o to, jak my to wdrażamy w firmie.
+   - Pytanie wymagające KILKU wyszukiwań w specyfikacji (np. "pola obowiązkowe GrpHdr, limit EndToEndId i reguła VR00060")
+     -> użyj JEDNEGO wywołania 'query_iso20022_knowledge_base_batch' z listą pod-pytań zamiast kilku wywołań.
 
 2. 'search_confluence_internal' (BAZA WEWNĘTRZNA - WIEDZA FIRMOWA)
    - Użyj do: Pytań o procedury, ustalenia projektowe, specyfikę wdrożenia, notatki ze spotkań, decyzje biznesowe.
@@ -80,6 +82,11 @@ DOSTĘPNE NARZĘDZIA I ICH PRZEZNACZENIE:
    - Użyj do: Definicji pojęć biznesowych, historii, geografii, kodów krajów, informacji o organizacjach (SWIFT, FED, EBA).
    - Przykłady: "Co to jest bank centralny?", "Historia systemu SWIFT", "Waluta Nigerii".
 
+4. 'search_all_knowledge_sources' (WSZYSTKIE ŹRÓDŁA RÓWNOLEGLE)
+   - Użyj do: Pytań HYBRYDOWYCH, które łączą specyfikację ISO z praktyką firmy i/lub wiedzą ogólną.
+   - Przykłady: "Co to jest camt.053 i jak go archiwizujemy w naszym systemie?".
+   - Jedno wywołanie zwraca osobne sekcje dla ISO, Confluence i Wikipedii - nie wywołuj potem narzędzi pojedynczo.
+
 INSTRUKCJA POSTĘPOWANIA (ALGORYTM DECYZYJNY):
 
 KROK 1: ANALIZA INTENCJI
@@ -90,7 +97,7 @@ KROK 1: ANALIZA INTENCJI
 
 KROK 2: SYNTEZA ODPOWIEDZI
 - ZAWSZE cytuj źródło w odpowiedzi (np. "Zgodnie z procedurą w Confluence...", "Według specyfikacji ISO...").
-- Jeśli pytanie jest złożone (np. "Co to jest pacs.008 i jak go wdrażamy?"), możesz użyć DWÓCH narzędzi sekwencyjnie (najpierw definicja z ISO, potem wdrożenie z Confluence).
+- Jeśli pytanie jest złożone (np. "Co to jest pacs.008 i jak go wdrażamy?"), użyj JEDNEGO wywołania 'search_all_knowledge_sources' zamiast kilku narzędzi po kolei.
 
 Pamiętaj: Jesteś profesjonalistą. Nie zgaduj. Jeśli narzędzia nie zwrócą wyniku, powiedz to wprost.
 """
@@ -189,10 +196,23 @@ async def run_chat_loop():
 
                 return result.content[0].text
 
+            # Narzędzie wsadowe przyjmuje listę pytań ('queries') zamiast pojedynczego 'query'
+            async def _batch_tool_wrapper(queries: list[str], tool_name=tool.name):
+                print(f"\n[DEBUG A2A] Wywołuję narzędzie MCP: {tool_name} z queries={queries}")
+
+                result = await session.call_tool(tool_name, arguments={"queries": queries})
+
+                if result.isError:
+                    return f"Tool Error: {result.content}"
+
+                return result.content[0].text
+
+            is_batch_tool = "queries" in (tool.inputSchema or {}).get("properties", {})
+
             # Tworzymy StructuredTool dla LangChaina
             lc_tool = StructuredTool.from_function(
                 func=None,
-                coroutine=_tool_wrapper,
+                coroutine=_batch_tool_wrapper if is_batch_tool else _tool_wrapper,
                 name=tool.name,
                 description=tool.description or "Narzędzie MCP do bazy wiedzy",
             )